@@ -1,7 +1,6 @@
 import streamlit as st
-import json
-from pathlib import Path
 import random
+from question_bank import get_categories, get_category_stats
 
 # Page configuration - MUST be the first Streamlit command
 st.set_page_config(
@@ -11,29 +10,19 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Define the path to our data folder
-DATA_DIR = Path(__file__).parent / "data"
-QUESTIONS_FILE = DATA_DIR / "questions.json"
-
-def load_questions():
-    """Load questions from JSON file."""
-    if QUESTIONS_FILE.exists():
-        with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"categories": {}}
-
-def get_categories():
-    """Get list of available categories."""
-    data = load_questions()
-    return list(data.get("categories", {}).keys())
-
 # Initialize session state
 if "player_name" not in st.session_state:
     st.session_state.player_name = ""
 if "selected_category" not in st.session_state:
     st.session_state.selected_category = None
 if "streak" not in st.session_state:
-  Custom CSS for more fun styling
+    st.session_state.streak = 0
+if "best_streak" not in st.session_state:
+    st.session_state.best_streak = 0
+if "total_games" not in st.session_state:
+    st.session_state.total_games = 0
+
+# Custom CSS for more fun styling
 st.markdown("""
     <style>
     .big-title {
@@ -45,7 +34,45 @@ st.markdown("""
     }
     .subtitle {
         text-align: center;
-  Rules Section
+        font-size: 1.3rem;
+        color: #666;
+        margin-bottom: 2rem;
+    }
+    .fun-fact {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        padding: 1.5rem;
+        border-radius: 1rem;
+        text-align: center;
+        font-size: 1.1rem;
+        margin: 1rem 0;
+    }
+    .achievement {
+        background: linear-gradient(135deg, #FFD700, #FFA500);
+        padding: 0.8rem;
+        border-radius: 0.5rem;
+        color: white;
+        text-align: center;
+        font-weight: bold;
+        margin: 0.5rem 0;
+    }
+    </style>
+""", unsafe_allow_html=True)
+
+# Main page content
+st.markdown('<div class="big-title">🎯 Netherlands QuizMaster</div>', unsafe_allow_html=True)
+st.markdown('<div class="subtitle">Test Your Knowledge About the Netherlands! 🇳🇱</div>', unsafe_allow_html=True)
+
+# Fun welcome message
+fun_greetings = [
+    "Welkom! Ready to become a Netherlands expert? 🌷",
+    "Hallo! Let's test your Dutch knowledge! 🧀",
+    "Goedemorgen! Time to quiz about the Netherlands! 🚲",
+    "Hey there! Discover amazing Dutch facts! 🏛️"
+]
+st.markdown(f"### {random.choice(fun_greetings)}")
+
+# Rules Section
 with st.expander("📋 Game Rules & How to Play", expanded=False):
     st.markdown("""
     ### 🎮 How to Play:
@@ -86,36 +113,11 @@ with col2:
     st.write("")  # Spacing
     st.write("")
     if st.session_state.player_name:
-        st.success(f"🌟
-    .achievement {
-        background: linear-gradient(135deg, #FFD700, #FFA500);
-        padding: 0.8rem;
-        border-radius: 0.5rem;
-        color: white;
-        text-align: center;
-        font-weight: bold;
-        margin: 0.5rem 0;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# Main page content
-st.markdown('<div class="big-title">🎯 Netherlands QuizMaster</div>', unsafe_allow_html=True)
-st.markdown('<div class="subtitle">Test Your Knowledge About the Netherlands! 🇳🇱</div>', unsafe_allow_html=True)
+        st.success(f"🌟 Welcome, {st.session_state.player_name}!")
 
-# Fun welcome message
-fun_greetings = [
-    "Welkom! Ready to become a Netherlands expert? 🌷",
-    "Hallo! Let's test your Dutch knowledge! 🧀",
-    "Goedemorgen! Time to quiz about the Netherlands! 🚲",
-    "Hey there! Discover amazing Dutch facts! 🏛️"
-]
-st.markdown(f"### {random.choice(fun_greetings)}
-if "best_streak" not in st.session_state:
-    st.session_state.best_streak = 0
+st.markdown("---")
 
-# Main page content
-st.title("🎯 Netherl with fun descriptions
+# Category selection with fun descriptions
 st.markdown("### 🎓 Choose Your Challenge!")
 
 # Fun category descriptions
@@ -141,11 +143,16 @@ if categories:
     
     # Show selected category info
     if st.session_state.selected_category:
-        selected_data = load_questions()
-        num_questions = len(selected_data.get("categories", {}).get(st.session_state.selected_category, []))
+        selected_stats = get_category_stats().get(st.session_state.selected_category, {})
+        num_questions = selected_stats.get("questions", 0)
+        difficulties = selected_stats.get("difficulties", {})
+        difficulty_mix = " · ".join(f"{d.capitalize()}: {n}" for d, n in difficulties.items())
         
         st.markdown(f"### 📊 {st.session_state.selected_category}")
-        st.markdown(f"**Questions:** {num_questions} | **Category selected:** ✅")
+        st.markdown(f"**Questions:** {num_questions} | **Total points:** "
+                    f"{selected_stats.get('total_points', 0)} | **Category selected:** ✅")
+        if difficulty_mix:
+            st.caption(difficulty_mix)
     
     st.markdown("---")
     
@@ -198,31 +205,7 @@ with col3:
 
 st.markdown(
     "<div style='text-align: center; color: gray; margin-top: 2rem;'>"
-    "🎓 Made with ❤️ for S6 Informatics | Master the Netherlands! 🇳🇱
-if categories:
-    selected = st.selectbox(
-        "Select category:",
-        options=categories,
-        index=0 if st.session_state.selected_category is None 
-              else categories.index(st.session_state.selected_category)
-              if st.session_state.selected_category in categories else 0
-    )
-    st.session_state.selected_category = selected
-    
-    # Start quiz button
-    if st.session_state.player_name:
-        if st.button("🚀 Start Quiz", type="primary", use_container_width=True):
-            st.switch_page("pages/1_🎮_Quiz.py")
-    else:
-        st.warning("Please enter your name to start the quiz.")
-else:
-    st.error("No categories found. Please add questions to data/questions.json")
-
-# Footer
-st.markdown("---")
-st.markdown(
-    "<div style='text-align: center; color: gray;'>"
-    "Made with ❤️ for S6 Informatics"
+    "🎓 Made with ❤️ for S6 Informatics | Master the Netherlands! 🇳🇱"
     "</div>",
     unsafe_allow_html=True
 )
@@ -0,0 +1,396 @@
+"""Adaptive difficulty: Elo ratings for players and questions.
+
+Every answer is a match between the player and the question. With ratings
+``p`` and ``q`` the player is expected to answer correctly with probability
+``1 / (1 + 10 ** ((q - p) / SCALE))``; the player gains and the question
+loses ``k * (actual - expected)``. ``k`` starts high and settles as a rating
+collects answers, so new players and new questions find their level
+quickly. An update is a handful of arithmetic operations and moves one
+question between two index buckets: O(1), whatever the size of the bank.
+
+In adaptive rounds the next question is the unseen one rated closest to the
+player. Each category keeps an in-memory index of its questions bucketed by
+rating (``BUCKET_WIDTH`` points per bucket): the search starts at the
+player's bucket and walks outwards, so it touches a few buckets and a few
+questions instead of sorting the category. Questions without a stored
+rating start from their ``difficulty``.
+
+Ratings follow a question by its ``question_key``, not its position, so
+they survive reloads of the question bank. An index is built for one bank
+view on a background thread (it reads the stored ratings), never on a
+click: until it is swapped in, adaptive rounds draw at random and answers
+to questions it does not cover yet are held and applied once it is in.
+Rounds keep the bank view they started with (see ``game_state``), so a
+round that outlives a reload keeps drawing at random from its own view.
+
+Ratings live in this process and are written to SQLite in batches:
+updates only mark a rating dirty, and ``save_ratings()`` (run periodically
+by a background task in ``score_writer``, and at exit) upserts everything
+dirty in one transaction, so a question answered a thousand times between
+saves is written once. Player ratings are kept for the ``MAX_PLAYERS``
+most recently active (player, category) pairs: the least recently used
+are dropped once saved, and loaded again from SQLite when they return.
+"""
+
+import logging
+import random
+import threading
+from array import array
+from collections import OrderedDict
+
+import database
+import question_bank
+
+logger = logging.getLogger(__name__)
+
+SCALE = 400.0
+INITIAL_PLAYER_RATING = 1500.0
+DIFFICULTY_RATINGS = {"easy": 1300.0, "medium": 1500.0, "hard": 1700.0}
+K_NEW = 48.0       # step size for a rating without answers
+K_MIN = 8.0        # ... and the floor it settles to
+K_SETTLE = 20      # answers after which the step size has halved
+BUCKET_WIDTH = 10  # rating points per index bucket
+RANDOM_PICKS = 4   # random draws from a bucket before scanning it for an unseen question
+MAX_PLAYERS = 50_000  # (player, category) ratings kept in memory
+
+
+def expected_score(player_rating: float, question_rating: float) -> float:
+    """Probability that the player answers the question correctly."""
+    return 1.0 / (1.0 + 10.0 ** ((question_rating - player_rating) / SCALE))
+
+
+def step_size(count: int) -> float:
+    """Elo ``k`` for a rating that has seen ``count`` answers."""
+    return max(K_MIN, K_NEW / (1.0 + count / K_SETTLE))
+
+
+class RatingIndex:
+    """One bank view of a category, its questions bucketed by rating.
+
+    ``keys[position]`` is the ``question_key`` a position's rating is
+    stored under and ``positions`` maps it back. ``buckets`` maps a bucket
+    number to a list of question positions; ``slot[position]`` is where
+    that position sits in its list, so moving a question to another bucket
+    is a swap-remove plus an append.
+    """
+
+    def __init__(self, category: str, questions, rating_of):
+        """``rating_of(key)`` gives a question's known ``(rating, attempts)``, or None."""
+        self.category = category
+        self.questions = questions  # the bank view this index was built from
+        n = len(questions)
+        self.keys = [database.question_key(category, questions.text(position))
+                     for position in range(n)]
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+        self.ratings = array("d", bytes(8 * n))
+        self.attempts = array("I", bytes(4 * n))
+        self.slot = array("I", bytes(4 * n))
+        self.buckets = {}
+        self.low = self.high = 0  # bucket numbers that may be occupied
+
+        # Starting ratings from the difficulty groups, without decoding questions
+        for difficulty, positions in getattr(questions, "difficulties", {}).items():
+            rating = DIFFICULTY_RATINGS.get(difficulty, INITIAL_PLAYER_RATING)
+            for position in positions:
+                self.ratings[position] = rating
+        for position, key in enumerate(self.keys):
+            known = rating_of(key)
+            if known is not None:
+                self.ratings[position], self.attempts[position] = known
+            self._insert(position)
+
+    def _bucket_of(self, rating: float) -> int:
+        return int(rating // BUCKET_WIDTH)
+
+    def _insert(self, position: int):
+        bucket_number = self._bucket_of(self.ratings[position])
+        bucket = self.buckets.get(bucket_number)
+        if bucket is None:
+            bucket = self.buckets[bucket_number] = []
+            if len(self.buckets) == 1:
+                self.low = self.high = bucket_number
+            else:
+                self.low = min(self.low, bucket_number)
+                self.high = max(self.high, bucket_number)
+        self.slot[position] = len(bucket)
+        bucket.append(position)
+
+    def _remove(self, position: int):
+        bucket_number = self._bucket_of(self.ratings[position])
+        bucket = self.buckets[bucket_number]
+        last = bucket.pop()
+        if last != position:
+            i = self.slot[position]
+            bucket[i] = last
+            self.slot[last] = i
+        if not bucket:
+            del self.buckets[bucket_number]
+
+    def set_rating(self, position: int, rating: float):
+        if self._bucket_of(rating) == self._bucket_of(self.ratings[position]):
+            self.ratings[position] = rating
+            return
+        self._remove(position)
+        self.ratings[position] = rating
+        self._insert(position)
+
+    def _unseen_in(self, bucket: list, seen, rng):
+        for _ in range(RANDOM_PICKS):
+            position = bucket[rng.randrange(len(bucket))]
+            if position not in seen:
+                return position
+        # Mostly seen: a scan finds an unseen one within len(seen) + 1 steps
+        start = rng.randrange(len(bucket))
+        for i in range(len(bucket)):
+            position = bucket[(start + i) % len(bucket)]
+            if position not in seen:
+                return position
+        return None
+
+    def nearest(self, rating: float, seen=frozenset(), rng=random):
+        """An unseen question position rated closest to ``rating``, or None.
+
+        "Closest" is to within a bucket; questions in the same bucket are
+        drawn at random, so players at the same level get varied rounds.
+        """
+        if len(seen) >= len(self.ratings):
+            return None
+        center = self._bucket_of(rating)
+        # Visit buckets in order of distance: center, then the nearer neighbour first
+        below_first = rating - center * BUCKET_WIDTH < BUCKET_WIDTH / 2
+        for distance in range(max(center - self.low, self.high - center) + 1):
+            sides = (center - distance, center + distance) if below_first \
+                else (center + distance, center - distance)
+            for bucket_number in sides[:1] if distance == 0 else sides:
+                bucket = self.buckets.get(bucket_number)
+                if bucket:
+                    position = self._unseen_in(bucket, seen, rng)
+                    if position is not None:
+                        return position
+        return None
+
+
+_lock = threading.Lock()  # guards ratings and the index table; every update is O(1)
+_indexes = {}          # category -> RatingIndex of the current bank view
+_building = {}         # category -> keys updated while its next index builds
+_pending = {}          # category -> answers waiting for that index: [(player, key, correct)]
+_players = OrderedDict()  # (player, category) -> [rating, answers], least recently used first
+_dirty_questions = {}  # question_key -> (category, rating, attempts)
+_dirty_players = {}    # (player, category) -> (rating, answers)
+_saving_players = {}   # dirty player ratings being written by save_ratings()
+
+
+def build_index(category: str) -> RatingIndex:
+    """Build the index of the category's current bank view and swap it in.
+
+    Reads the stored ratings, so it runs on a background thread (see
+    ``_ensure_index()``); benchmarks call it directly. The in-memory
+    ratings of the previous index win over stored ones, which may not be
+    saved yet; updates made while building are copied over under ``_lock``
+    as the new index goes in, and held answers are applied after.
+    """
+    with _lock:
+        _building.setdefault(category, set())
+    try:
+        questions = question_bank.get_questions(category)
+        stored = database.get_question_ratings(category)
+        old = _indexes.get(category)
+
+        def rating_of(key):
+            position = old.positions.get(key) if old is not None else None
+            if position is None:
+                return stored.get(key)
+            return old.ratings[position], old.attempts[position]
+
+        index = RatingIndex(category, questions, rating_of)
+        with _lock:
+            for key in _building.pop(category):
+                old_position, position = old.positions.get(key), index.positions.get(key)
+                if old_position is not None and position is not None:
+                    index.set_rating(position, old.ratings[old_position])
+                    index.attempts[position] = old.attempts[old_position]
+            _indexes[category] = index
+            pending = _pending.pop(category, [])
+    finally:
+        with _lock:
+            _building.pop(category, None)
+    for name, key, correct in pending:
+        record_answer(name, category, key, correct)
+    return index
+
+
+def _build_in_background(category: str):
+    try:
+        build_index(category)
+    except Exception:
+        logger.exception("Could not build the rating index of %r", category)
+
+
+def _ensure_index(category: str):
+    """The category's index, starting a background build if it is missing or stale.
+
+    Returns the index in use, which may be None or an older bank view's.
+    """
+    questions = question_bank.get_questions(category)
+    index = _indexes.get(category)
+    if index is not None and index.questions is questions:
+        return index
+    with _lock:
+        if category in _building:
+            return index
+        _building[category] = set()
+    threading.Thread(target=_build_in_background, args=(category,),
+                     name="rating-index", daemon=True).start()
+    return index
+
+
+def _evict_players(scan: bool = False):
+    """Drop least recently used player ratings beyond ``MAX_PLAYERS``. Caller holds ``_lock``.
+
+    Only saved ratings are dropped, so a reload reads the latest one. By
+    default this stops at the first unsaved rating; ``scan`` looks past
+    unsaved ones, which ``save_ratings()`` does once they are written.
+    """
+    excess = len(_players) - MAX_PLAYERS
+    if excess <= 0:
+        return
+    evict = []
+    for key in _players:
+        if key in _dirty_players or key in _saving_players:
+            if not scan:
+                break
+            continue
+        evict.append(key)
+        if len(evict) == excess:
+            break
+    for key in evict:
+        del _players[key]
+
+
+def _player(name: str, category: str) -> list:
+    """The player's ``[rating, answers]`` entry, loaded on a miss. Update it under ``_lock``."""
+    with _lock:
+        entry = _players.get((name, category))
+        if entry is not None:
+            _players.move_to_end((name, category))
+            return entry
+    stored = database.get_player_rating(name, category)
+    with _lock:
+        entry = _players.setdefault((name, category),
+                                    list(stored) if stored else [INITIAL_PLAYER_RATING, 0])
+        _evict_players()
+    return entry
+
+
+def prepare(name: str, category: str):
+    """Load what a round will need: the player's rating and the category's index.
+
+    Called when a round starts, so answering never waits on the database;
+    the index is built in the background if it is not ready.
+    """
+    _player(name, category)
+    _ensure_index(category)
+
+
+def get_player_rating(name: str, category: str) -> float:
+    """The player's current rating in a category."""
+    return _player(name, category)[0]
+
+
+def get_question_rating(category: str, key: str):
+    """Current rating of a question (by ``question_key``), or None if it is not indexed yet."""
+    index = _indexes.get(category)
+    position = index.positions.get(key) if index is not None else None
+    return index.ratings[position] if position is not None else None
+
+
+def record_answer(name: str, category: str, key: str, correct: bool) -> float:
+    """Update the player's and the question's ratings. Returns the player's new rating.
+
+    ``key`` is the question's ``question_key``. An answer to a question the
+    index does not cover yet is held until the index being built is in; if
+    no build is coming (the question left the bank) it moves no rating.
+    """
+    index = _ensure_index(category)
+    player = _player(name, category)
+    with _lock:
+        # Put the entry back if it was evicted since; one loaded again meanwhile wins
+        player = _players.setdefault((name, category), player)
+        position = index.positions.get(key) if index is not None else None
+        if position is None:
+            if category in _building:
+                _pending.setdefault(category, []).append((name, key, correct))
+            return player[0]
+        question_rating = index.ratings[position]
+        attempts = index.attempts[position]
+        surprise = (1.0 if correct else 0.0) - expected_score(player[0], question_rating)
+
+        player[0] += step_size(player[1]) * surprise
+        player[1] += 1
+        index.set_rating(position, question_rating - step_size(attempts) * surprise)
+        index.attempts[position] = attempts + 1
+        if category in _building:
+            _building[category].add(key)
+
+        _dirty_players[(name, category)] = tuple(player)
+        _dirty_questions[key] = (category, index.ratings[position], attempts + 1)
+        return player[0]
+
+
+def _random_unseen(count: int, seen: set, rng):
+    if len(seen) >= count:
+        return None
+    while True:
+        position = rng.randrange(count)
+        if position not in seen:
+            return position
+
+
+def next_question_id(name: str, category: str, questions=None, seen=(), rng=random):
+    """The unseen question rated closest to the player, or None if none is left.
+
+    Ids are positions in ``questions``, the round's bank view (by default
+    the current one). Without an index of that view the pick is random.
+    """
+    if questions is None:
+        questions = question_bank.get_questions(category)
+    seen = set(seen)
+    index = _ensure_index(category)
+    if index is None or index.questions is not questions:
+        return _random_unseen(len(questions), seen, rng)
+    rating = _player(name, category)[0]
+    with _lock:
+        return index.nearest(rating, seen, rng)
+
+
+def save_ratings() -> int:
+    """Write every rating changed since the last save in one transaction.
+
+    Returns how many ratings were written. On failure they stay dirty and
+    are retried by the next save, unless newer updates replaced them.
+    """
+    global _dirty_questions, _dirty_players, _saving_players
+    with _lock:
+        questions, players = _dirty_questions, _dirty_players
+        if not questions and not players:
+            return 0
+        _dirty_questions, _dirty_players = {}, {}
+        _saving_players = players
+    saved = False
+    try:
+        database.save_ratings(
+            [(key, category, rating, attempts)
+             for key, (category, rating, attempts) in questions.items()],
+            [(name, category, rating, answers)
+             for (name, category), (rating, answers) in players.items()])
+        saved = True
+    finally:
+        with _lock:
+            if not saved:
+                for key, value in questions.items():
+                    _dirty_questions.setdefault(key, value)
+                for key, value in players.items():
+                    _dirty_players.setdefault(key, value)
+            _saving_players = {}
+            _evict_players(scan=True)
+    return len(questions) + len(players)
@@ -0,0 +1,167 @@
+"""Question-level statistics from the ``answers`` event log.
+
+Everything is computed with grouped pandas/NumPy operations over the latest
+``MAX_ANSWERS`` answers of the log (the window this process keeps in
+memory), with no Python loop per answer or per question:
+
+* accuracy: the share of answers that were correct;
+* option distribution: the share of answers that picked each option;
+* mean and median response time;
+* discrimination: the point-biserial correlation between getting this
+  question right and the player's accuracy on the *rest* of the round.
+  Useful questions are answered correctly more often by players who do
+  well overall (roughly r > 0.2). Near zero, the question does not separate
+  strong from weak players; below zero, look for a wrong answer key or a
+  misleading option.
+
+The Admin page caches the result per ``database.get_answers_version()``.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+import database
+import question_bank
+
+MIN_ATTEMPTS = 20          # fewer answers than this and the statistics are mostly noise
+LOW_DISCRIMINATION = 0.1   # questions below this are flagged for review
+MAX_ANSWERS = 1_000_000    # newest answers kept in memory; older ones drop out of the stats
+
+OPTION_LABELS = "ABCDEFGH"
+
+
+_COLUMNS = ["id", "round_id", "category", "question_key", "selected_index", "correct",
+            "response_ms"]
+_lock = threading.Lock()
+_answers = None  # the newest MAX_ANSWERS answers loaded so far; the log is append-only
+_details = (None, {})  # (bank view, {category: {question_key: (question, answer)}})
+
+
+def _fetch(after_id: int) -> pd.DataFrame:
+    """Answers after ``after_id``, oldest first; at most the newest ``MAX_ANSWERS``."""
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples: far cheaper than sqlite3.Row per cell
+        rows = cursor.execute(f"""
+            SELECT * FROM (
+                SELECT {', '.join(_COLUMNS)} FROM answers WHERE id > ? ORDER BY id DESC LIMIT ?
+            ) ORDER BY id
+        """, (after_id, MAX_ANSWERS)).fetchall()
+    return pd.DataFrame(rows, columns=_COLUMNS)
+
+
+def load_answers() -> pd.DataFrame:
+    """The newest ``MAX_ANSWERS`` answers of the log as a DataFrame, one row per answer.
+
+    Answers are only ever appended, so the rows read last time are kept and
+    only newer ones are fetched; the oldest rows are dropped once the window
+    is full, so memory stays bounded however long the process runs. A log
+    that shrank (e.g. was reset) is read again from the start.
+    """
+    global _answers
+    with _lock:
+        last_id = int(_answers["id"].iloc[-1]) if _answers is not None and len(_answers) else 0
+        if last_id > database.get_answers_version():
+            _answers, last_id = None, 0
+        new = _fetch(last_id)
+        if _answers is None or new.empty:
+            combined = new if _answers is None else _answers
+        else:
+            keep = _answers.iloc[max(0, len(_answers) + len(new) - MAX_ANSWERS):]
+            combined = pd.concat([keep.astype({"category": str, "question_key": str}), new],
+                                 ignore_index=True)
+        # Repeated strings as categoricals: smaller, and much faster to group by
+        _answers = combined.astype({"category": "category", "question_key": "category"})
+        return _answers
+
+
+def discrimination(answers: pd.DataFrame) -> pd.Series:
+    """Point-biserial item/rest correlation per question (NaN where undefined).
+
+    The rest score of an answer is the player's accuracy on the other
+    questions of the same round. The correlation is assembled from grouped
+    sums, r = (n·Σxy − Σx·Σy) / √((n·Σx − (Σx)²)(n·Σy² − (Σy)²)),
+    using x² = x for the 0/1 item score.
+    """
+    x = answers["correct"].to_numpy(dtype=np.float64)
+    by_round = answers.groupby("round_id")["correct"]
+    others = by_round.transform("size").to_numpy(dtype=np.float64) - 1
+    rest_correct = by_round.transform("sum").to_numpy(dtype=np.float64) - x
+    has_rest = others > 0
+    y = np.divide(rest_correct, others, out=np.zeros_like(x), where=has_rest)
+
+    terms = pd.DataFrame({"x": x, "y": y, "xy": x * y, "yy": y * y})[has_rest]
+    sums = terms.groupby(answers["question_key"][has_rest], observed=True).agg(
+        n=("x", "size"), sx=("x", "sum"), sy=("y", "sum"), sxy=("xy", "sum"), syy=("yy", "sum"))
+    n = sums["n"]
+    covariance = n * sums["sxy"] - sums["sx"] * sums["sy"]
+    variance = (n * sums["sx"] - sums["sx"] ** 2) * (n * sums["syy"] - sums["sy"] ** 2)
+    return (covariance / np.sqrt(variance.where(variance > 0))).rename("discrimination")
+
+
+def _option_label(index: int) -> str:
+    """Letter of an option, or its number past the last letter."""
+    return OPTION_LABELS[index] if 0 <= index < len(OPTION_LABELS) else str(index)
+
+
+def option_distribution(answers: pd.DataFrame) -> pd.DataFrame:
+    """Share of answers choosing each option, one column per option letter."""
+    counts = answers.groupby(["question_key", "selected_index"], observed=True).size().unstack(fill_value=0)
+    shares = counts.div(counts.sum(axis=1), axis=0)
+    return shares.rename(columns=_option_label)
+
+
+def _category_details(category: str) -> dict:
+    """``{question_key: (question, answer)}`` of a category, hashed once per bank view."""
+    global _details
+    bank = question_bank.load_questions()
+    cached_bank, by_category = _details
+    if cached_bank is not bank:
+        by_category = {}
+        _details = (bank, by_category)
+    details = by_category.get(category)
+    if details is None:
+        details = by_category[category] = {
+            database.question_key(category, q["question"]): (q["question"], _option_label(q["correct"]))
+            for q in bank["categories"].get(category, ())
+        }
+    return details
+
+
+def _question_details(stats: pd.DataFrame) -> pd.DataFrame:
+    """Question text and correct option letter from the current question bank."""
+    details = {}
+    for category in stats["category"].unique():
+        details.update(_category_details(category))
+    return pd.DataFrame.from_dict(details, orient="index", columns=["question", "answer"])
+
+
+def question_stats(answers: pd.DataFrame) -> pd.DataFrame:
+    """One row per answered question, indexed by ``question_key``.
+
+    Columns: question, category, answer (the correct option), attempts,
+    accuracy, mean_response_ms, median_response_ms, discrimination,
+    needs_review, then the share of answers for each option (A, B, ...).
+    Questions that have since left the bank have no text.
+    """
+    if answers.empty:
+        return pd.DataFrame(columns=["question", "category", "answer", "attempts", "accuracy",
+                                     "mean_response_ms", "median_response_ms", "discrimination",
+                                     "needs_review"])
+    stats = answers.groupby("question_key", observed=True).agg(
+        category=("category", "first"),
+        attempts=("correct", "size"),
+        accuracy=("correct", "mean"),
+        mean_response_ms=("response_ms", "mean"),
+        median_response_ms=("response_ms", "median"),
+    )
+    stats["category"] = stats["category"].astype(str)
+    stats = stats.join(discrimination(answers))
+    stats["needs_review"] = (stats["attempts"] >= MIN_ATTEMPTS) & \
+        ~(stats["discrimination"] >= LOW_DISCRIMINATION)
+    stats = _question_details(stats).join(stats, how="right").join(option_distribution(answers))
+    stats.index.name = "question_key"
+    return stats[["question", "category", "answer"] + [c for c in stats.columns
+                                                       if c not in ("question", "category", "answer")]]
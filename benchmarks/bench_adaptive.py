@@ -0,0 +1,98 @@
+"""Adaptive difficulty: next-question and rating-update latency by category size.
+
+Writes a one-category synthetic bank per size, builds the rating index, then
+simulates adaptive rounds: players of random skill answer questions picked
+by ``adaptive.next_question_id()`` and ``adaptive.record_answer()`` updates
+both ratings. Prints the index build time, median and p99 latency of both
+calls, how long ``adaptive.save_ratings()`` takes to write the dirty
+ratings in one batch, and the index build of a fresh process that starts
+from those stored ratings.
+
+    python benchmarks/bench_adaptive.py
+    python benchmarks/bench_adaptive.py --sizes 1000,100000 --rounds 2000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import adaptive  # noqa: E402
+import database  # noqa: E402
+import question_bank  # noqa: E402
+import synthetic  # noqa: E402
+
+ROUND = 10
+
+
+def percentile(samples: list, p: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated questions per category")
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'questions':>10} {'build (s)':>10} {'next p50 (us)':>14} {'next p99 (us)':>14} "
+          f"{'update p50 (us)':>16} {'update p99 (us)':>16} {'save (ms)':>10} {'rebuild (s)':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            synthetic.use_data_dir(Path(tmp))
+            database.init_database()
+            synthetic.write_question_file(question_bank.QUESTIONS_FILE, size, 1, rng)
+            category = synthetic.category_names(1)[0]
+            adaptive._indexes.clear()
+            adaptive._players.clear()
+            question_bank.load_questions()  # compile the snapshot outside the timing
+
+            questions = question_bank.get_questions(category)
+            start = time.perf_counter()
+            index = adaptive.build_index(category)
+            build = time.perf_counter() - start
+
+            skills = {f"player{i}": rng.gauss(1500, 200) for i in range(args.players)}
+            picks, updates = [], []
+            for _ in range(args.rounds):
+                name = rng.choice(list(skills))
+                seen = []
+                for _ in range(ROUND):
+                    start = time.perf_counter()
+                    question_id = adaptive.next_question_id(name, category, questions, seen, rng)
+                    picks.append(time.perf_counter() - start)
+                    seen.append(question_id)
+                    key = index.keys[question_id]
+                    chance = adaptive.expected_score(
+                        skills[name], adaptive.get_question_rating(category, key))
+                    start = time.perf_counter()
+                    adaptive.record_answer(name, category, key, rng.random() < chance)
+                    updates.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            adaptive.save_ratings()
+            save = time.perf_counter() - start
+
+            # A fresh process: the index now starts from the stored ratings
+            adaptive._indexes.clear()
+            start = time.perf_counter()
+            adaptive.build_index(category)
+            rebuild = time.perf_counter() - start
+            database.close_pool()
+
+        print(f"{size:>10,} {build:>10.2f} {statistics.median(picks) * 1e6:>14.1f} "
+              f"{percentile(picks, 0.99) * 1e6:>14.1f} {statistics.median(updates) * 1e6:>16.1f} "
+              f"{percentile(updates, 0.99) * 1e6:>16.1f} {save * 1000:>10.1f} "
+              f"{rebuild:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
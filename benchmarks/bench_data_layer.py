@@ -0,0 +1,211 @@
+"""Data-layer microbenchmarks on synthetic datasets, with regression checks.
+
+Builds a throw-away data directory for a size profile (question bank,
+users and score history), then times the calls every page makes: question
+loading (mapping the compiled snapshot when cold), snapshot compilation,
+single-question lookup, category listing, per-category question fetch, full-text
+search, leaderboard reads, login checks, score writes and the JSON export.
+
+    python benchmarks/bench_data_layer.py --profile small
+    python benchmarks/bench_data_layer.py --profile large --save-baseline
+    python benchmarks/bench_data_layer.py --profile large --check --threshold 0.25
+
+Profiles (questions / scores / users):
+
+    small    1,000 /     10,000 /   1,000
+    medium 100,000 /  1,000,000 /  10,000
+    large 1,000,000 / 10,000,000 / 100,000
+
+``--save-baseline`` stores the medians in ``benchmarks/baseline.json``
+(one entry per profile). ``--check`` compares a run against that file and
+exits with status 1 when a benchmark's median is more than ``--threshold``
+slower than the baseline.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synthetic  # noqa: E402
+from synthetic import database, highscores, question_bank  # noqa: E402
+import question_snapshot  # noqa: E402
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+PROFILES = {
+    "small": {"questions": 1_000, "scores": 10_000, "users": 1_000, "categories": 10},
+    "medium": {"questions": 100_000, "scores": 1_000_000, "users": 10_000, "categories": 20},
+    "large": {"questions": 1_000_000, "scores": 10_000_000, "users": 100_000, "categories": 50},
+}
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """Run ``fn`` ``repeat`` times; return median / p95 / min in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 4),
+        "min_ms": round(samples[0], 4),
+        "runs": repeat,
+    }
+
+
+def build_dataset(directory: Path, profile: dict, seed: int):
+    rng = random.Random(seed)
+    synthetic.use_data_dir(directory)
+    synthetic.write_question_file(question_bank.QUESTIONS_FILE, profile["questions"],
+                                  profile["categories"], rng)
+    with database.connection() as conn:
+        synthetic.fill_users(conn, profile["users"])
+        synthetic.fill_questions(conn, profile["questions"], profile["categories"], rng)
+        synthetic.fill_scores(conn, profile["scores"], profile["users"],
+                              profile["categories"], rng)
+    database.rebuild_leaderboards()
+    highscores.export_scores()  # the history; the benchmark times incremental exports
+
+
+def forget_question_bank():
+    """Make the next load_questions() re-read and re-parse the file."""
+    question_bank._stat_key = None
+    question_bank._content_hash = None
+
+
+def run_benchmarks(profile: dict, repeat: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    category = synthetic.category_names(profile["categories"])[0]
+    cold = max(3, repeat // 20)
+    with database.connection() as conn:
+        middle = conn.execute(
+            "SELECT id, score, played_at FROM scores "
+            "ORDER BY score DESC, played_at DESC, id DESC LIMIT 1 OFFSET ?",
+            (profile["scores"] // 2,)).fetchone()
+    deep_cursor = database._encode_cursor(middle)
+
+    # Each call is (name, function, runs, setup).
+    cases = [
+        ("question_bank.load_questions[cold]", question_bank.load_questions, cold,
+         forget_question_bank),
+        ("question_bank.load_questions[warm]", question_bank.load_questions, repeat, None),
+        ("question_snapshot.build", lambda: question_snapshot.build(
+            question_bank.QUESTIONS_FILE, question_bank.SNAPSHOT_FILE), cold, None),
+        ("question_bank.get_question", lambda: question_bank.get_question(
+            category, rng.randrange(question_bank.get_category_stats()[category]["questions"])),
+         repeat, None),
+        ("question_bank.sample_question_ids", lambda: question_bank.sample_question_ids(
+            category, 10, rng=rng), repeat, None),
+        ("database.get_all_categories", database.get_all_categories, repeat, None),
+        ("database.get_questions_by_category", lambda: database.get_questions_by_category(
+            category), cold, None),
+        ("database.sample_question_ids", lambda: database.sample_question_ids(
+            category, 10, rng=rng), repeat, None),
+        ("database.search_questions", lambda: database.search_questions(
+            f"question {rng.randrange(profile['questions'])}"), repeat, None),
+        ("database.search_questions[category]", lambda: database.search_questions(
+            "synthetic", category), repeat, None),
+        ("database.get_highscores", lambda: database.get_highscores(10), repeat, None),
+        ("database.get_highscores[category]", lambda: database.get_highscores(10, category),
+         repeat, None),
+        ("database.get_leaderboard_page", lambda: database.get_leaderboard_page(25),
+         repeat, None),
+        ("database.get_leaderboard_page[deep]", lambda: database.get_leaderboard_page(
+            25, after=deep_cursor), repeat, None),
+        ("database.get_window_leaderboard", lambda: database.get_window_leaderboard(
+            "week", 10, category), repeat, None),
+        ("database.get_score_stats", database.get_score_stats, repeat, None),
+        ("database.get_score_rank", lambda: database.get_score_rank(
+            rng.randint(0, 200), category), repeat, None),
+        ("database.get_player_rank", lambda: database.get_player_rank(
+            f"player{rng.randint(1, profile['users'])}"), repeat, None),
+        ("database.verify_user", lambda: database.verify_user(
+            f"player{rng.randint(1, profile['users'])}", "secret"), repeat, None),
+        ("database.save_score", lambda: database.save_score(
+            rng.randint(1, profile["users"]), category, rng.randint(0, 200), 5, 10), repeat, None),
+        ("highscores.export_scores", highscores.export_scores, repeat,
+         lambda: database.save_player_scores([("bench", category, rng.randint(0, 200), 5, 10)])),
+    ]
+
+    results = {}
+    for name, fn, runs, setup in cases:
+        results[name] = measure(fn, runs, setup)
+        print(f"{name:<40} {results[name]['median_ms']:>12.4f} ms", file=sys.stderr)
+    return results
+
+
+def check(results: dict, baseline: dict, threshold: float) -> list:
+    """Names of benchmarks whose median regressed by more than ``threshold``."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or before["median_ms"] <= 0:
+            continue
+        ratio = result["median_ms"] / before["median_ms"]
+        result["baseline_median_ms"] = before["median_ms"]
+        result["ratio"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=PROFILES, default="small")
+    parser.add_argument("--questions", type=int, help="override the profile's question count")
+    parser.add_argument("--scores", type=int, help="override the profile's score count")
+    parser.add_argument("--users", type=int, help="override the profile's user count")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true",
+                        help="compare against the baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before --check fails (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    profile = dict(PROFILES[args.profile])
+    for key in ("questions", "scores", "users"):
+        if getattr(args, key):
+            profile[key] = getattr(args, key)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_dataset(Path(tmp), profile, args.seed)
+        print(f"built {args.profile} dataset in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+        results = run_benchmarks(profile, args.repeat, args.seed)
+        database.close_pool()
+
+    report = {"profile": args.profile, "sizes": profile, "results": results}
+    status = 0
+    if args.check:
+        baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        if args.profile not in baselines:
+            parser.error(f"no {args.profile!r} baseline in {args.baseline}")
+        report["regressions"] = check(results, baselines[args.profile]["results"],
+                                      args.threshold)
+        status = 1 if report["regressions"] else 0
+    if args.save_baseline:
+        baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baselines[args.profile] = {"sizes": profile, "results": results}
+        args.baseline.write_text(json.dumps(baselines, indent=2) + "\n")
+
+    print(json.dumps(report, indent=2))
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Near-duplicate lookup latency and recall as the question bank grows.
+
+Fills a throw-away database with varied synthetic questions (random words,
+so that, unlike the templated bank in ``synthetic.py``, they are not near
+copies of each other), signs them with
+``database.index_question_signatures()`` and, at each size, times
+``database.find_similar_questions()`` for paraphrases of existing
+questions and for new ones. Recall is the share of paraphrases found. The
+last column times comparing one question with every signature in its
+category, the pairwise scan the LSH index replaces.
+
+    python benchmarks/bench_dedupe.py
+    python benchmarks/bench_dedupe.py --sizes 10000,100000,1000000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database  # noqa: E402
+import dedupe  # noqa: E402
+
+CATEGORIES = ["Netherlands Geography", "Dutch Culture & History", "Famous Dutch People"]
+SYLLABLES = ["ka", "ro", "mi", "ten", "dal", "ver", "hu", "zo", "lan", "bir", "ge", "stad",
+             "wa", "ter", "pol", "der", "min", "ho", "lo", "vel"]
+OPENERS = ["What is", "Which", "Who was", "Where is", "When did", "How many"]
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def make_question(rng: random.Random) -> tuple:
+    question = f"{rng.choice(OPENERS)} {' '.join(word(rng) for _ in range(rng.randint(6, 10)))}?"
+    return question, [" ".join(word(rng) for _ in range(rng.randint(1, 2))) for _ in range(4)]
+
+
+def paraphrase(question: str, options: list, rng: random.Random) -> tuple:
+    """Swap one word of the question and shuffle the options."""
+    words = question.rstrip("?").split()
+    words[rng.randrange(2, len(words))] = word(rng)
+    return " ".join(words) + "?", rng.sample(options, len(options))
+
+
+def grow_bank(target: int, rng: random.Random, samples: list):
+    """Append questions until the bank holds ``target``; keep a few as lookup samples."""
+    with database.connection() as conn:
+        current = conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        batch = []
+        for i in range(current, target):
+            category = CATEGORIES[i % len(CATEGORIES)]
+            question, options = make_question(rng)
+            if len(samples) < 200 and rng.random() < 0.01:
+                samples.append((category, question, options))
+            batch.append((database.question_key(category, question), category, question,
+                          database.json.dumps(options), 0, "medium", 10))
+            if len(batch) >= 50_000:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO questions (question_key, category, question, options, "
+                    "correct_index, difficulty, points) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                batch.clear()
+        if batch:
+            conn.executemany(
+                "INSERT OR IGNORE INTO questions (question_key, category, question, options, "
+                "correct_index, difficulty, points) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+
+
+def pairwise_scan(category: str, question: str, options: list) -> list:
+    sig = dedupe.signature(question, options)
+    with database.connection() as conn:
+        rows = conn.execute("""
+            SELECT s.question_id, s.signature FROM question_signatures s
+            JOIN questions q ON q.id = s.question_id WHERE q.category = ?
+        """, (category,)).fetchall()
+    return [row["question_id"] for row in rows
+            if dedupe.similarity(sig, dedupe.from_bytes(row["signature"])) >= dedupe.THRESHOLD]
+
+
+def median_ms(fn, calls: list) -> float:
+    samples = []
+    for args in calls:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma-separated question bank sizes")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database.close_pool()
+        database.DATABASE_PATH = Path(tmp) / "bench.db"
+        database.init_database()
+
+        print(f"{'questions':>10} {'sign (q/s)':>11} {'paraphrase (ms)':>16} {'new (ms)':>9} "
+              f"{'recall':>7} {'pairwise (ms)':>14}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            grow_bank(size, rng, samples)
+            start = time.perf_counter()
+            signed = database.index_question_signatures()
+            rate = signed / (time.perf_counter() - start)
+
+            picks = [rng.choice(samples) for _ in range(args.repeat)]
+            paraphrases = [(c, *paraphrase(q, o, rng)) for c, q, o in picks]
+            new = [(rng.choice(CATEGORIES), *make_question(rng)) for _ in range(args.repeat)]
+            found = sum(
+                any(m["question"] == q for m in database.find_similar_questions(c, *p[1:]))
+                for (c, q, _), p in zip(picks, paraphrases))
+            lookup = median_ms(database.find_similar_questions, paraphrases)
+            miss = median_ms(database.find_similar_questions, new)
+            scan = median_ms(pairwise_scan, paraphrases[:5])
+            print(f"{size:>10,} {rate:>11,.0f} {lookup:>16.3f} {miss:>9.3f} "
+                  f"{found / len(picks):>7.0%} {scan:>14.3f}")
+        database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Leaderboard read latency as the scores table grows.
+
+Fills a throw-away database with synthetic games and times
+``database.get_highscores()`` (served from the materialized top-N table)
+against the original ``ORDER BY score`` query, which now walks
+``idx_scores_keyset``, at each size.
+
+    python benchmarks/bench_leaderboard.py
+    python benchmarks/bench_leaderboard.py --sizes 10000,100000,1000000,10000000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database  # noqa: E402
+
+CATEGORIES = ["Netherlands Geography", "Dutch Culture & History", "Famous Dutch People"]
+
+LEGACY_QUERY = """
+    SELECT s.*, u.username
+    FROM scores s
+    JOIN users u ON s.user_id = u.id
+    ORDER BY s.score DESC
+    LIMIT ?
+"""
+
+INSERT_SCORE = """
+    INSERT INTO scores (user_id, player_name, category, score, correct_answers, total_questions)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def grow_scores(target: int, users: int, rng: random.Random):
+    """Append synthetic games until the scores table holds ``target`` rows."""
+    with database.connection() as conn:
+        current = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        batch = []
+        for _ in range(target - current):
+            total = 5
+            correct = rng.randint(0, total)
+            user_id = rng.randint(1, users)
+            batch.append((user_id, f"player{user_id}", rng.choice(CATEGORIES),
+                          correct * rng.choice((10, 15, 20)), correct, total))
+            if len(batch) >= 50_000:
+                conn.executemany(INSERT_SCORE, batch)
+                batch.clear()
+        if batch:
+            conn.executemany(INSERT_SCORE, batch)
+
+
+def time_call(fn, repeat: int) -> float:
+    """Median wall time of ``fn()`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def legacy_highscores(limit: int):
+    with database.connection() as conn:
+        return conn.execute(LEGACY_QUERY, (limit,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma-separated scores table sizes")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.close_pool()
+        database.DATABASE_PATH = Path(tmp) / "bench.db"
+        with database.connection() as conn:
+            conn.executemany(
+                "INSERT INTO users (username, password_hash) VALUES (?, '')",
+                [(f"player{i}",) for i in range(1, args.users + 1)])
+
+        print(f"{'rows':>12} {'top-N (ms)':>12} {'category (ms)':>14} {'index scan (ms)':>16}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            grow_scores(size, args.users, rng)
+            database.rebuild_leaderboards()
+            top = time_call(lambda: database.get_highscores(args.limit), args.repeat)
+            cat = time_call(lambda: database.get_highscores(args.limit, CATEGORIES[0]), args.repeat)
+            legacy = time_call(lambda: legacy_highscores(args.limit), max(3, args.repeat // 10))
+            print(f"{size:>12,} {top:>12.3f} {cat:>14.3f} {legacy:>16.3f}")
+        database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Bytes of quiz state held per active session, before and after GameState.
+
+"Before" is the old layout: loose ``st.session_state`` keys plus the
+session's own copy of every question in the category (what ``json.load``
+per session produced). "After" is a ``GameState`` holding only question
+ids and answers; the shared question bank is counted once, not per session.
+
+    python benchmarks/bench_session_memory.py --category-size 10000 --round 10
+"""
+
+import argparse
+import copy
+import pickle
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from game_state import GameState  # noqa: E402
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    """Approximate memory of ``obj`` and everything it references."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen)
+                    for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+def synthetic_category(n: int, rng: random.Random) -> list:
+    return [
+        {
+            "id": i,
+            "question": f"Synthetic question number {i} about the Netherlands?",
+            "options": [f"Option {j} for {i}" for j in range(4)],
+            "correct": rng.randrange(4),
+            "difficulty": rng.choice(["easy", "medium", "hard"]),
+            "points": rng.choice([10, 15, 20]),
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_state(category: list) -> dict:
+    """Session state as the Quiz page used to keep it, mid-round."""
+    questions = copy.deepcopy(category)  # every session parsed its own copy
+    random.shuffle(questions)
+    return {
+        "player_name": "Player",
+        "selected_category": "Synthetic",
+        "game_active": True,
+        "current_question_index": 3,
+        "score": 45,
+        "correct_answers": 3,
+        "questions": questions,
+        "answered_current": False,
+        "selected_answer": None,
+        "show_result": False,
+        "current_streak": 3,
+        "multiplier": 1.5,
+        "combo_messages": [],
+    }
+
+
+def compact_state(category: list, round_size: int) -> dict:
+    """Session state with a GameState, mid-round."""
+    game = GameState.new("Synthetic", random.sample(range(len(category)), round_size))
+    for choice in (1, 2, 0):
+        game.answers[game.current] = choice + 1
+        game.current += 1
+    game.score, game.correct, game.streak, game.multiplier = 45, 3, 3, 1.5
+    return {
+        "player_name": "Player",
+        "selected_category": "Synthetic",
+        "game_active": True,
+        "game": game,
+        "show_result": False,
+        "questions_per_round": round_size,
+        "balanced_difficulty": False,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--category-size", type=int, default=1000)
+    parser.add_argument("--round", type=int, default=10)
+    args = parser.parse_args()
+
+    category = synthetic_category(args.category_size, random.Random(7))
+    before = legacy_state(category)
+    after = compact_state(category, min(args.round, len(category)))
+
+    rows = [
+        ("before (loose keys + question copies)", before),
+        ("after (GameState, shared bank)", after),
+    ]
+    print(f"category size {args.category_size:,}, round of {args.round}")
+    print(f"{'layout':<40} {'bytes/session':>14} {'pickled':>10}")
+    for label, state in rows:
+        print(f"{label:<40} {deep_sizeof(state):>14,} {len(pickle.dumps(state)):>10,}")
+    print(f"{'shared bank (once per process)':<40} {deep_sizeof(category):>14,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Headless concurrent-session load test for the quiz app.
+
+Each simulated player is its own Streamlit ``AppTest`` session. It opens
+``Home.py``, enters a name, picks a category, plays every question on the
+Quiz page and then opens the Highscores page. Concurrent players run in
+separate worker processes sharing one data directory: ``AppTest`` is not
+safe to drive from several threads of one process (session state and the
+script parser leak between them), so this measures several app processes
+contending for the same SQLite database and highscore log.
+
+For each concurrency level the tool prints JSON with per-page rerun latency
+percentiles, script-thread CPU time and payload size (the bytes of the
+messages a rerun sends to the browser), answers per second and error
+counts. Answer and next-question clicks are reported separately as
+"Quiz answer"; on the Quiz page they only rerun the round's fragments.
+
+    python benchmarks/loadtest.py --players 40 --concurrency 1,10,40
+    python benchmarks/loadtest.py --players 100 --concurrency 50 --output load.json
+
+The run uses a temporary copy of the data directory (question bank,
+database, highscore log) unless ``--keep-data`` is given. A page that does
+not compile stops the run before it starts, and a rerun that renders
+nothing is reported with its real cause, not as a missing widget.
+"""
+
+import argparse
+import json
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner  # noqa: E402
+
+import database  # noqa: E402
+import question_bank  # noqa: E402
+import score_writer  # noqa: E402
+import synthetic  # noqa: E402
+
+HOME = str(ROOT / "Home.py")
+QUIZ_PAGE = "pages/1_🎮_Quiz.py"
+HIGHSCORES_PAGE = "pages/2_🏆_Highscores.py"
+SCRIPTS = {  # reported page -> script it runs
+    "Home": HOME,
+    "Quiz": str(ROOT / QUIZ_PAGE),
+    "Quiz answer": str(ROOT / QUIZ_PAGE),
+    "Highscores": str(ROOT / HIGHSCORES_PAGE),
+}
+
+START_LABEL = re.compile(r"start", re.IGNORECASE)
+NEXT_LABEL = re.compile(r"next|finish|result", re.IGNORECASE)
+
+
+class PlayerError(Exception):
+    """The simulated player could not continue."""
+
+
+def compile_error(script: str):
+    """The SyntaxError that stops ``script`` from running, as text, or None.
+
+    Streamlit logs a script that does not compile and renders an empty
+    page; ``AppTest.exception`` stays empty.
+    """
+    try:
+        compile(Path(script).read_text(encoding="utf-8"), script, "exec")
+    except SyntaxError as e:
+        return f"{Path(e.filename).name}:{e.lineno}: SyntaxError: {e.msg}"
+    return None
+
+
+_last_run = threading.local()
+
+
+class MeasuringScriptRunner(local_script_runner.LocalScriptRunner):
+    """AppTest's script runner, also recording CPU time and payload per rerun."""
+
+    def _run_script_thread(self):
+        start = time.thread_time()
+        try:
+            super()._run_script_thread()
+        finally:
+            self.cpu_time = time.thread_time() - start
+
+    def run(self, *args, **kwargs):
+        try:
+            return super().run(*args, **kwargs)
+        finally:
+            _last_run.cpu_time = getattr(self, "cpu_time", 0.0)
+            _last_run.payload = sum(msg.ByteSize() for msg in self.forward_msgs())
+
+
+# AppTest builds a fresh runner for every run(); have it build ours.
+app_test.LocalScriptRunner = MeasuringScriptRunner
+
+
+class Recorder:
+    """Rerun timings and errors of the players run by one process."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.cpu_times = defaultdict(list)
+        self.payloads = defaultdict(list)
+        self.errors = Counter()
+        self.answers = 0
+
+    def rerun(self, page: str, at: AppTest):
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        self.latencies[page].append(elapsed)
+        self.cpu_times[page].append(_last_run.cpu_time)
+        self.payloads[page].append(_last_run.payload)
+        if at.exception:
+            raise PlayerError(f"{page}: {at.exception[0].message}")
+        if not at.main.children:
+            raise PlayerError(f"{page}: {compile_error(SCRIPTS[page]) or 'rerun rendered nothing'}")
+
+    def error(self, kind: str):
+        self.errors[kind] += 1
+
+    def answered(self):
+        self.answers += 1
+
+    def as_dict(self) -> dict:
+        """Plain data, to send back from a worker process."""
+        return {"latencies": dict(self.latencies), "cpu_times": dict(self.cpu_times),
+                "payloads": dict(self.payloads), "errors": dict(self.errors),
+                "answers": self.answers}
+
+    def merge(self, other: dict):
+        for page in other["latencies"]:
+            self.latencies[page] += other["latencies"][page]
+            self.cpu_times[page] += other["cpu_times"][page]
+            self.payloads[page] += other["payloads"][page]
+        self.errors.update(other["errors"])
+        self.answers += other["answers"]
+
+
+def find_button(at: AppTest, pattern):
+    for button in at.button:
+        if pattern.search(button.label or ""):
+            return button
+    return None
+
+
+def play(player: int, rec: Recorder, timeout: float, rng: random.Random):
+    """Run one player's whole visit."""
+    at = AppTest.from_file(HOME, default_timeout=timeout)
+    rec.rerun("Home", at)
+
+    at.text_input[0].input(f"loadtest-{player}")
+    rec.rerun("Home", at)
+    categories = [b for b in at.button if (b.key or "").startswith("cat_")]
+    if not categories:
+        raise PlayerError("Home: no category buttons")
+    rng.choice(categories).click()
+    rec.rerun("Home", at)
+
+    at.switch_page(QUIZ_PAGE)
+    rec.rerun("Quiz", at)
+    start = find_button(at, START_LABEL)
+    if start is None:
+        raise PlayerError("Quiz: no start button")
+    start.click()
+    rec.rerun("Quiz", at)
+
+    while not at.session_state["show_result"]:
+        options = [b for b in at.button if (b.key or "").startswith("opt_")]
+        if not options:
+            raise PlayerError("Quiz: no answer buttons")
+        rng.choice(options).click()
+        rec.rerun("Quiz answer", at)
+        rec.answered()
+
+        advance = find_button(at, NEXT_LABEL)
+        if advance is None:
+            raise PlayerError("Quiz: no next-question button")
+        advance.click()
+        rec.rerun("Quiz answer", at)
+
+    at.switch_page(HIGHSCORES_PAGE)
+    rec.rerun("Highscores", at)
+
+
+def percentiles(samples: list, cpu_times: list, payloads: list) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pct(50), 2),
+        "p90_ms": round(pct(90), 2),
+        "p99_ms": round(pct(99), 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+        "cpu_mean_ms": round(sum(cpu_times) / len(cpu_times) * 1000, 2),
+        "payload_mean_bytes": round(sum(payloads) / len(payloads)),
+    }
+
+
+def play_one(player: int, timeout: float, seed: int) -> dict:
+    """One player's visit in a worker process; returns what it recorded."""
+    rec = Recorder()
+    main_module = sys.modules["__main__"]
+    try:
+        play(player, rec, timeout, random.Random(seed + player))
+    except PlayerError as e:
+        rec.error(str(e)[:120])
+    except Exception as e:  # crash inside the harness or AppTest
+        rec.error(f"{type(e).__name__}: {str(e)[:80]}")
+    finally:
+        # AppTest installs the page script as __main__; the pool needs ours back
+        sys.modules["__main__"] = main_module
+    # Worker processes exit without running atexit handlers
+    score_writer.flush()
+    return rec.as_dict()
+
+
+def run_level(players: int, concurrency: int, timeout: float, seed: int, data_dir) -> dict:
+    rec = Recorder()
+    start = time.perf_counter()
+    # Without a data directory the workers use the real one
+    isolate = {"initializer": synthetic.use_data_dir, "initargs": (data_dir,)} if data_dir else {}
+    with ProcessPoolExecutor(max_workers=concurrency, **isolate) as pool:
+        futures = [pool.submit(play_one, player, timeout, seed) for player in range(players)]
+        for future in futures:
+            rec.merge(future.result())
+    wall = time.perf_counter() - start
+
+    return {
+        "players": players,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "answers": rec.answers,
+        "answers_per_s": round(rec.answers / wall, 2) if wall else 0.0,
+        "pages": {
+            page: percentiles(samples, rec.cpu_times[page], rec.payloads[page])
+            for page, samples in rec.latencies.items()
+        },
+        "errors": dict(rec.errors),
+        "error_count": sum(rec.errors.values()),
+    }
+
+
+def isolate_data(directory: Path):
+    """Prepare a copy of the data in ``directory`` for the players to use.
+
+    The question bank is copied (its snapshot is compiled there), and every
+    write (scores, answer events, ratings) goes to the temporary database
+    and highscore log.
+    """
+    shutil.copy(question_bank.QUESTIONS_FILE, directory / "questions.json")
+    synthetic.use_data_dir(directory)
+    database.init_database()
+    question_bank.load_questions()
+    database.close_pool()  # workers open their own connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=20, help="players per level")
+    parser.add_argument("--concurrency", default="1,5,20",
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per rerun")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--keep-data", action="store_true",
+                        help="write scores to the real data directory")
+    args = parser.parse_args()
+
+    broken = [error for error in map(compile_error, sorted(set(SCRIPTS.values()))) if error]
+    if broken:
+        parser.exit(1, "cannot load test, pages do not compile:\n  " + "\n  ".join(broken) + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = None if args.keep_data else Path(tmp)
+        if data_dir:
+            isolate_data(data_dir)
+        levels = [int(c) for c in args.concurrency.split(",")]
+        report = {
+            "levels": [run_level(args.players, c, args.timeout, args.seed, data_dir)
+                       for c in levels],
+        }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
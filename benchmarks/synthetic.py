@@ -0,0 +1,119 @@
+"""Synthetic question banks, users and score histories for the benchmarks."""
+
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database  # noqa: E402
+import highscores  # noqa: E402
+import question_bank  # noqa: E402
+
+DIFFICULTY_POINTS = {"easy": 10, "medium": 15, "hard": 20}
+BATCH = 50_000
+
+
+def category_names(n: int) -> list:
+    return [f"Synthetic Category {i}" for i in range(n)]
+
+
+def make_question(i: int, rng: random.Random) -> dict:
+    difficulty = rng.choice(list(DIFFICULTY_POINTS))
+    return {
+        "id": i,
+        "question": f"Synthetic question {i}: which option is number {i % 4}?",
+        "options": [f"Answer {j} to question {i}" for j in range(4)],
+        "correct": i % 4,
+        "difficulty": difficulty,
+        "points": DIFFICULTY_POINTS[difficulty],
+    }
+
+
+def write_question_file(path: Path, questions: int, categories: int, rng: random.Random):
+    """Write a questions.json-shaped file without holding it all in memory."""
+    names = category_names(categories)
+    per_category = max(1, questions // categories)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"categories": {')
+        for c, name in enumerate(names):
+            f.write(("," if c else "") + json.dumps(name) + ": [")
+            for i in range(per_category):
+                f.write(("," if i else "") + json.dumps(make_question(c * per_category + i, rng)))
+            f.write("]")
+        f.write("}}")
+
+
+def _insert_batches(conn, sql: str, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(sql, batch)
+
+
+def fill_users(conn, users: int):
+    """Users player1..playerN, all with the password 'secret'."""
+    password_hash = database.hash_password("secret")
+    _insert_batches(conn, "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                    ((f"player{i}", password_hash) for i in range(1, users + 1)))
+
+
+def fill_questions(conn, questions: int, categories: int, rng: random.Random):
+    names = category_names(categories)
+
+    def rows():
+        for i in range(questions):
+            q = make_question(i, rng)
+            category = names[i % categories]
+            yield (database.question_key(category, q["question"]), category, q["question"],
+                   json.dumps(q["options"]), q["correct"], q["difficulty"], q["points"])
+
+    _insert_batches(conn, """
+        INSERT INTO questions
+        (question_key, category, question, options, correct_index, difficulty, points)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows())
+
+
+def fill_scores(conn, scores: int, users: int, categories: int, rng: random.Random):
+    """Append ``scores`` games straight into the scores table.
+
+    This bypasses save_score(), so call database.rebuild_leaderboards()
+    afterwards.
+    """
+    names = category_names(categories)
+
+    def rows():
+        for _ in range(scores):
+            total = 10
+            correct = rng.randint(0, total)
+            day = rng.randint(1, 28)
+            user_id = rng.randint(1, users)
+            yield (user_id, f"player{user_id}", rng.choice(names),
+                   correct * rng.choice((10, 15, 20)), correct, total,
+                   f"2026-{rng.randint(1, 9):02d}-{day:02d} 12:00:00")
+
+    _insert_batches(conn, """
+        INSERT INTO scores
+        (user_id, player_name, category, score, correct_answers, total_questions, played_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows())
+
+
+def use_data_dir(directory: Path):
+    """Point every data module of this process at ``directory``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    database.close_pool()
+    database.DATABASE_PATH = directory / "quizmaster.db"
+    highscores.DATA_DIR = directory
+    highscores.HIGHSCORES_FILE = directory / "highscores.json"
+    highscores.ARCHIVE_DIR = directory / "highscores-archive"
+    highscores.LOCK_FILE = directory / "highscores.lock"
+    question_bank.DATA_DIR = directory
+    question_bank.QUESTIONS_FILE = directory / "questions.json"
+    question_bank.SNAPSHOT_FILE = directory / "questions.qbin"
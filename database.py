@@ -1,62 +1,222 @@
 import sqlite3
 from pathlib import Path
+import base64
 import hashlib
-from datetime import datetime
+import json
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+import dedupe
+from migrations import apply_migrations
+import metrics
+import profiling
+from sampling import allocate_stratified, locate, sample_positions
 
 DATABASE_PATH = Path(__file__).parent / "data" / "quizmaster.db"
 
+# Connection pool settings
+POOL_SIZE = 8
+POOL_TIMEOUT = 10.0          # seconds to wait for a free connection
+BUSY_TIMEOUT_MS = 5000       # how long SQLite retries a locked database
+CACHE_SIZE_KB = 16000        # page cache per connection (~16 MB)
+STATEMENT_CACHE_SIZE = 256   # prepared statements kept per connection
+
+# Rows kept per scope in the materialized leaderboard_top table (see
+# migration 2). The empty scope '' holds the global leaderboard.
+LEADERBOARD_SIZE = 100
+GLOBAL_SCOPE = ""
+
+# Time-windowed leaderboards (leaderboard_window, migration 8) and how long
+# each kind of window is kept before expire_leaderboard_windows() drops it.
+WINDOW_PERIODS = ("day", "week", "month")
+WINDOW_RETENTION = {"day": timedelta(days=14), "week": timedelta(weeks=8),
+                    "month": timedelta(days=366)}
+_WINDOW_START_SQL = {  # SQLite equivalents of window_start()
+    "day": "date(played_at)",
+    "week": "date(played_at, 'weekday 0', '-6 days')",
+    "month": "date(played_at, 'start of month')",
+}
+
 def get_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    """Open a new, tuned database connection.
+
+    Most code should use ``connection()`` instead, which borrows one of the
+    pooled connections rather than opening a fresh one.
+    """
+    conn = sqlite3.connect(
+        DATABASE_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,  # pooled connections move between threads
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
     return conn
 
-def init_database():
-    """Create all tables if they don't exist."""
+class ConnectionPool:
+    """A bounded pool of SQLite connections with wait/query statistics."""
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "acquired": 0,
+            "created": 0,
+            "wait_total_s": 0.0,
+            "wait_max_s": 0.0,
+            "queries": 0,
+            "query_total_s": 0.0,
+            "query_max_s": 0.0,
+        }
+
+    def _acquire(self):
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    self._stats["created"] += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = get_connection()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=POOL_TIMEOUT)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"no database connection available after {POOL_TIMEOUT}s"
+                    ) from None
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["wait_total_s"] += waited
+            self._stats["wait_max_s"] = max(self._stats["wait_max_s"], waited)
+        return conn
+
+    def _release(self, conn):
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commit on success, roll back on error."""
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def record_query(self, elapsed: float):
+        with self._lock:
+            self._stats["queries"] += 1
+            self._stats["query_total_s"] += elapsed
+            self._stats["query_max_s"] = max(self._stats["query_max_s"], elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pool_size"] = self.size
+        stats["open"] = self._created
+        stats["idle"] = self._idle.qsize()
+        stats["wait_avg_s"] = stats["wait_total_s"] / stats["acquired"] if stats["acquired"] else 0.0
+        stats["query_avg_s"] = stats["query_total_s"] / stats["queries"] if stats["queries"] else 0.0
+        return stats
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use.
+
+    Schema migrations run once, just before the pool is created, instead of
+    on every import of this module.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                init_database()
+                _pool = ConnectionPool()
+    return _pool
+
+def close_pool():
+    """Close pooled connections (e.g. after changing DATABASE_PATH)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def connection():
+    """Borrow a pooled connection as a context manager (one transaction)."""
+    return get_pool().connection()
+
+def execute(conn, sql: str, params=()):
+    """Execute a statement on ``conn`` and record its duration."""
+    start = time.perf_counter()
+    cursor = conn.execute(sql, params)
+    elapsed = time.perf_counter() - start
+    get_pool().record_query(elapsed)
+    metrics.DB_QUERY_SECONDS.observe(elapsed)
+    profiling.record("sql", elapsed)
+    return cursor
+
+def query(conn, sql: str, params=()) -> list:
+    """Run a SELECT on ``conn`` and return all rows, recording its duration."""
+    start = time.perf_counter()
+    rows = conn.execute(sql, params).fetchall()
+    elapsed = time.perf_counter() - start
+    get_pool().record_query(elapsed)
+    metrics.DB_QUERY_SECONDS.observe(elapsed)
+    profiling.record("sql", elapsed)
+    return rows
+
+def get_db_stats() -> dict:
+    """Return pool-wait and query-time statistics for this process."""
+    return get_pool().stats()
+
+def init_database() -> list:
+    """Apply pending schema migrations. Returns the versions applied."""
     conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            is_admin BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Questions table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            category TEXT NOT NULL,
-            question TEXT NOT NULL,
-            options TEXT NOT NULL,
-            correct_index INTEGER NOT NULL,
-            difficulty TEXT DEFAULT 'medium',
-            points INTEGER DEFAULT 10,
-            created_by INTEGER REFERENCES users(id),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Scores table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS scores (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER REFERENCES users(id),
-            category TEXT,
-            score INTEGER,
-            correct_answers INTEGER,
-            total_questions INTEGER,
-            played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    try:
+        return apply_migrations(conn)
+    finally:
+        conn.close()
 
 def hash_password(password: str) -> str:
     """Hash a password using SHA-256."""
@@ -64,118 +224,922 @@ def hash_password(password: str) -> str:
 
 def create_user(username: str, password: str, is_admin: bool = False) -> bool:
     """Create a new user. Returns True if successful."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute(
-            "INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)",
-            (username, hash_password(password), is_admin)
-        )
-        conn.commit()
+        with connection() as conn:
+            execute(
+                conn,
+                "INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)",
+                (username, hash_password(password), is_admin)
+            )
         return True
     except sqlite3.IntegrityError:
         return False  # Username already exists
-    finally:
-        conn.close()
 
 def verify_user(username: str, password: str):
     """Verify username and password. Returns user dict or None."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT * FROM users WHERE username = ? AND password_hash = ?",
-        (username, hash_password(password))
-    )
-    
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        rows = query(
+            conn,
+            "SELECT * FROM users WHERE username = ? AND password_hash = ?",
+            (username, hash_password(password))
+        )
     
-    if row:
-        return dict(row)
+    if rows:
+        return dict(rows[0])
     return None
 
 def get_questions_by_category(category: str) -> list:
     """Get all questions for a category."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        rows = query(
+            conn,
+            "SELECT * FROM questions WHERE category = ?",
+            (category,)
+        )
     
-    cursor.execute(
-        "SELECT * FROM questions WHERE category = ?",
-        (category,)
-    )
+    return [dict(row) for row in rows]
+
+def get_questions_by_ids(question_ids: list) -> list:
+    """Get questions by ID, in the order given (unknown IDs are skipped)."""
+    if not question_ids:
+        return []
+    with connection() as conn:
+        placeholders = ",".join("?" * len(question_ids))
+        rows = query(conn, f"SELECT * FROM questions WHERE id IN ({placeholders})",
+                     tuple(question_ids))
     
-    rows = cursor.fetchall()
-    conn.close()
+    by_id = {row["id"]: dict(row) for row in rows}
+    return [by_id[qid] for qid in question_ids if qid in by_id]
+
+def sample_question_ids(category: str, k: int, stratify: bool = False, rng=random) -> list:
+    """Draw ``k`` distinct question IDs from a category uniformly at random.
+
+    Stratum sizes come from ``category_stats``. Every question has a dense
+    position within its (category, difficulty) stratum (``stratum_pos``,
+    kept gap-free by triggers), so each draw is one seek in
+    ``idx_questions_stratum``: O(k log n) for the round, and no question
+    rows are loaded. With ``stratify=True`` the round mirrors the
+    category's difficulty mix.
+    """
+    with connection() as conn:
+        rows = query(conn, """
+            SELECT difficulty, question_count FROM category_stats
+            WHERE category = ?
+            ORDER BY difficulty
+        """, (category,))
+        counts = {row["difficulty"]: row["question_count"] for row in rows}
+        strata = list(counts)
+
+        if stratify:
+            picks = []
+            for difficulty, count in allocate_stratified(counts, k).items():
+                picks.extend((difficulty, position)
+                             for position in sample_positions(counts[difficulty], count, rng))
+        else:
+            sizes = [counts[d] for d in strata]
+            picks = []
+            for offset in sample_positions(sum(sizes), k, rng):
+                i, local = locate(offset, sizes)
+                picks.append((strata[i], local))
+
+        ids = []
+        for difficulty, position in picks:
+            # category_stats files NULL difficulties under 'unknown', like the index
+            found = query(conn, """
+                SELECT id FROM questions
+                WHERE category = ? AND COALESCE(difficulty, 'unknown') = ? AND stratum_pos = ?
+            """, (category, difficulty, position))
+            if found:
+                ids.append(found[0]["id"])
     
-    return [dict(row) for row in rows]
+    rng.shuffle(ids)
+    return ids
 
 def get_all_categories() -> list:
     """Get list of all unique categories."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT DISTINCT category FROM questions")
-    
-    rows = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = query(conn, "SELECT DISTINCT category FROM category_stats ORDER BY category")
     
     return [row["category"] for row in rows]
 
+def get_category_stats() -> dict:
+    """Get question count, difficulty histogram, total points and last change per category.
+
+    Served from the trigger-maintained ``category_stats`` table, so the cost
+    depends on the number of categories, not the number of questions.
+    """
+    with connection() as conn:
+        rows = query(conn, """
+            SELECT category, difficulty, question_count, total_points, updated_at
+            FROM category_stats
+            ORDER BY category
+        """)
+    
+    stats = {}
+    for row in rows:
+        entry = stats.setdefault(row["category"], {
+            "questions": 0, "difficulties": {}, "total_points": 0, "updated_at": None
+        })
+        entry["questions"] += row["question_count"]
+        entry["total_points"] += row["total_points"]
+        entry["difficulties"][row["difficulty"]] = row["question_count"]
+        entry["updated_at"] = max(entry["updated_at"] or "", row["updated_at"] or "") or None
+    return stats
+
+def question_key(category: str, question: str) -> str:
+    """Stable key identifying a question within its category.
+
+    Whitespace and letter case in the question text do not change the key.
+    """
+    text = " ".join(question.split()).casefold()
+    return hashlib.sha1(f"{category}\x1f{text}".encode("utf-8")).hexdigest()
+
 def add_question(category: str, question: str, options: list, 
                  correct_index: int, difficulty: str = "medium",
                  points: int = 10, created_by: int = None) -> int:
-    """Add a new question. Returns the new question ID."""
-    import json
+    """Add a new question. Returns the new question ID.
+
+    Raises ``sqlite3.IntegrityError`` if the category already has the same
+    question (see ``question_key()``).
+    """
+    with connection() as conn:
+        cursor = execute(conn, """
+            INSERT INTO questions 
+            (question_key, category, question, options, correct_index, difficulty, points, created_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (question_key(category, question), category, question,
+              json.dumps(options, ensure_ascii=False),
+              correct_index, difficulty, points, created_by))
+        question_id = cursor.lastrowid
+        store_signatures(conn, [(question_id, category, dedupe.signature(question, options))])
     
-    conn = get_connection()
-    cursor = conn.cursor()
+    return question_id
+
+def remove_question(question_id: int) -> bool:
+    """Delete a question. Returns True if it existed."""
+    with connection() as conn:
+        cursor = execute(conn, "DELETE FROM questions WHERE id = ?", (question_id,))
+        return cursor.rowcount > 0
+
+SIGNATURE_BATCH = 5_000  # questions signed per transaction when backfilling
+
+def store_signatures(conn, signed: list):
+    """Record MinHash signatures and LSH buckets (see dedupe.py).
+
+    ``signed`` holds ``(question_id, category, signature)`` tuples. The
+    bucket rows are inserted in key order, which is much faster than
+    inserting each question's 16 random keys on their own.
+    """
+    if not signed:
+        return
+    ids = [question_id for question_id, _, _ in signed]
+    conn.executemany("DELETE FROM question_lsh WHERE question_id = ?", [(i,) for i in ids])
+    conn.executemany("INSERT OR REPLACE INTO question_signatures (question_id, signature) VALUES (?, ?)",
+                     [(question_id, dedupe.to_bytes(sig)) for question_id, _, sig in signed])
+    conn.executemany("INSERT OR IGNORE INTO question_lsh (bucket, question_id) VALUES (?, ?)",
+                     dedupe.bucket_rows(signed))
+
+def similar_questions(conn, category: str, sig, threshold: float = dedupe.THRESHOLD,
+                      exclude_key: str = None, keys: list = None) -> list:
+    """Indexed questions in ``category`` whose signature is within ``threshold`` of ``sig``.
+
+    Only questions sharing an LSH bucket are compared, so the cost depends
+    on the number of near matches, not on the size of the bank. The
+    question with ``question_key == exclude_key`` (the one being updated)
+    is skipped. Pass ``keys`` if the buckets are already known. Best match
+    first.
+    """
+    if keys is None:
+        keys = dedupe.band_keys(category, sig)
+    rows = query(conn, f"""
+        SELECT q.id, q.question_key, q.question, s.signature
+        FROM (SELECT DISTINCT question_id FROM question_lsh
+              WHERE bucket IN ({",".join("?" * len(keys))})) c
+        JOIN question_signatures s ON s.question_id = c.question_id
+        JOIN questions q ON q.id = c.question_id
+        WHERE q.category = ?
+    """, (*keys, category))
+    matches = []
+    for row in rows:
+        if row["question_key"] == exclude_key:
+            continue
+        score = dedupe.similarity(sig, dedupe.from_bytes(row["signature"]))
+        if score >= threshold:
+            matches.append({"id": row["id"], "question": row["question"], "similarity": score})
+    return sorted(matches, key=lambda m: (-m["similarity"], m["id"]))
+
+def find_similar_questions(category: str, question: str, options: list,
+                           threshold: float = dedupe.THRESHOLD) -> list:
+    """Existing questions that look like near-duplicates of a new one.
+
+    Returns ``[{"id", "question", "similarity"}, ...]``, best match first;
+    check this before ``add_question()``.
+    """
+    with connection() as conn:
+        return similar_questions(conn, category, dedupe.signature(question, options), threshold,
+                                 exclude_key=question_key(category, question))
+
+def index_question_signatures(progress=None) -> int:
+    """Sign every question that has no signature yet. Returns how many were signed.
+
+    Questions written with plain SQL (or edited, which drops the old
+    signature) are picked up here; ``add_question()`` and the importer sign
+    as they go. ``progress`` is called with the running count per batch.
+    """
+    signed, last_id = 0, 0
+    while True:
+        with connection() as conn:
+            rows = query(conn, """
+                SELECT q.id, q.category, q.question, q.options FROM questions q
+                LEFT JOIN question_signatures s ON s.question_id = q.id
+                WHERE q.id > ? AND s.question_id IS NULL
+                ORDER BY q.id LIMIT ?
+            """, (last_id, SIGNATURE_BATCH))
+            sigs = dedupe.signatures([(row["question"], json.loads(row["options"])) for row in rows])
+            store_signatures(conn, [(row["id"], row["category"], sig) for row, sig in zip(rows, sigs)])
+        if not rows:
+            return signed
+        signed += len(rows)
+        last_id = rows[-1]["id"]
+        if progress:
+            progress(signed)
+
+def get_duplicate_clusters(threshold: float = dedupe.THRESHOLD) -> list:
+    """Groups of near-duplicate questions across the whole bank.
+
+    Signs any unsigned questions first, then only compares questions that
+    share an LSH bucket. Returns a list of clusters, each a list of
+    question dicts (``id``, ``category``, ``question``) ordered by ID.
+    """
+    index_question_signatures()
+    with connection() as conn:
+        rows = query(conn, """
+            SELECT l.bucket, q.category, l.question_id FROM question_lsh l
+            JOIN questions q ON q.id = l.question_id
+            WHERE l.bucket IN (SELECT bucket FROM question_lsh GROUP BY bucket HAVING COUNT(*) > 1)
+            ORDER BY l.bucket, q.category, l.question_id
+        """)
+        signatures, questions = {}, {}
+
+        def signature_of(question_id):
+            if question_id not in signatures:
+                row = conn.execute("""
+                    SELECT s.signature, q.category, q.question FROM question_signatures s
+                    JOIN questions q ON q.id = s.question_id WHERE s.question_id = ?
+                """, (question_id,)).fetchone()
+                signatures[question_id] = dedupe.from_bytes(row["signature"])
+                questions[question_id] = {"id": question_id, "category": row["category"],
+                                          "question": row["question"]}
+            return signatures[question_id]
+
+        # A bucket is per category; grouping by category as well guards
+        # against two categories' buckets colliding.
+        buckets = ([row["question_id"] for row in group]
+                   for _, group in groupby(rows, key=lambda row: (row["bucket"], row["category"])))
+        clusters = dedupe.cluster(buckets, signature_of, threshold)
     
-    cursor.execute("""
-        INSERT INTO questions 
-        (category, question, options, correct_index, difficulty, points, created_by)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (category, question, json.dumps(options), correct_index, 
-          difficulty, points, created_by))
+    return [[questions[qid] for qid in cluster] for cluster in clusters]
+
+# Wrapped around matched words in search results; the caller decides how
+# to show them (they survive html.escape()).
+MARK_START, MARK_END = "\x02", "\x03"
+SEARCH_CANDIDATES = 200  # matches ranked per search
+INDEXED_PREFIX = 3       # questions_fts keeps prefix indexes up to this length
+
+def _fts_query(words: list, prefix: bool) -> str:
+    """FTS5 query matching rows that contain every word (the last one as a prefix)."""
+    terms = [f'"{word}"' for word in words]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def _search_candidates(conn, match: str, category: str = None) -> list:
+    # The unary + keeps SQLite from driving the join from the category index
+    # (one full-text probe per question in the category).
+    category_filter = "AND +q.category = ?" if category else ""
+    params = [MARK_START, MARK_END, MARK_START, MARK_END, match]
+    if category:
+        params.append(category)
+    params.append(SEARCH_CANDIDATES)
+    return query(conn, f"""
+        SELECT q.id, q.category, q.question, q.options, q.correct_index,
+               q.difficulty, q.points,
+               highlight(questions_fts, 0, ?, ?) AS question_marked,
+               highlight(questions_fts, 1, ?, ?) AS options_marked
+        FROM questions_fts
+        JOIN questions q ON q.id = questions_fts.rowid
+        WHERE questions_fts MATCH ? {category_filter}
+        LIMIT ?
+    """, params)
+
+def search_questions(text: str, category: str = None, limit: int = 20,
+                     offset: int = 0) -> dict:
+    """Full-text search over question text and options, best match first.
+
+    Every word of ``text`` has to occur; the last one may be a prefix of a
+    longer word (search as you type). At most ``SEARCH_CANDIDATES`` matches
+    are read from the index and ranked: a matched word in the question counts
+    ten times as much as one in the options, and shorter questions win ties.
+    (FTS5's bm25() would have to count the rows of every term in the whole
+    index on each search, which at a million questions costs far more than
+    the search itself.)
+
+    Returns ``{"rows": [...], "has_more": bool, "capped": bool}``; each row
+    is a question dict with ``options`` decoded plus ``question_marked`` and
+    ``options_marked``, where matches are wrapped in MARK_START/MARK_END.
+    ``capped`` means there were more matches than were ranked.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return {"rows": [], "has_more": False, "capped": False}
     
-    question_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        rows = []
+        # Prefix queries beyond the indexed lengths merge the doclists of every
+        # matching word, so try the word as typed first.
+        if len(words[-1]) > INDEXED_PREFIX:
+            rows = _search_candidates(conn, _fts_query(words, prefix=False), category)
+        if len(rows) < SEARCH_CANDIDATES:
+            rows = _search_candidates(conn, _fts_query(words, prefix=True), category)
     
-    return question_id
+    def rank(row):
+        hits = 10 * row["question_marked"].count(MARK_START) + row["options_marked"].count(MARK_START)
+        return (-hits, len(row["question"]), row["id"])
+    
+    results = []
+    for row in sorted(rows, key=rank)[offset:offset + limit]:
+        result = dict(row)
+        result["options"] = json.loads(row["options"])
+        # The markers are control characters inside JSON strings
+        result["options_marked"] = json.loads(row["options_marked"], strict=False)
+        results.append(result)
+    return {
+        "rows": results,
+        "has_more": len(rows) > offset + limit,
+        "capped": len(rows) >= SEARCH_CANDIDATES,
+    }
+
+def _update_leaderboard(conn, scope: str, score_id: int, score: int):
+    """Insert a score into one materialized top-N leaderboard if it qualifies."""
+    cutoff = query(conn, """
+        SELECT score, score_id FROM leaderboard_top
+        WHERE scope = ?
+        ORDER BY score DESC, score_id
+        LIMIT 1 OFFSET ?
+    """, (scope, LEADERBOARD_SIZE - 1))
+    # Full board and not strictly better than the last row: nothing to do
+    # (on a tie the older score keeps its place).
+    if cutoff and score <= cutoff[0]["score"]:
+        return
+
+    execute(conn, "INSERT INTO leaderboard_top (scope, score, score_id) VALUES (?, ?, ?)",
+            (scope, score, score_id))
+    if cutoff:
+        execute(conn, """
+            DELETE FROM leaderboard_top
+            WHERE scope = ? AND score_id IN (
+                SELECT score_id FROM leaderboard_top
+                WHERE scope = ?
+                ORDER BY score DESC, score_id
+                LIMIT -1 OFFSET ?
+            )
+        """, (scope, scope, LEADERBOARD_SIZE))
+
+def window_start(period: str, day: date) -> str:
+    """First day of the ``period`` window ('day', 'week' or 'month') containing ``day``.
+
+    Weeks start on Monday.
+    """
+    if period == "day":
+        start = day
+    elif period == "week":
+        start = day - timedelta(days=day.weekday())
+    elif period == "month":
+        start = day.replace(day=1)
+    else:
+        raise ValueError(f"unknown leaderboard period: {period!r}")
+    return start.isoformat()
+
+def _update_window_leaderboard(conn, period: str, start: str, scope: str,
+                               score_id: int, score: int):
+    """Insert a score into one time-window top-N leaderboard if it qualifies."""
+    cutoff = query(conn, """
+        SELECT score FROM leaderboard_window
+        WHERE period = ? AND window_start = ? AND scope = ?
+        ORDER BY score DESC, score_id
+        LIMIT 1 OFFSET ?
+    """, (period, start, scope, LEADERBOARD_SIZE - 1))
+    if cutoff and score <= cutoff[0]["score"]:
+        return
+
+    execute(conn, """
+        INSERT INTO leaderboard_window (period, window_start, scope, score, score_id)
+        VALUES (?, ?, ?, ?, ?)
+    """, (period, start, scope, score, score_id))
+    if cutoff:
+        execute(conn, """
+            DELETE FROM leaderboard_window
+            WHERE period = ? AND window_start = ? AND scope = ? AND score_id IN (
+                SELECT score_id FROM leaderboard_window
+                WHERE period = ? AND window_start = ? AND scope = ?
+                ORDER BY score DESC, score_id
+                LIMIT -1 OFFSET ?
+            )
+        """, (period, start, scope, period, start, scope, LEADERBOARD_SIZE))
+
+def _insert_score(conn, user_id, player_name: str, category: str, score: int,
+                  correct: int, total: int, played_at: datetime = None) -> int:
+    """Insert one game and update the all-time and time-window leaderboards.
+
+    ``user_id`` is None for quiz players, who are known by name only. The
+    ``score_stats`` aggregates are kept up to date by triggers.
+    ``played_at`` (UTC) defaults to now.
+    """
+    # Same text format as CURRENT_TIMESTAMP, but known here without a read-back.
+    now = played_at or datetime.now(timezone.utc)
+    cursor = execute(conn, """
+        INSERT INTO scores
+        (user_id, player_name, category, score, correct_answers, total_questions, played_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (user_id, player_name, category, score, correct, total,
+          now.strftime("%Y-%m-%d %H:%M:%S")))
+    score_id = cursor.lastrowid
+
+    if score is not None:
+        _update_leaderboard(conn, GLOBAL_SCOPE, score_id, score)
+        if category:
+            _update_leaderboard(conn, category, score_id, score)
+
+        for period in WINDOW_PERIODS:
+            start = window_start(period, now.date())
+            _update_window_leaderboard(conn, period, start, GLOBAL_SCOPE, score_id, score)
+            if category:
+                _update_window_leaderboard(conn, period, start, category, score_id, score)
+    return score_id
+
+def _username(conn, user_id: int) -> str:
+    rows = query(conn, "SELECT username FROM users WHERE id = ?", (user_id,))
+    return rows[0]["username"] if rows else None
 
 def save_score(user_id: int, category: str, score: int, 
                correct: int, total: int):
-    """Save a game score."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO scores (user_id, category, score, correct_answers, total_questions)
-        VALUES (?, ?, ?, ?, ?)
-    """, (user_id, category, score, correct, total))
+    """Save a user account's game score and update the materialized leaderboards."""
+    with connection() as conn:
+        _insert_score(conn, user_id, _username(conn, user_id), category, score, correct, total)
+
+def save_scores(scores: list) -> list:
+    """Save many ``(user_id, category, score, correct, total)`` account games in one transaction.
+
+    Returns the new score IDs.
+    """
+    with connection() as conn:
+        return [_insert_score(conn, user_id, _username(conn, user_id), *rest)
+                for user_id, *rest in scores]
+
+def save_player_scores(scores: list) -> list:
+    """Save many ``(player_name, category, score, correct, total)`` games in one transaction.
+
+    Quiz players are known by the name they typed; no user account is
+    created or touched, so a name never takes or joins a real account.
+    Returns the new score IDs.
+    """
+    with connection() as conn:
+        return [_insert_score(conn, None, *row) for row in scores]
+
+def import_legacy_scores(entries: list) -> int:
+    """Copy games from the pre-SQLite ``highscores.json`` list into ``scores``.
+
+    Entries are ``{name, score, category, correct_answers, total_questions,
+    date}`` dicts, where ``date`` is the local ISO time the old Quiz page
+    wrote. Games already present (same player, category, score and time)
+    are skipped, so the import is safe to repeat. Returns how many were added.
+    """
+    games = sorted(
+        ((datetime.fromisoformat(e["date"]).astimezone(timezone.utc).replace(microsecond=0), e)
+         for e in entries),
+        key=lambda game: game[0]
+    )
+    added = 0
+    with connection() as conn:
+        for played_at, e in games:
+            if query(conn, """
+                SELECT 1 FROM scores
+                WHERE player_name = ? AND category IS ? AND score IS ? AND played_at = ?
+                LIMIT 1
+            """, (e["name"], e.get("category"), e.get("score"),
+                  played_at.strftime("%Y-%m-%d %H:%M:%S"))):
+                continue
+            _insert_score(conn, None, e["name"], e.get("category"), e.get("score"),
+                          e.get("correct_answers"), e.get("total_questions"), played_at)
+            added += 1
+    return added
+
+def save_answers(answers: list) -> int:
+    """Append many answer events in one transaction. Returns how many were written.
+
+    Each event is a dict with ``name`` (the player), ``round_id``,
+    ``category``, ``question_key``, ``selected_index``, ``correct``,
+    ``response_ms`` and ``streak``.
+    """
+    with connection() as conn:
+        cursor = conn.executemany("""
+            INSERT INTO answers
+            (player_name, round_id, category, question_key, selected_index, correct,
+             response_ms, streak)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(a["name"], a["round_id"], a["category"], a["question_key"],
+               a["selected_index"], int(a["correct"]), a["response_ms"], a["streak"])
+              for a in answers])
+        return cursor.rowcount
+
+def save_ratings(question_ratings: list, player_ratings: list):
+    """Upsert adaptive-difficulty ratings in one transaction.
+
+    ``question_ratings`` holds ``(question_key, category, rating, attempts)``
+    and ``player_ratings`` ``(player_name, category, rating, answers)``
+    tuples.
+    """
+    with connection() as conn:
+        conn.executemany("""
+            INSERT INTO question_ratings (question_key, category, rating, attempts)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(question_key) DO UPDATE SET
+                rating = excluded.rating, attempts = excluded.attempts,
+                updated_at = CURRENT_TIMESTAMP
+        """, question_ratings)
+        conn.executemany("""
+            INSERT INTO player_ratings (player_name, category, rating, answers)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(player_name, category) DO UPDATE SET
+                rating = excluded.rating, answers = excluded.answers,
+                updated_at = CURRENT_TIMESTAMP
+        """, player_ratings)
+
+def get_question_ratings(category: str) -> dict:
+    """Stored ratings of a category's questions: ``question_key -> (rating, attempts)``."""
+    with connection() as conn:
+        rows = query(conn, "SELECT question_key, rating, attempts FROM question_ratings "
+                           "WHERE category = ?", (category,))
+    return {row["question_key"]: (row["rating"], row["attempts"]) for row in rows}
+
+def get_player_rating(player_name: str, category: str):
+    """A player's stored ``(rating, answers)`` in a category, or None."""
+    with connection() as conn:
+        rows = query(conn, "SELECT rating, answers FROM player_ratings "
+                           "WHERE player_name = ? AND category = ?", (player_name, category))
+    return (rows[0]["rating"], rows[0]["answers"]) if rows else None
+
+def get_scores_after(score_id: int, limit: int) -> list:
+    """Up to ``limit`` games with an ID above ``score_id``, oldest first (for exports)."""
+    with connection() as conn:
+        return query(conn, """
+            SELECT id, player_name, category, score, correct_answers, total_questions, played_at
+            FROM scores WHERE id > ? ORDER BY id LIMIT ?
+        """, (score_id, limit))
+
+def get_scores_version() -> int:
+    """ID of the newest game; changes whenever a game is saved (a cheap cache key)."""
+    with connection() as conn:
+        rows = query(conn, "SELECT MAX(id) AS version FROM scores")
+    return rows[0]["version"] or 0
+
+def get_answers_version() -> int:
+    """ID of the newest answer event; changes whenever answers are written."""
+    with connection() as conn:
+        rows = query(conn, "SELECT MAX(id) AS version FROM answers")
+    return rows[0]["version"] or 0
+
+def get_highscores(limit: int = 10, category: str = None) -> list:
+    """Get top scores, overall or for one category.
+
+    Reads come from the materialized ``leaderboard_top`` table, so they cost
+    O(limit) no matter how many games have been played. Limits larger than
+    ``LEADERBOARD_SIZE`` fall back to an index scan of ``scores``.
+    """
+    with connection() as conn:
+        if limit <= LEADERBOARD_SIZE:
+            rows = query(conn, """
+                SELECT s.*, s.player_name AS username
+                FROM leaderboard_top t
+                JOIN scores s ON s.id = t.score_id
+                WHERE t.scope = ?
+                ORDER BY t.score DESC, t.score_id
+                LIMIT ?
+            """, (category or GLOBAL_SCOPE, limit))
+        elif category:
+            rows = query(conn, """
+                SELECT s.*, s.player_name AS username
+                FROM scores s
+                WHERE s.category = ?
+                ORDER BY s.score DESC, s.id
+                LIMIT ?
+            """, (category, limit))
+        else:
+            rows = query(conn, """
+                SELECT s.*, s.player_name AS username
+                FROM scores s
+                ORDER BY s.score DESC, s.id
+                LIMIT ?
+            """, (limit,))
     
-    conn.commit()
-    conn.close()
+    return [dict(row) for row in rows]
 
-def get_highscores(limit: int = 10) -> list:
-    """Get top scores."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def get_window_leaderboard(period: str, limit: int = 10, category: str = None,
+                           day: date = None) -> list:
+    """Top scores of the current day, week or month, overall or for one category.
+
+    Served from the ``leaderboard_window`` rollups, so the cost is O(limit)
+    however long the score history is. ``day`` picks another window (UTC).
+    """
+    start = window_start(period, day or datetime.now(timezone.utc).date())
+    with connection() as conn:
+        rows = query(conn, """
+            SELECT s.*, s.player_name AS username
+            FROM leaderboard_window w
+            JOIN scores s ON s.id = w.score_id
+            WHERE w.period = ? AND w.window_start = ? AND w.scope = ?
+            ORDER BY w.score DESC, w.score_id
+            LIMIT ?
+        """, (period, start, category or GLOBAL_SCOPE, min(limit, LEADERBOARD_SIZE)))
     
-    cursor.execute("""
-        SELECT s.*, u.username 
+    return [dict(row) for row in rows]
+
+def expire_leaderboard_windows(today: date = None) -> int:
+    """Drop time-window leaderboards older than ``WINDOW_RETENTION``.
+
+    Run periodically (the score writer does it hourly). Returns the number
+    of rows removed.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    removed = 0
+    with connection() as conn:
+        for period in WINDOW_PERIODS:
+            oldest = window_start(period, today - WINDOW_RETENTION[period])
+            cursor = execute(conn, """
+                DELETE FROM leaderboard_window WHERE period = ? AND window_start < ?
+            """, (period, oldest))
+            removed += cursor.rowcount
+    return removed
+
+def _encode_cursor(row) -> str:
+    key = json.dumps([row["score"], row["played_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, played_at, score_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid leaderboard cursor: {cursor!r}") from e
+    return [score, played_at, score_id]
+
+def _day_start(day) -> str:
+    """``played_at`` text for midnight of ``day`` (a date or 'YYYY-MM-DD')."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day[:10])
+    return f"{day.isoformat()} 00:00:00"
+
+def get_leaderboard_page(page_size: int = 25, category: str = None, date_from=None,
+                         date_to=None, after: str = None, before: str = None) -> dict:
+    """Browse every score, best first, one page at a time.
+
+    Uses keyset pagination on ``(score, played_at, id)``: ``after`` and
+    ``before`` are cursors from a previous page's ``next`` and ``prev``, and
+    each page is an index seek, so page 10,000 costs the same as page one.
+    Equal scores are listed most recent first. ``date_from`` and
+    ``date_to`` (inclusive days, ``played_at`` is UTC) are applied while
+    walking the index.
+
+    Returns ``{"rows": [...], "next": cursor or None, "prev": cursor or None}``.
+    """
+    where, params = [], []
+    if category:
+        where.append("s.category = ?")
+        params.append(category)
+    if date_from:
+        where.append("s.played_at >= ?")
+        params.append(_day_start(date_from))
+    if date_to:
+        day = date.fromisoformat(date_to[:10]) if isinstance(date_to, str) else date_to
+        where.append("s.played_at < ?")
+        params.append(_day_start(day + timedelta(days=1)))
+
+    backwards = before is not None
+    if after is not None or before is not None:
+        where.append("(s.score, s.played_at, s.id) %s (?, ?, ?)" % (">" if backwards else "<"))
+        params.extend(_decode_cursor(before if backwards else after))
+
+    order = "ASC" if backwards else "DESC"
+    sql = f"""
+        SELECT s.*, s.player_name AS username
         FROM scores s
-        JOIN users u ON s.user_id = u.id
-        ORDER BY s.score DESC
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY s.score {order}, s.played_at {order}, s.id {order}
         LIMIT ?
-    """, (limit,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    return [dict(row) for row in rows]
+    """
+    with connection() as conn:
+        rows = query(conn, sql, params + [page_size + 1])
+
+    has_more = len(rows) > page_size
+    rows = [dict(row) for row in rows[:page_size]]
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+    return {
+        "rows": rows,
+        "next": _encode_cursor(rows[-1]) if rows and has_next else None,
+        "prev": _encode_cursor(rows[0]) if rows and has_prev else None,
+    }
+
+def rebuild_leaderboards():
+    """Recompute every materialized leaderboard from the scores table.
+
+    Only needed after rows were written to ``scores`` without going through
+    ``save_score()`` (bulk loads, manual edits).
+    """
+    with connection() as conn:
+        execute(conn, "DELETE FROM leaderboard_top")
+        execute(conn, """
+            INSERT INTO leaderboard_top (scope, score, score_id)
+            SELECT ?, score, id FROM scores
+            WHERE score IS NOT NULL
+            ORDER BY score DESC, id
+            LIMIT ?
+        """, (GLOBAL_SCOPE, LEADERBOARD_SIZE))
+        execute(conn, """
+            INSERT INTO leaderboard_top (scope, score, score_id)
+            SELECT category, score, id FROM (
+                SELECT category, score, id,
+                       ROW_NUMBER() OVER (PARTITION BY category ORDER BY score DESC, id) AS pos
+                FROM scores
+                WHERE category IS NOT NULL AND category != '' AND score IS NOT NULL
+            )
+            WHERE pos <= ?
+        """, (LEADERBOARD_SIZE,))
+
+        today = datetime.now(timezone.utc).date()
+        execute(conn, "DELETE FROM leaderboard_window")
+        for period in WINDOW_PERIODS:
+            oldest = window_start(period, today - WINDOW_RETENTION[period])
+            execute(conn, f"""
+                INSERT INTO leaderboard_window (period, window_start, scope, score, score_id)
+                SELECT ?, window_start, scope, score, id FROM (
+                    SELECT window_start, scope, score, id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY window_start, scope ORDER BY score DESC, id
+                           ) AS pos
+                    FROM (
+                        SELECT {_WINDOW_START_SQL[period]} AS window_start,
+                               ? AS scope, score, id
+                        FROM scores
+                        WHERE score IS NOT NULL AND played_at >= ?
+                        UNION ALL
+                        SELECT {_WINDOW_START_SQL[period]}, category, score, id
+                        FROM scores
+                        WHERE score IS NOT NULL AND played_at >= ?
+                          AND category IS NOT NULL AND category != ''
+                    )
+                )
+                WHERE pos <= ?
+            """, (period, GLOBAL_SCOPE, oldest, oldest, LEADERBOARD_SIZE))
+
+def _score_stats_dict(row) -> dict:
+    games = row["games"] if row else 0
+    total_score = row["total_score"] if row else 0
+    total_correct = row["total_correct"] if row else 0
+    total_questions = row["total_questions"] if row else 0
+    return {
+        "games": games,
+        "total_score": total_score,
+        "total_correct": total_correct,
+        "total_questions": total_questions,
+        "max_score": (row["max_score"] if row else None) or 0,
+        "avg_score": total_score / games if games else 0.0,
+        "accuracy": total_correct / total_questions if total_questions else 0.0,
+    }
+
+def get_score_stats(category: str = None) -> dict:
+    """Running totals over every game played, overall or for one category.
+
+    Served from the trigger-maintained ``score_stats`` table: one primary-key
+    lookup however many games exist. Returns games, total_score,
+    total_correct, total_questions, max_score, avg_score and accuracy (a
+    fraction).
+    """
+    with connection() as conn:
+        rows = query(conn, "SELECT * FROM score_stats WHERE scope = ?",
+                     (category or GLOBAL_SCOPE,))
+    return _score_stats_dict(rows[0] if rows else None)
+
+def get_category_score_stats() -> dict:
+    """``get_score_stats()`` for every category that has games, keyed by name."""
+    with connection() as conn:
+        rows = query(conn, "SELECT * FROM score_stats WHERE scope != ? ORDER BY scope",
+                     (GLOBAL_SCOPE,))
+    return {row["scope"]: _score_stats_dict(row) for row in rows}
+
+def rebuild_score_stats():
+    """Recompute ``score_stats`` from the full scores table.
+
+    The triggers keep it exact; this is for repairs after manual edits or
+    restoring a table without its triggers.
+    """
+    with connection() as conn:
+        execute(conn, "DELETE FROM score_stats")
+        execute(conn, """
+            INSERT INTO score_stats (scope, games, total_score, total_correct, total_questions, max_score)
+            SELECT ?, COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(correct_answers), 0),
+                   COALESCE(SUM(total_questions), 0), MAX(score)
+            FROM scores
+            HAVING COUNT(*) > 0
+        """, (GLOBAL_SCOPE,))
+        execute(conn, """
+            INSERT INTO score_stats (scope, games, total_score, total_correct, total_questions, max_score)
+            SELECT category, COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(correct_answers), 0),
+                   COALESCE(SUM(total_questions), 0), MAX(score)
+            FROM scores
+            WHERE category IS NOT NULL AND category != ''
+            GROUP BY category
+        """)
+
+def _rank(conn, score: int, scope: str) -> dict:
+    """Rank of ``score`` among all games in ``scope``, from the score histogram."""
+    row = query(conn, """
+        SELECT
+            (SELECT COALESCE(SUM(games), 0) FROM score_histogram
+             WHERE scope = ? AND score > ?) AS above,
+            (SELECT COALESCE(SUM(games), 0) FROM score_histogram
+             WHERE scope = ? AND score = ?) AS tied,
+            (SELECT COALESCE(games, 0) FROM score_stats WHERE scope = ?) AS total
+    """, (scope, score, scope, score, scope))[0]
+    total = row["total"] or 0
+    below = max(total - row["above"] - row["tied"], 0)
+    return {
+        "rank": row["above"] + 1,
+        "total": total,
+        "percentile": 100.0 * below / total if total else 0.0,  # share of games beaten
+    }
+
+def get_score_rank(score: int, category: str = None) -> dict:
+    """Rank a score against every game played, overall or in one category.
+
+    Returns rank (1 = best, ties share a rank), total games and percentile
+    (the percentage of games with a lower score).
+    """
+    with connection() as conn:
+        return _rank(conn, score, category or GLOBAL_SCOPE)
+
+def _ranked_game(conn, row) -> dict:
+    game = {
+        "score": row["score"],
+        "category": row["category"],
+        "played_at": row["played_at"],
+        "global": _rank(conn, row["score"], GLOBAL_SCOPE),
+    }
+    if row["category"]:
+        game["category_rank"] = _rank(conn, row["score"], row["category"])
+    return game
+
+def get_player_rank(player_name: str, category: str = None):
+    """Global and category ranks of a player's latest and best game.
+
+    Returns ``{"latest": game, "best": game}`` where each game has score,
+    category, played_at, ``global`` and ``category_rank`` (see
+    ``get_score_rank()``), or None if the player has no games. With
+    ``category`` only games in that category are considered.
+    """
+    with connection() as conn:
+        condition, params = "player_name = ? AND score IS NOT NULL", [player_name]
+        if category:
+            condition += " AND category = ?"
+            params.append(category)
+        latest = query(conn, f"""
+            SELECT score, category, played_at FROM scores
+            WHERE {condition} ORDER BY id DESC LIMIT 1
+        """, params)
+        if not latest:
+            return None
+        best = query(conn, f"""
+            SELECT score, category, played_at FROM scores
+            WHERE {condition} ORDER BY score DESC, id LIMIT 1
+        """, params)
+        return {"latest": _ranked_game(conn, latest[0]), "best": _ranked_game(conn, best[0])}
 
-# Initialize the database when this module is imported
-init_database()
+def rebuild_score_histogram():
+    """Recompute ``score_histogram`` from the full scores table."""
+    with connection() as conn:
+        execute(conn, "DELETE FROM score_histogram")
+        execute(conn, """
+            INSERT INTO score_histogram (scope, score, games)
+            SELECT ?, score, COUNT(*) FROM scores
+            WHERE score IS NOT NULL
+            GROUP BY score
+        """, (GLOBAL_SCOPE,))
+        execute(conn, """
+            INSERT INTO score_histogram (scope, score, games)
+            SELECT category, score, COUNT(*) FROM scores
+            WHERE score IS NOT NULL AND category IS NOT NULL AND category != ''
+            GROUP BY category, score
+        """)
@@ -0,0 +1,169 @@
+"""MinHash signatures and LSH buckets for spotting near-duplicate questions.
+
+A question is normalized (case, accents and punctuation removed, options
+sorted so their order does not matter) and cut into overlapping character
+shingles. Its MinHash signature is the minimum of ``NUM_PERM`` random hash
+functions over those shingles; the fraction of positions where two
+signatures agree estimates the Jaccard similarity of their shingle sets.
+
+The signature is split into ``BANDS`` bands of ``ROWS`` values. Questions
+that agree on a whole band share an LSH bucket, so finding the candidates
+for a question is ``BANDS`` index lookups instead of a comparison with
+every other question. With 16 bands of 4, a pair at similarity 0.7 shares
+a bucket with probability 0.99, a pair at 0.3 with probability 0.12.
+Candidates are then confirmed by comparing full signatures.
+
+Buckets include the category: only questions in the same category (the
+pool a quiz round is drawn from) count as duplicates.
+"""
+
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+SHINGLE_SIZE = 4
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+THRESHOLD = 0.7  # estimated Jaccard similarity above which questions are duplicates
+_CHUNK = 64       # questions hashed per array operation in signatures()
+
+# Each 4-character shingle is read as a 64-bit polynomial over its code
+# points, then hashed NUM_PERM ways with multiply-add-shift:
+# h(x) = ((a*x + b) mod 2**64) >> 32. uint64 arithmetic wraps, which is the
+# "mod 2**64". Fixed seed: stored signatures must stay comparable across runs.
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64)
+_BASE = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(32)
+_BAND_SALT = np.arange(BANDS, dtype=np.uint64) << _SHIFT
+_WORDS = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Casefold, strip accents and punctuation, and collapse whitespace."""
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(_WORDS.findall(text))
+
+
+def shingle_text(question: str, options: list) -> str:
+    """The text that is shingled: normalized question, then the sorted options."""
+    return " | ".join([normalize(question)] + sorted(normalize(str(o)) for o in options))
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    text = text.ljust(SHINGLE_SIZE)
+    points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    n = len(points) - SHINGLE_SIZE + 1
+    hashes = points[:n].copy()
+    for i in range(1, SHINGLE_SIZE):
+        hashes *= _BASE
+        hashes += points[i:i + n]
+    return hashes
+
+
+def signatures(questions: list) -> np.ndarray:
+    """MinHash signatures of ``(question, options)`` pairs, one row of ``NUM_PERM`` uint32 each.
+
+    Questions are hashed in chunks of ``_CHUNK`` with one set of array
+    operations per chunk, which is several times faster than one call each.
+    """
+    result = np.empty((len(questions), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(questions), _CHUNK):
+        hashes = [_shingle_hashes(shingle_text(q, o)) for q, o in questions[start:start + _CHUNK]]
+        offsets = np.cumsum([0] + [len(h) for h in hashes[:-1]])
+        mixed = np.multiply(_A, np.concatenate(hashes))
+        mixed += _B
+        # The shift is monotonic, so it can wait until after the minimum.
+        result[start:start + len(hashes)] = (np.minimum.reduceat(mixed, offsets, axis=1) >> _SHIFT).T
+    return result
+
+
+def signature(question: str, options: list) -> np.ndarray:
+    """MinHash signature of one question: ``NUM_PERM`` uint32 values."""
+    return signatures([(question, options)])[0]
+
+
+def band_keys_many(categories: list, sigs: np.ndarray) -> np.ndarray:
+    """LSH buckets of many signatures: an ``(n, BANDS)`` int32 array."""
+    seeds = np.array([zlib.crc32(c.encode("utf-8")) for c in categories], dtype=np.uint64)
+    # Hash (category, band, band values) the same way as the shingles; the
+    # top 32 bits fit one of SQLite's 4-byte integers.
+    keys = seeds[:, None] + _BAND_SALT
+    bands = sigs.reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    for i in range(ROWS):
+        keys = keys * _BASE + bands[:, :, i]
+    # One more multiply so the last value also reaches the top bits.
+    return ((keys * _BASE) >> _SHIFT).astype(np.uint32).view(np.int32)
+
+
+def band_keys(category: str, sig: np.ndarray) -> list:
+    """The question's LSH bucket in each band, as signed 32-bit integers."""
+    return band_keys_many([category], sig[None, :])[0].tolist()
+
+
+def bucket_rows(signed: list) -> list:
+    """``(bucket, question_id)`` rows for ``(question_id, category, signature)`` tuples, sorted."""
+    ids = np.repeat(np.array([question_id for question_id, _, _ in signed], dtype=np.int64), BANDS)
+    keys = band_keys_many([category for _, category, _ in signed],
+                          np.stack([sig for _, _, sig in signed])).ravel()
+    order = np.lexsort((ids, keys))
+    return list(zip(keys[order].tolist(), ids[order].tolist()))
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return int(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+
+def from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def cluster(buckets, signature_of, threshold: float = THRESHOLD) -> list:
+    """Group ids that share an LSH bucket and are similar into clusters.
+
+    ``buckets`` yields lists of ids that share a bucket; ``signature_of``
+    maps an id to its signature. Within a bucket each id is compared with
+    one representative per cluster seen there so far, so a bucket full of
+    copies of one question costs a comparison per copy, not per pair.
+    Returns the clusters with more than one member, each as a sorted list.
+    """
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:  # path compression
+            parent[x], x = root, parent[x]
+        return root
+
+    for ids in buckets:
+        representatives = []
+        for question_id in ids:
+            sig = signature_of(question_id)
+            for rep_id, rep_sig in representatives:
+                if similarity(sig, rep_sig) >= threshold:
+                    a, b = find(question_id), find(rep_id)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+                    break
+            else:
+                representatives.append((question_id, sig))
+
+    groups = {}
+    for question_id in parent:
+        groups.setdefault(find(question_id), set()).add(question_id)
+    for root, members in groups.items():
+        members.add(root)
+    return sorted((sorted(members) for members in groups.values()), key=lambda m: m[0])
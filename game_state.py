@@ -0,0 +1,143 @@
+"""Compact per-session quiz state.
+
+A session used to carry full copies of its question dicts plus a dozen
+loose ``st.session_state`` keys. ``GameState`` keeps only what is unique to
+one player's round: the category, the drawn question ids (a packed
+``array``), one byte per answer and a few counters. Question text and
+options are looked up on demand in the shared, read-only ``question_bank``.
+
+Question ids are positions, so a round pins the category's bank view it
+drew them from: a reload of the bank (questions.json or the snapshot
+changed) swaps in a new view for new rounds, while rounds in progress keep
+resolving their ids against the old one, whose mapping stays valid.
+"""
+
+import random
+import time
+from array import array
+from dataclasses import dataclass, field
+
+import question_bank
+
+UNANSWERED = 0  # answers[i] holds the chosen option + 1, or 0
+
+
+def _streak_multiplier(streak: int) -> float:
+    """Bonus multiplier for the next correct answer after ``streak`` in a row."""
+    if streak >= 3:
+        return 1.5
+    if streak >= 2:
+        return 1.25
+    return 1.0
+
+
+@dataclass(slots=True)
+class GameState:
+    """One player's quiz round."""
+
+    category: str
+    question_ids: array
+    answers: bytearray = field(default=None)
+    current: int = 0
+    score: int = 0
+    correct: int = 0
+    streak: int = 0
+    multiplier: float = 1.0
+    round_id: int = 0        # groups this round's answer events
+    shown_at: float = 0.0    # time.monotonic() when the current question came up
+    adaptive: bool = False   # question ids after ``current`` are picked as the round goes
+    questions: object = field(default=None, repr=False, compare=False)  # pinned bank view
+
+    def __post_init__(self):
+        if self.answers is None:
+            self.answers = bytearray(len(self.question_ids))
+        if self.questions is None:
+            self.questions = question_bank.get_questions(self.category)
+
+    def __getstate__(self):
+        # The bank view maps the snapshot file; an unpickled round re-pins the current one
+        return {name: getattr(self, name) for name in self.__slots__ if name != "questions"}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self.questions = question_bank.get_questions(self.category)
+
+    @classmethod
+    def new(cls, category: str, question_ids, questions=None) -> "GameState":
+        """Start a round over the given question ids (positions in ``questions``,
+        by default the category's current bank view)."""
+        return cls(category, array("I", question_ids), round_id=random.getrandbits(62),
+                   shown_at=time.monotonic(), questions=questions)
+
+    @classmethod
+    def new_adaptive(cls, category: str, first_id: int, total: int,
+                     questions=None) -> "GameState":
+        """Start a round of ``total`` questions where each next one is chosen on ``advance()``."""
+        question_ids = array("I", bytes(4 * total))
+        question_ids[0] = first_id
+        return cls(category, question_ids, round_id=random.getrandbits(62),
+                   shown_at=time.monotonic(), adaptive=True, questions=questions)
+
+    @property
+    def total(self) -> int:
+        return len(self.question_ids)
+
+    @property
+    def question(self):
+        """The current question, resolved from the bank view the round was drawn from."""
+        return self.questions[self.question_ids[self.current]]
+
+    @property
+    def answered_current(self) -> bool:
+        return self.answers[self.current] != UNANSWERED
+
+    @property
+    def selected_answer(self):
+        """Option chosen for the current question, or None."""
+        choice = self.answers[self.current]
+        return choice - 1 if choice != UNANSWERED else None
+
+    @property
+    def is_last(self) -> bool:
+        return self.current >= self.total - 1
+
+    @property
+    def seen_ids(self):
+        """Ids of the questions shown so far, including the current one."""
+        return self.question_ids[:self.current + 1]
+
+    def response_ms(self) -> int:
+        """Milliseconds since the current question came up."""
+        return int((time.monotonic() - self.shown_at) * 1000)
+
+    def answer(self, selected_index: int) -> bool:
+        """Record an answer to the current question. Returns True if correct."""
+        q = self.question
+        self.answers[self.current] = selected_index + 1
+
+        if selected_index == q["correct"]:
+            # Calculate points with the multiplier earned so far
+            self.score += int(q["points"] * self.multiplier)
+            self.correct += 1
+            self.streak += 1
+            self.multiplier = _streak_multiplier(self.streak)
+            return True
+
+        # Streak broken
+        self.streak = 0
+        self.multiplier = 1.0
+        return False
+
+    def advance(self, next_id: int = None) -> bool:
+        """Move to the next question. Returns False if the round is over.
+
+        Adaptive rounds pass the id of the question to show next.
+        """
+        if self.is_last:
+            return False
+        if next_id is not None:
+            self.question_ids[self.current + 1] = next_id
+        self.current += 1
+        self.shown_at = time.monotonic()
+        return True
@@ -0,0 +1,267 @@
+"""JSON export of the game history.
+
+SQLite is the source of truth for scores: the score writer saves every
+finished game to the ``scores`` table, and every page reads leaderboards,
+ranks and statistics from there. This module keeps a plain-text copy of
+that history for archiving and offline use, one JSON object per game::
+
+    data/highscores.json          snapshot: generation, games, last exported score id
+    data/highscores.<gen>.log     games exported since that snapshot
+    data/highscores-archive/      compacted logs, gzip-compressed
+
+``export_scores()`` appends the games whose ``scores.id`` is above the last
+one exported, so the log follows the database instead of being written
+alongside it: a failed or skipped export is caught up by the next one, and
+there is nothing to repair or rebuild on this side. The score writer runs
+it every ``EXPORT_INTERVAL`` seconds (see ``score_writer``), and
+``python maintenance.py export-scores`` runs it by hand.
+
+When the log grows past ``COMPACT_BYTES`` (about 100,000 games) it is
+folded into a new snapshot and moved into the archive as one gzip segment.
+Retention: segments are never merged, pruned or rewritten, so the archive
+grows by one file per ``COMPACT_BYTES`` of log. SQLite holds every game,
+so old segments can be deleted or moved elsewhere whenever the space is
+needed; later exports never recreate them.
+
+Before this module became an export, the Quiz page kept its top 10 games
+in ``highscores.json`` only (a ``"scores"`` list). The first export or
+compaction imports that list into SQLite and then exports the table from
+the start, so those games reach the log with their new ids.
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+import database
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_DIR = Path(__file__).parent / "data"
+HIGHSCORES_FILE = DATA_DIR / "highscores.json"
+ARCHIVE_DIR = DATA_DIR / "highscores-archive"
+LOCK_FILE = DATA_DIR / "highscores.lock"
+
+EXPORT_BATCH = 5_000               # games read from SQLite per append
+COMPACT_BYTES = 16 * 1024 * 1024   # compact once the live log is this large
+TAIL_BYTES = 64 * 1024             # read from the end of the log to find its last game
+
+_LOG_NAME = re.compile(r"^highscores\.(\d+)\.log$")
+
+
+def log_path(generation: int) -> Path:
+    """Path of the append log that belongs to a snapshot generation."""
+    return DATA_DIR / f"highscores.{generation}.log"
+
+
+@contextmanager
+def _file_lock():
+    """Hold the cross-process export lock."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_FILE, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_snapshot() -> dict:
+    if HIGHSCORES_FILE.exists():
+        with open(HIGHSCORES_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = {}
+    data.setdefault("generation", 0)
+    data.setdefault("games", 0)
+    return data
+
+
+def _write_snapshot(data: dict):
+    tmp = HIGHSCORES_FILE.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, HIGHSCORES_FILE)
+
+
+def _parse_lines(lines):
+    """Yield entries from complete log lines."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _complete_lines(live: bytes) -> bytes:
+    return live[:live.rfind(b"\n") + 1]
+
+
+def _last_entry(path: Path):
+    """The newest complete entry of a log, or None. Reads only the end of the file.
+
+    A torn last line from a crashed append is truncated away; that game is
+    exported again.
+    """
+    if not path.exists():
+        return None
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        start, lines = end, [b""]
+        # Until a whole line is in view: lines[0] may begin mid-line
+        while start > 0 and len(lines) < 3:
+            start = max(0, start - TAIL_BYTES)
+            f.seek(start)
+            lines = f.read(end - start).split(b"\n")
+        if lines[-1]:
+            f.truncate(end - len(lines[-1]))
+    complete = lines[:-1] if start == 0 else lines[1:-1]
+    return json.loads(complete[-1]) if complete else None
+
+
+def _last_exported_id(snapshot: dict) -> int:
+    """``scores.id`` of the newest exported game."""
+    entry = _last_entry(log_path(snapshot["generation"]))
+    return entry["id"] if entry else snapshot.get("exported_through", 0)
+
+
+def _count_lines(path: Path) -> int:
+    with open(path, "rb") as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+
+def _load_snapshot_locked() -> dict:
+    """Read the snapshot, importing a pre-export one first. Caller holds the file lock."""
+    snapshot = _read_snapshot()
+    if "scores" in snapshot:
+        # These games were only ever written here, never to SQLite. Import
+        # them (repeatable: present games are skipped) before the snapshot
+        # that lists them is replaced; exporting from id 0 then puts them
+        # in the log with the ids the import gave them.
+        database.import_legacy_scores(snapshot["scores"])
+        snapshot = {"generation": snapshot["generation"], "games": 0, "exported_through": 0}
+        _write_snapshot(snapshot)
+    return snapshot
+
+
+def _entry(row) -> dict:
+    return {
+        "id": row["id"],
+        "name": row["player_name"],
+        "score": row["score"],
+        "category": row["category"],
+        "correct_answers": row["correct_answers"],
+        "total_questions": row["total_questions"],
+        "date": row["played_at"].replace(" ", "T") + "+00:00",
+    }
+
+
+def _archive_log(path: Path):
+    """Gzip a folded log into the archive and remove it (idempotent)."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    target = ARCHIVE_DIR / f"{path.name}.gz"
+    tmp = target.with_suffix(".gz.tmp")
+    with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, target)
+    path.unlink()
+
+
+def _compact_locked(snapshot: dict, last_id: int) -> dict:
+    """Fold the live log into a new snapshot. Caller holds the file lock.
+
+    ``last_id`` is the newest exported game, the last entry of the log.
+    """
+    path = log_path(snapshot["generation"])
+    folded = {
+        "generation": snapshot["generation"] + 1,
+        "games": snapshot["games"] + (_count_lines(path) if path.exists() else 0),
+        "exported_through": last_id,
+    }
+    _write_snapshot(folded)
+    # The new snapshot is the commit point; archiving the folded log is
+    # safe to repeat if we crash before it finishes.
+    for path in DATA_DIR.glob("highscores.*.log"):
+        match = _LOG_NAME.match(path.name)
+        if match and int(match.group(1)) <= snapshot["generation"]:
+            _archive_log(path)
+    return folded
+
+
+def export_scores() -> int:
+    """Append the games saved since the last export to the log.
+
+    Returns how many were exported. Safe to run from several processes at
+    once. The log itself records the last exported id, so an export cut
+    short by a crash is resumed without skipping or repeating a game.
+    """
+    exported = 0
+    with metrics.HIGHSCORE_EXPORT_SECONDS.time(), _file_lock():
+        snapshot = _load_snapshot_locked()
+        path = log_path(snapshot["generation"])
+        last_id = _last_exported_id(snapshot)
+        while True:
+            rows = database.get_scores_after(last_id, EXPORT_BATCH)
+            if not rows:
+                return exported
+            data = b"".join(
+                (json.dumps(_entry(row), ensure_ascii=False) + "\n").encode("utf-8")
+                for row in rows
+            )
+            with open(path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                log_size = f.tell()
+            exported += len(rows)
+            last_id = rows[-1]["id"]
+            if log_size >= COMPACT_BYTES:
+                snapshot = _compact_locked(snapshot, last_id)
+                path = log_path(snapshot["generation"])
+
+
+def compact():
+    """Fold the live log into the snapshot and archive it."""
+    with _file_lock():
+        snapshot = _load_snapshot_locked()
+        _compact_locked(snapshot, _last_exported_id(snapshot))
+
+
+def iter_all_scores():
+    """Yield every exported game in the archive and the live log.
+
+    Games in a pre-export ``highscores.json`` are included once the next
+    export has imported them.
+    """
+    # Archived segments never change once written, so only the listing and
+    # the live log need to be read under the lock.
+    with _file_lock():
+        generation = _read_snapshot()["generation"]
+        archived = sorted(
+            ARCHIVE_DIR.glob("highscores.*.log.gz"),
+            key=lambda p: int(p.name.split(".")[1]),
+        ) if ARCHIVE_DIR.exists() else []
+        path = log_path(generation)
+        live = path.read_bytes() if path.exists() else b""
+    for path in archived:
+        with gzip.open(path, "rb") as f:
+            yield from _parse_lines(f)
+    yield from _parse_lines(_complete_lines(live).splitlines())
@@ -0,0 +1,66 @@
+"""Maintenance commands for the QuizMaster data stores.
+
+    python maintenance.py rebuild-stats           # recompute the SQLite score aggregates
+    python maintenance.py export-scores           # bring the JSON highscore log up to date
+    python maintenance.py expire-windows          # drop old daily/weekly/monthly boards
+    python maintenance.py duplicates              # list near-duplicate question clusters
+"""
+
+import argparse
+
+import database
+import dedupe
+import highscores
+
+
+def _describe(stats: dict) -> str:
+    return (f"{stats['games']:,} games, average score {stats['avg_score']:.1f}, "
+            f"best {stats['max_score']}, accuracy {stats['accuracy']:.0%}")
+
+
+def rebuild_stats():
+    """Recompute the running score aggregates (and rank histogram) from the full history."""
+    database.rebuild_score_stats()
+    database.rebuild_score_histogram()
+    print(f"database: {_describe(database.get_score_stats())}")
+
+
+def report_duplicates(threshold: float):
+    """Print every cluster of near-duplicate questions in the database."""
+    signed = database.index_question_signatures()
+    if signed:
+        print(f"signed {signed:,} questions")
+    clusters = database.get_duplicate_clusters(threshold)
+    for cluster in clusters:
+        print(f"[{cluster[0]['category']}]")
+        for question in cluster:
+            print(f"  #{question['id']}: {question['question']}")
+    print(f"{len(clusters):,} clusters, {sum(len(c) for c in clusters):,} questions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="QuizMaster maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("rebuild-stats", help="recompute running score aggregates")
+    commands.add_parser("export-scores", help="append new games to the JSON highscore log")
+
+    commands.add_parser("expire-windows", help="drop expired time-window leaderboards")
+
+    duplicates = commands.add_parser("duplicates", help="list near-duplicate question clusters")
+    duplicates.add_argument("--threshold", type=float, default=dedupe.THRESHOLD,
+                            help="estimated similarity that counts as a duplicate (0-1)")
+
+    args = parser.parse_args(argv)
+    if args.command == "rebuild-stats":
+        rebuild_stats()
+    elif args.command == "export-scores":
+        print(f"exported {highscores.export_scores():,} games")
+    elif args.command == "expire-windows":
+        print(f"removed {database.expire_leaderboard_windows():,} leaderboard rows")
+    elif args.command == "duplicates":
+        report_duplicates(args.threshold)
+
+
+if __name__ == "__main__":
+    main()
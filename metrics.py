@@ -0,0 +1,314 @@
+"""In-process operational metrics with Prometheus text exposition.
+
+Counters, gauges and fixed-bucket histograms, each guarded by its own lock
+so Streamlit script threads can update them concurrently. An update is a
+lock acquire plus an addition (and a ``bisect`` for histograms), i.e. a few
+hundred nanoseconds. The hot paths call ``acquire()``/``release()``
+directly: the arithmetic inside cannot raise, and skipping the ``with``
+protocol roughly halves the cost.
+
+The metrics the app records are defined at the bottom of this module so
+every instrumented module shares one registry. Read them with
+``render_prometheus()`` (the Admin page shows it) or set
+``QUIZMASTER_METRICS_FILE`` to have a background thread write them to a
+file for the node_exporter textfile collector.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE_ENV = "QUIZMASTER_METRICS_FILE"
+TEXTFILE_INTERVAL = 15.0    # seconds between textfile writes
+SESSION_IDLE_SECONDS = 300  # a session counts as active this long after its last rerun
+
+# Seconds; suits everything from a cached lookup to a slow disk write.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        self._lock.acquire()
+        self._value += amount
+        self._lock.release()
+
+    @property
+    def value(self):
+        return self._value
+
+    def samples(self) -> list:
+        return [(self.name, "", self._value)]
+
+
+class Gauge:
+    """A value that can go up and down, or is computed when read."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, function=None):
+        self.name = name
+        self.help = help
+        self._value = 0
+        self._function = function
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        self._lock.acquire()
+        self._value += amount
+        self._lock.release()
+
+    def dec(self, amount=1):
+        self._lock.acquire()
+        self._value -= amount
+        self._lock.release()
+
+    @property
+    def value(self):
+        return self._function() if self._function is not None else self._value
+
+    def samples(self) -> list:
+        return [(self.name, "", self.value)]
+
+
+class Histogram:
+    """Observations counted into fixed, cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        self._lock.acquire()
+        self._counts[i] += 1
+        self._sum += value
+        self._lock.release()
+
+    def time(self):
+        """Context manager observing the duration of a block."""
+        return _Timer(self)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        return {"buckets": cumulative, "sum": total, "count": running}
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        snap = self.snapshot()
+        if not snap["count"]:
+            return 0.0
+        rank = q * snap["count"]
+        previous_bound, previous_count = 0.0, 0
+        for bound, cumulative in zip(self.buckets + (float("inf"),), snap["buckets"]):
+            if cumulative >= rank:
+                if bound == float("inf"):
+                    return previous_bound
+                in_bucket = cumulative - previous_count
+                fraction = (rank - previous_count) / in_bucket if in_bucket else 0.0
+                return previous_bound + (bound - previous_bound) * fraction
+            previous_bound, previous_count = bound, cumulative
+        return previous_bound
+
+    def samples(self) -> list:
+        snap = self.snapshot()
+        rows = [
+            (f"{self.name}_bucket", f'le="{_format_value(bound)}"', cumulative)
+            for bound, cumulative in zip(self.buckets + (float("inf"),), snap["buckets"])
+        ]
+        rows.append((f"{self.name}_sum", "", snap["sum"]))
+        rows.append((f"{self.name}_count", "", snap["count"]))
+        return rows
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    """Named collection of metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name!r} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def metrics(self) -> list:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                label_text = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str) -> Counter:
+    return REGISTRY.register(Counter(name, help))
+
+
+def gauge(name: str, help: str, function=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, function))
+
+
+def histogram(name: str, help: str, buckets=LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, buckets))
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+# ============== ACTIVE SESSIONS ==============
+
+_sessions = {}  # session id -> time.monotonic() of its last rerun
+_sessions_lock = threading.Lock()
+
+
+def note_session(session_id):
+    """Mark a Streamlit session as active now."""
+    if session_id is None:
+        return
+    with _sessions_lock:
+        _sessions[session_id] = time.monotonic()
+
+
+def note_current_session():
+    """Mark the session running the current script thread as active."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    note_session(ctx.session_id if ctx is not None else None)
+
+
+def _active_sessions() -> int:
+    cutoff = time.monotonic() - SESSION_IDLE_SECONDS
+    with _sessions_lock:
+        for session_id in [s for s, seen in _sessions.items() if seen < cutoff]:
+            del _sessions[session_id]
+        return len(_sessions)
+
+
+# ============== TEXTFILE EXPORT ==============
+
+def write_textfile(path):
+    """Write the metrics to ``path`` atomically (write a temp file, then rename)."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(render_prometheus(), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+_textfile_thread = None
+
+
+def start_textfile_writer(path, interval: float = TEXTFILE_INTERVAL):
+    """Rewrite the metrics file every ``interval`` seconds in a daemon thread."""
+    global _textfile_thread
+    if _textfile_thread is not None:
+        return
+
+    def run():
+        while True:
+            try:
+                write_textfile(path)
+            except OSError:
+                logger.exception("Could not write metrics to %s", path)
+            time.sleep(interval)
+
+    _textfile_thread = threading.Thread(target=run, name="metrics-textfile", daemon=True)
+    _textfile_thread.start()
+
+
+# ============== APP METRICS ==============
+
+PROCESS_START = gauge("quizmaster_process_start_time_seconds",
+                      "Unix time the server process started.")
+PROCESS_START.set(time.time())
+
+GAMES_STARTED = counter("quizmaster_games_started_total", "Quiz rounds started.")
+GAMES_FINISHED = counter("quizmaster_games_finished_total", "Quiz rounds finished.")
+ANSWERS = counter("quizmaster_answers_total", "Questions answered.")
+CORRECT_ANSWERS = counter("quizmaster_correct_answers_total", "Questions answered correctly.")
+ANSWER_EVENTS_DROPPED = counter("quizmaster_answer_events_dropped_total",
+                                "Answer events not logged because the answer writer was behind.")
+ACTIVE_SESSIONS = gauge("quizmaster_active_sessions",
+                        f"Sessions that reran a page in the last {SESSION_IDLE_SECONDS}s.",
+                        _active_sessions)
+
+QUESTION_LOAD_SECONDS = histogram("quizmaster_question_load_seconds",
+                                  "Time to read and parse the question bank.")
+HIGHSCORE_LOAD_SECONDS = histogram("quizmaster_highscore_load_seconds",
+                                   "Time to read the leaderboard and score statistics from SQLite.")
+DB_QUERY_SECONDS = histogram("quizmaster_db_query_seconds",
+                             "Duration of timed SQLite statements.")
+HIGHSCORE_WRITE_SECONDS = histogram("quizmaster_highscore_write_seconds",
+                                    "Time to commit a batch of finished games to SQLite.")
+HIGHSCORE_EXPORT_SECONDS = histogram("quizmaster_highscore_export_seconds",
+                                     "Time to export new games to the JSON highscore log.")
+
+if os.environ.get(METRICS_FILE_ENV):
+    start_textfile_writer(os.environ[METRICS_FILE_ENV])
@@ -0,0 +1,638 @@
+"""Numbered schema migrations for the QuizMaster SQLite database.
+
+The schema version lives in ``PRAGMA user_version``. ``apply_migrations()``
+runs every migration whose number is higher than the stored version, in
+order, each inside its own ``BEGIN IMMEDIATE`` transaction, so two processes
+starting at the same time cannot both apply the same step.
+
+To change the schema, append a new ``(version, description, steps)`` entry to
+``MIGRATIONS``. Never edit a migration that has already shipped. Each step
+is an SQL string or a callable that receives the connection.
+"""
+
+import hashlib
+import json
+
+
+def _question_key(category: str, question: str) -> str:
+    # Frozen copy of database.question_key() as of migration 3.
+    text = " ".join(question.split()).casefold()
+    return hashlib.sha1(f"{category}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+def _backfill_question_keys(conn):
+    seen = set()
+    rows = conn.execute("SELECT id, category, question FROM questions ORDER BY id").fetchall()
+    for question_id, category, question in rows:
+        key = _question_key(category, question)
+        if key in seen:
+            # Pre-existing duplicate: keep it, but give it a key of its own.
+            key = f"{key}:{question_id}"
+        seen.add(key)
+        conn.execute("UPDATE questions SET question_key = ? WHERE id = ?", (key, question_id))
+
+
+def _unescape_question_options(conn):
+    # Store options as plain UTF-8 JSON so the full-text index sees "café",
+    # not "caf\u00e9".
+    rows = conn.execute(r"SELECT id, options FROM questions WHERE options LIKE '%\u%'").fetchall()
+    for question_id, options in rows:
+        conn.execute("UPDATE questions SET options = ? WHERE id = ?",
+                     (json.dumps(json.loads(options), ensure_ascii=False), question_id))
+
+
+MIGRATIONS = [
+    (1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            is_admin BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            question TEXT NOT NULL,
+            options TEXT NOT NULL,
+            correct_index INTEGER NOT NULL,
+            difficulty TEXT DEFAULT 'medium',
+            points INTEGER DEFAULT 10,
+            created_by INTEGER REFERENCES users(id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER REFERENCES users(id),
+            category TEXT,
+            score INTEGER,
+            correct_answers INTEGER,
+            total_questions INTEGER,
+            played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "score indexes and materialized top-N leaderboards", [
+        "CREATE INDEX IF NOT EXISTS idx_scores_category_score ON scores (category, score DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_scores_score ON scores (score DESC)",
+        # scope is the category name, or '' for the global leaderboard.
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_top (
+            scope TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            score_id INTEGER NOT NULL REFERENCES scores(id),
+            PRIMARY KEY (scope, score DESC, score_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO leaderboard_top (scope, score, score_id)
+        SELECT '', score, id FROM scores
+        WHERE score IS NOT NULL
+        ORDER BY score DESC, id
+        LIMIT 100
+        """,
+        """
+        INSERT INTO leaderboard_top (scope, score, score_id)
+        SELECT category, score, id FROM (
+            SELECT category, score, id,
+                   ROW_NUMBER() OVER (PARTITION BY category ORDER BY score DESC, id) AS pos
+            FROM scores
+            WHERE category IS NOT NULL AND category != '' AND score IS NOT NULL
+        )
+        WHERE pos <= 100
+        """,
+    ]),
+    (3, "stable question keys for idempotent imports", [
+        "ALTER TABLE questions ADD COLUMN question_key TEXT",
+        _backfill_question_keys,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_key ON questions (question_key)",
+    ]),
+    (4, "per-category question statistics maintained by triggers", [
+        # One row per (category, difficulty): a difficulty histogram that
+        # the triggers below keep in step with every insert/update/delete.
+        """
+        CREATE TABLE IF NOT EXISTS category_stats (
+            category TEXT NOT NULL,
+            difficulty TEXT NOT NULL,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            total_points INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (category, difficulty)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO category_stats (category, difficulty, question_count, total_points)
+        SELECT category, COALESCE(difficulty, 'unknown'), COUNT(*), COALESCE(SUM(points), 0)
+        FROM questions
+        GROUP BY category, COALESCE(difficulty, 'unknown')
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_stats_insert
+        AFTER INSERT ON questions
+        BEGIN
+            INSERT INTO category_stats (category, difficulty, question_count, total_points)
+            VALUES (NEW.category, COALESCE(NEW.difficulty, 'unknown'), 1, COALESCE(NEW.points, 0))
+            ON CONFLICT (category, difficulty) DO UPDATE SET
+                question_count = question_count + 1,
+                total_points = total_points + excluded.total_points,
+                updated_at = CURRENT_TIMESTAMP;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_stats_delete
+        AFTER DELETE ON questions
+        BEGIN
+            UPDATE category_stats SET
+                question_count = question_count - 1,
+                total_points = total_points - COALESCE(OLD.points, 0),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE category = OLD.category AND difficulty = COALESCE(OLD.difficulty, 'unknown');
+            DELETE FROM category_stats
+            WHERE category = OLD.category AND difficulty = COALESCE(OLD.difficulty, 'unknown')
+              AND question_count <= 0;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_stats_update
+        AFTER UPDATE OF category, difficulty, points ON questions
+        BEGIN
+            UPDATE category_stats SET
+                question_count = question_count - 1,
+                total_points = total_points - COALESCE(OLD.points, 0),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE category = OLD.category AND difficulty = COALESCE(OLD.difficulty, 'unknown');
+            DELETE FROM category_stats
+            WHERE category = OLD.category AND difficulty = COALESCE(OLD.difficulty, 'unknown')
+              AND question_count <= 0;
+            INSERT INTO category_stats (category, difficulty, question_count, total_points)
+            VALUES (NEW.category, COALESCE(NEW.difficulty, 'unknown'), 1, COALESCE(NEW.points, 0))
+            ON CONFLICT (category, difficulty) DO UPDATE SET
+                question_count = question_count + 1,
+                total_points = total_points + excluded.total_points,
+                updated_at = CURRENT_TIMESTAMP;
+        END
+        """,
+    ]),
+    (5, "index for random question sampling", [
+        # Lets the sampler seek to the N-th question of a (category,
+        # difficulty) stratum by walking the index only.
+        "CREATE INDEX IF NOT EXISTS idx_questions_category_difficulty "
+        "ON questions (category, difficulty, id)",
+    ]),
+    (6, "running score aggregates maintained by triggers", [
+        # One row per scope ('' = every game, otherwise a category) so the
+        # Highscores statistics are O(1) reads however many games exist.
+        """
+        CREATE TABLE IF NOT EXISTS score_stats (
+            scope TEXT PRIMARY KEY,
+            games INTEGER NOT NULL DEFAULT 0,
+            total_score INTEGER NOT NULL DEFAULT 0,
+            total_correct INTEGER NOT NULL DEFAULT 0,
+            total_questions INTEGER NOT NULL DEFAULT 0,
+            max_score INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO score_stats (scope, games, total_score, total_correct, total_questions, max_score)
+        SELECT '', COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(correct_answers), 0),
+               COALESCE(SUM(total_questions), 0), MAX(score)
+        FROM scores
+        HAVING COUNT(*) > 0
+        """,
+        """
+        INSERT INTO score_stats (scope, games, total_score, total_correct, total_questions, max_score)
+        SELECT category, COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(correct_answers), 0),
+               COALESCE(SUM(total_questions), 0), MAX(score)
+        FROM scores
+        WHERE category IS NOT NULL AND category != ''
+        GROUP BY category
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scores_stats_insert
+        AFTER INSERT ON scores
+        BEGIN
+            INSERT INTO score_stats (scope, games, total_score, total_correct, total_questions, max_score)
+            SELECT scope, 1, COALESCE(NEW.score, 0), COALESCE(NEW.correct_answers, 0),
+                   COALESCE(NEW.total_questions, 0), NEW.score
+            FROM (SELECT '' AS scope UNION ALL
+                  SELECT NEW.category WHERE NEW.category IS NOT NULL AND NEW.category != '')
+            WHERE true
+            ON CONFLICT (scope) DO UPDATE SET
+                games = games + 1,
+                total_score = total_score + excluded.total_score,
+                total_correct = total_correct + excluded.total_correct,
+                total_questions = total_questions + excluded.total_questions,
+                max_score = MAX(COALESCE(max_score, excluded.max_score), COALESCE(excluded.max_score, max_score)),
+                updated_at = CURRENT_TIMESTAMP;
+        END
+        """,
+        # A delete cannot lower a running maximum in O(1); re-read it from
+        # the score indexes instead (an index seek, not a scan).
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scores_stats_delete
+        AFTER DELETE ON scores
+        BEGIN
+            UPDATE score_stats SET
+                games = games - 1,
+                total_score = total_score - COALESCE(OLD.score, 0),
+                total_correct = total_correct - COALESCE(OLD.correct_answers, 0),
+                total_questions = total_questions - COALESCE(OLD.total_questions, 0),
+                max_score = CASE WHEN scope = ''
+                    THEN (SELECT MAX(score) FROM scores)
+                    ELSE (SELECT MAX(score) FROM scores WHERE category = OLD.category)
+                END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE scope = '' OR scope = OLD.category;
+            DELETE FROM score_stats WHERE games <= 0;
+        END
+        """,
+    ]),
+    (7, "keyset pagination indexes for the full leaderboard", [
+        # Seekable with row values: (score, played_at, id) < (?, ?, ?).
+        # They also serve everything the single-column score indexes did.
+        "CREATE INDEX IF NOT EXISTS idx_scores_keyset ON scores (score, played_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_scores_category_keyset "
+        "ON scores (category, score, played_at, id)",
+        "DROP INDEX IF EXISTS idx_scores_score",
+        "DROP INDEX IF EXISTS idx_scores_category_score",
+    ]),
+    (8, "daily, weekly and monthly leaderboard rollups", [
+        # Top-N per (period, window, scope); window_start is the first day of
+        # the UTC day / Monday-based week / month, as 'YYYY-MM-DD'.
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_window (
+            period TEXT NOT NULL,
+            window_start TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            score_id INTEGER NOT NULL REFERENCES scores(id),
+            PRIMARY KEY (period, window_start, scope, score DESC, score_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO leaderboard_window (period, window_start, scope, score, score_id)
+        SELECT period, window_start, scope, score, id FROM (
+            SELECT period, window_start, scope, score, id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY period, window_start, scope ORDER BY score DESC, id
+                   ) AS pos
+            FROM (
+                SELECT p.period,
+                       CASE p.period
+                           WHEN 'day' THEN date(s.played_at)
+                           WHEN 'week' THEN date(s.played_at, 'weekday 0', '-6 days')
+                           ELSE date(s.played_at, 'start of month')
+                       END AS window_start,
+                       CASE k.kind WHEN 'global' THEN '' ELSE s.category END AS scope,
+                       s.score, s.id
+                FROM scores s
+                CROSS JOIN (SELECT 'day' AS period UNION ALL SELECT 'week'
+                            UNION ALL SELECT 'month') p
+                CROSS JOIN (SELECT 'global' AS kind UNION ALL SELECT 'category') k
+                WHERE s.score IS NOT NULL AND s.played_at >= date('now', '-400 days')
+                  AND (k.kind = 'global' OR (s.category IS NOT NULL AND s.category != ''))
+            )
+        )
+        WHERE pos <= 100
+        """,
+    ]),
+    (9, "score histogram and per-player index for rank lookups", [
+        # Games per (scope, score). A rank is one range sum over the distinct
+        # score values above it, however many games were played.
+        """
+        CREATE TABLE IF NOT EXISTS score_histogram (
+            scope TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            games INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, score)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO score_histogram (scope, score, games)
+        SELECT '', score, COUNT(*) FROM scores
+        WHERE score IS NOT NULL
+        GROUP BY score
+        """,
+        """
+        INSERT INTO score_histogram (scope, score, games)
+        SELECT category, score, COUNT(*) FROM scores
+        WHERE score IS NOT NULL AND category IS NOT NULL AND category != ''
+        GROUP BY category, score
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scores_histogram_insert
+        AFTER INSERT ON scores
+        WHEN NEW.score IS NOT NULL
+        BEGIN
+            INSERT INTO score_histogram (scope, score, games)
+            SELECT scope, NEW.score, 1
+            FROM (SELECT '' AS scope UNION ALL
+                  SELECT NEW.category WHERE NEW.category IS NOT NULL AND NEW.category != '')
+            WHERE true
+            ON CONFLICT (scope, score) DO UPDATE SET games = games + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scores_histogram_delete
+        AFTER DELETE ON scores
+        WHEN OLD.score IS NOT NULL
+        BEGIN
+            UPDATE score_histogram SET games = games - 1
+            WHERE score = OLD.score AND (scope = '' OR scope = OLD.category);
+            DELETE FROM score_histogram
+            WHERE score = OLD.score AND (scope = '' OR scope = OLD.category) AND games <= 0;
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scores_user_score ON scores (user_id, score)",
+    ]),
+    (10, "full-text search over question text and options", [
+        _unescape_question_options,
+        # External-content index: the text lives in ``questions`` only and
+        # the triggers below keep the index in step. The prefix indexes make
+        # search-as-you-type ("amst*") a direct lookup.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+            question, options,
+            content = 'questions', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        "INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_fts_insert
+        AFTER INSERT ON questions
+        BEGIN
+            INSERT INTO questions_fts (rowid, question, options)
+            VALUES (NEW.id, NEW.question, NEW.options);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_fts_delete
+        AFTER DELETE ON questions
+        BEGIN
+            INSERT INTO questions_fts (questions_fts, rowid, question, options)
+            VALUES ('delete', OLD.id, OLD.question, OLD.options);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_fts_update
+        AFTER UPDATE OF question, options ON questions
+        BEGIN
+            INSERT INTO questions_fts (questions_fts, rowid, question, options)
+            VALUES ('delete', OLD.id, OLD.question, OLD.options);
+            INSERT INTO questions_fts (rowid, question, options)
+            VALUES (NEW.id, NEW.question, NEW.options);
+        END
+        """,
+    ]),
+    (11, "MinHash signatures and LSH buckets for near-duplicate questions", [
+        # Filled from Python (see dedupe.py and database.index_question_signatures);
+        # the triggers only drop entries that no longer describe their question.
+        """
+        CREATE TABLE IF NOT EXISTS question_signatures (
+            question_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS question_lsh (
+            bucket INTEGER NOT NULL,
+            question_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, question_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_question_lsh_question ON question_lsh (question_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_signature_delete
+        AFTER DELETE ON questions
+        BEGIN
+            DELETE FROM question_signatures WHERE question_id = OLD.id;
+            DELETE FROM question_lsh WHERE question_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_signature_update
+        AFTER UPDATE OF category, question, options ON questions
+        BEGIN
+            DELETE FROM question_signatures WHERE question_id = OLD.id;
+            DELETE FROM question_lsh WHERE question_id = OLD.id;
+        END
+        """,
+    ]),
+    (12, "per-answer event log", [
+        # One row per answered question, appended in batches by the answer
+        # writer (see score_writer). Questions are identified by
+        # question_key, so events stay attached to a question when the bank
+        # is reordered or imported into the questions table. ``streak`` is
+        # the run of correct answers after this one (0 when it was wrong).
+        """
+        CREATE TABLE IF NOT EXISTS answers (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            round_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            question_key TEXT NOT NULL,
+            selected_index INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            response_ms INTEGER,
+            streak INTEGER NOT NULL,
+            answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (13, "adaptive difficulty ratings", [
+        # Elo ratings kept in memory by the adaptive module and written here
+        # in batches. Questions are keyed like the answers table; players
+        # get one rating per category.
+        """
+        CREATE TABLE IF NOT EXISTS question_ratings (
+            question_key TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            rating REAL NOT NULL,
+            attempts INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_question_ratings_category ON question_ratings(category)",
+        """
+        CREATE TABLE IF NOT EXISTS player_ratings (
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            category TEXT NOT NULL,
+            rating REAL NOT NULL,
+            answers INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, category)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (14, "quiz players apart from user accounts", [
+        # Quiz players are just the name typed on the Home page. They used
+        # to be created as guest ``users`` (empty password hash), taking the
+        # username from any later real account. Scores now carry the name
+        # shown on the leaderboards; ``user_id`` is only set for games of a
+        # real account. Answers and player ratings are keyed by the name.
+        "ALTER TABLE scores ADD COLUMN player_name TEXT",
+        "UPDATE scores SET player_name = (SELECT username FROM users WHERE users.id = scores.user_id)",
+        "UPDATE scores SET user_id = NULL "
+        "WHERE user_id IN (SELECT id FROM users WHERE password_hash = '')",
+        "CREATE INDEX IF NOT EXISTS idx_scores_player_score ON scores (player_name, score)",
+        """
+        CREATE TABLE answers_v14 (
+            id INTEGER PRIMARY KEY,
+            player_name TEXT NOT NULL,
+            round_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            question_key TEXT NOT NULL,
+            selected_index INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            response_ms INTEGER,
+            streak INTEGER NOT NULL,
+            answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        INSERT INTO answers_v14
+        SELECT a.id, u.username, a.round_id, a.category, a.question_key, a.selected_index,
+               a.correct, a.response_ms, a.streak, a.answered_at
+        FROM answers a JOIN users u ON u.id = a.user_id
+        """,
+        "DROP TABLE answers",
+        "ALTER TABLE answers_v14 RENAME TO answers",
+        """
+        CREATE TABLE player_ratings_v14 (
+            player_name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            rating REAL NOT NULL,
+            answers INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (player_name, category)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO player_ratings_v14
+        SELECT u.username, r.category, r.rating, r.answers, r.updated_at
+        FROM player_ratings r JOIN users u ON u.id = r.user_id
+        """,
+        "DROP TABLE player_ratings",
+        "ALTER TABLE player_ratings_v14 RENAME TO player_ratings",
+        "DELETE FROM users WHERE password_hash = ''",
+    ]),
+    (15, "dense positions for random question sampling", [
+        # ``stratum_pos`` numbers the questions of each (category,
+        # difficulty) stratum 0..n-1 with no gaps, so the sampler draws a
+        # position and finds its question with one index seek instead of
+        # walking the index to an OFFSET. A delete (or a move to another
+        # stratum) fills the hole with the stratum's last question; inserts
+        # take the next position. NULL difficulties count as 'unknown', as
+        # in category_stats.
+        "ALTER TABLE questions ADD COLUMN stratum_pos INTEGER",
+        """
+        UPDATE questions SET stratum_pos = ranked.pos
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY category, COALESCE(difficulty, 'unknown') ORDER BY id) - 1 AS pos
+            FROM questions
+        ) AS ranked
+        WHERE questions.id = ranked.id
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_questions_stratum "
+        "ON questions (category, COALESCE(difficulty, 'unknown'), stratum_pos)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_stratum_insert
+        AFTER INSERT ON questions
+        BEGIN
+            UPDATE questions SET stratum_pos = COALESCE((
+                SELECT MAX(stratum_pos) FROM questions
+                WHERE category = NEW.category
+                  AND COALESCE(difficulty, 'unknown') = COALESCE(NEW.difficulty, 'unknown')
+                  AND id != NEW.id), -1) + 1
+            WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_stratum_delete
+        AFTER DELETE ON questions
+        BEGIN
+            UPDATE questions SET stratum_pos = OLD.stratum_pos
+            WHERE id = (
+                SELECT id FROM questions
+                WHERE category = OLD.category
+                  AND COALESCE(difficulty, 'unknown') = COALESCE(OLD.difficulty, 'unknown')
+                ORDER BY stratum_pos DESC LIMIT 1)
+              AND stratum_pos > OLD.stratum_pos;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_stratum_update
+        AFTER UPDATE OF category, difficulty ON questions
+        WHEN OLD.category IS NOT NEW.category
+          OR COALESCE(OLD.difficulty, 'unknown') IS NOT COALESCE(NEW.difficulty, 'unknown')
+        BEGIN
+            UPDATE questions SET stratum_pos = OLD.stratum_pos
+            WHERE id = (
+                SELECT id FROM questions
+                WHERE category = OLD.category
+                  AND COALESCE(difficulty, 'unknown') = COALESCE(OLD.difficulty, 'unknown')
+                ORDER BY stratum_pos DESC LIMIT 1)
+              AND stratum_pos > OLD.stratum_pos;
+            UPDATE questions SET stratum_pos = COALESCE((
+                SELECT MAX(stratum_pos) FROM questions
+                WHERE category = NEW.category
+                  AND COALESCE(difficulty, 'unknown') = COALESCE(NEW.difficulty, 'unknown')
+                  AND id != NEW.id), -1) + 1
+            WHERE id = NEW.id;
+        END
+        """,
+        # Rank lookups by player go through idx_scores_player_score
+        # (migration 14) since scores are keyed by name; nothing reads
+        # scores by user_id any more.
+        "DROP INDEX IF EXISTS idx_scores_user_score",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    """Return the schema version stored in the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn) -> list:
+    """Bring the database schema up to date. Returns the versions applied."""
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return []
+
+    applied = []
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # we manage transactions ourselves
+    try:
+        for version, _description, steps in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock: another process may have
+                # applied this step while we were waiting.
+                if get_schema_version(conn) >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(version)
+    finally:
+        conn.isolation_level = previous_isolation
+    return applied
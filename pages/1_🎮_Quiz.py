@@ -1,11 +1,18 @@
 import streamlit as st
-import json
-import random
-from pathlib import Path
-from datetime import datetime
+import adaptive
+import database
+import metrics
+import profiling
+import score_writer
+from game_state import GameState
+from question_bank import get_category_stats, get_questions, sample_question_ids
 
 st.set_page_config(page_title="Quiz - Netherlands QuizMaster", page_icon="🎮", layout="wide")
 
+profiling.begin_page("Quiz", st.query_params)
+metrics.note_current_session()
+profiling.phase("render")
+
 # Custom CSS for fun animations
 st.markdown("""
     <style>
@@ -45,48 +52,13 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Constants
-DATA_DIR = Path(__file__).parent.parent / "data"
-QUESTIONS_FILE = DATA_DIR / "questions.json"
-HIGHSCORES_FILE = DATA_DIR / "highscores.json"
-
 # ============== DATA FUNCTIONS ==============
 
-def load_questions():
-    """Load all questions from JSON."""
-    if QUESTIONS_FILE.exists():
-        with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"categories": {}}
-
 def save_highscore(name, score, category, correct, total):
-    """Save a highscore to the JSON file."""
-    if HIGHSCORES_FILE.exists():
-        with open(HIGHSCORES_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = {"scores": []}
-    
-    new_entry = {
-        "name": name,
-        "score": score,
-        "category": category,
-        "correct_answers": correct,
-        "total_questions": total,
-        "date": datetime.now().isoformat()
-    }
-    
-    data["scores"].append(new_entry)
-    
-    # Sort by score (descending) and keep top 10
-    data["scores"] = sorted(
-        data["scores"], 
-        key=lambda x: x["score"], 
-        reverse=True
-    )[:10]
-    
-    with open(HIGHSCORES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    """Queue a finished game for the background score writer."""
+    st.session_state.last_score_ticket = score_writer.submit_score(
+        name, score, category, correct, total
+    )
 
 # ============== SESSION STATE ==============
 
@@ -95,16 +67,11 @@ def init_session_state():
         "player_name": "",
         "selected_category": None,
         "game_active": False,
-        "current_question_index": 0,
-        "score": 0,
-        "correct_answers": 0,
-        "questions": [],
-        "answered_current": False,
-        "selected_answer": None,
+        "game": None,
         "show_result": False,
-        "current_streak": 0,
-        "multiplier": 1.0,
-        "combo_messages": []
+        "questions_per_round": 10,
+        "balanced_difficulty": False,
+        "adaptive_difficulty": False
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -114,92 +81,184 @@ init_session_state()
 
 # ============== GAME LOGIC ==============
 
+def round_settings():
+    """Let the player choose the round length before starting."""
+    stats = get_category_stats().get(st.session_state.selected_category)
+    available = stats["questions"] if stats else 0
+    if available < 1:
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.session_state.questions_per_round = st.number_input(
+            "❓ Questions per round",
+            min_value=1,
+            max_value=available,
+            value=min(st.session_state.questions_per_round, available)
+        )
+    with col2:
+        st.write("")
+        st.session_state.adaptive_difficulty = st.checkbox(
+            "🧠 Adaptive difficulty",
+            value=st.session_state.adaptive_difficulty,
+            help="Each next question is picked to match your rating in this category."
+        )
+        st.session_state.balanced_difficulty = st.checkbox(
+            "⚖️ Balance difficulty levels",
+            value=st.session_state.balanced_difficulty,
+            disabled=st.session_state.adaptive_difficulty
+        )
+
 def start_game():
     """Initialize a new quiz game."""
-    data = load_questions()
     category = st.session_state.selected_category
     
-    if category and category in data["categories"]:
-        questions = data["categories"][category].copy()
-        random.shuffle(questions)  # Randomize order
-        
-        st.session_state.questions = questions
+    if category and category in get_category_stats():
+        # The round keeps this bank view even if the bank reloads meanwhile
+        questions = get_questions(category)
+        with profiling.span("load"):
+            adaptive.prepare(st.session_state.player_name, category)
+        if st.session_state.adaptive_difficulty:
+            # Only the first question now; each next one follows the rating
+            with profiling.span("load"):
+                first_id = adaptive.next_question_id(
+                    st.session_state.player_name, category, questions
+                )
+            st.session_state.game = GameState.new_adaptive(
+                category, first_id, st.session_state.questions_per_round, questions
+            )
+        else:
+            # Draw just this round's questions (already in random order)
+            with profiling.span("load"):
+                question_ids = sample_question_ids(
+                    category,
+                    st.session_state.questions_per_round,
+                    stratify=st.session_state.balanced_difficulty
+                )
+            
+            # Only ids and answers live in the session; question text is
+            # looked up in the shared question bank when shown.
+            st.session_state.game = GameState.new(category, question_ids, questions)
         st.session_state.game_active = True
-        st.session_state.current_question_index = 0
-        st.session_state.score = 0
-        st.session_state.correct_answers = 0
-        st.session_state.answered_current = False
-        st.session_state.selected_answer = None
         st.session_state.show_result = False
+        metrics.GAMES_STARTED.inc()
 
-def check_answer(selected_index: int, correct_index: int, points: int):
-    """Check if the selected answer is correct."""
-    st.session_state.answered_current = True
-    st.s# Calculate points with multiplier
-        earned_points = int(points * st.session_state.multiplier)
-        st.session_state.score += earned_points
-        st.session_state.correct_answers += 1
-        st.session_state.current_streak += 1
-        
-        # Update multiplier based on streak
-        if st.session_state.current_streak >= 3:
-            st.session_state.multiplier = 1.5
-        elif st.session_state.current_streak >= 2:
-            st.session_state.multiplier = 1.25
-        else:
-            st.session_state.multiplier = 1.0
-            
-        return True
-    else:
-        # Streak broken
-        st.session_state.current_streak = 0
-        st.session_state.multiplier = 1.0
-            st.session_state.score += points
-        st.session_state.correct_answers += 1
-        return True
-    return False
+def check_answer(selected_index: int) -> bool:
+    """Check if the selected answer is correct and log the answer."""
+    game = st.session_state.game
+    q = game.question
+    response_ms = game.response_ms()
+    is_correct = game.answer(selected_index)
+    metrics.ANSWERS.inc()
+    if is_correct:
+        metrics.CORRECT_ANSWERS.inc()
+    
+    # Every round, adaptive or not, moves the player and question ratings
+    key = database.question_key(game.category, q["question"])
+    adaptive.record_answer(st.session_state.player_name, game.category, key, is_correct)
+    
+    # Queued for the background answer writer; never waits on disk
+    score_writer.submit_answer(
+        st.session_state.player_name,
+        game.round_id,
+        game.category,
+        key,
+        selected_index,
+        is_correct,
+        response_ms,
+        game.streak
+    )
+    return is_correct
 
 def next_question():
     """Move to the next question or end the game."""
-    if st.session_state.current_question_index < len(st.session_state.questions) - 1:
-        st.session_state.current_question_index += 1
-        st.session_state.answered_current = False
-        st.session_state.selected_answer = None
-    else:
+    game = st.session_state.game
+    next_id = None
+    if game.adaptive and not game.is_last:
+        with profiling.span("load"):
+            next_id = adaptive.next_question_id(
+                st.session_state.player_name, game.category, game.questions, game.seen_ids
+            )
+    if not game.advance(next_id):
         end_game()
 
 def end_game():
     """End the quiz and save score."""
+    game = st.session_state.game
     st.session_state.game_active = False
     st.session_state.show_result = True
-    
-    # Save highscore
-    saTop bar with all important stats
+    metrics.GAMES_FINISHED.inc()
+    
+    # Save highscore (written in the background; see score_writer)
+    save_highscore(
+        st.session_state.player_name,
+        game.score,
+        game.category,
+        game.correct,
+        game.total
+    )
+
+# ============== QUESTION LOOP ==============
+# The scoreboard and the question panel are fragments: an answer or "next"
+# click reruns just these two (via their keys) instead of the whole page
+# with its CSS, session setup and header. Only the end of a round needs a
+# full rerun, to swap in the results. Keyed fragments need Streamlit 1.63+.
+
+ROUND_FRAGMENTS = ["scoreboard", "question_panel"]
+
+def on_answer(selected_index: int):
+    check_answer(selected_index)
+    st.rerun(ROUND_FRAGMENTS)
+
+def on_next():
+    next_question()
+    if st.session_state.game_active:
+        st.rerun(ROUND_FRAGMENTS)
+    # Round over: the default full rerun shows the results
+
+@st.fragment(key="scoreboard")
+def scoreboard():
+    """Live score, streak and progress of the round."""
+    game = st.session_state.game
+    if game is None:
+        return
+    idx = game.current
+    
+    # Top bar with all important stats
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        st.metric("🎯 Score", st.session_state.score)
+        st.metric("🎯 Score", game.score)
     with col2:
-        st.metric("✅ Correct", st.session_state.correct_answers)
+        st.metric("✅ Correct", game.correct)
     with col3:
-        st.metric("🔥 Streak", st.session_state.current_streak)
+        st.metric("🔥 Streak", game.streak)
     with col4:
-        multiplier_text = f"{st.session_state.multiplier}x"
+        multiplier_text = f"{game.multiplier}x"
         st.metric("⚡ Multiplier", multiplier_text)
     with col5:
-        st.metric("📍 Progress", f"{idx + 1}/{len(questions)}")
+        st.metric("📍 Progress", f"{idx + 1}/{game.total}")
     
     # Progress bar
-    progress = (idx + 1) / len(questions)
+    progress = (idx + 1) / game.total
     st.progress(progress)
     
     # Streak celebration messages
-    if st.session_state.current_streak == 2:
+    if game.streak == 2:
         st.info("🔥 On fire! Keep it going! 🔥")
-    elif st.session_state.current_streak == 3:
+    elif game.streak == 3:
         st.success("🔥🔥 TRIPLE COMBO! 25% BONUS ACTIVE! 🔥🔥")
-    elif st.session_state.current_streak > 3:
-        st.success(f"🔥 MEGA STREAK x{st.session_state.current_streak}! 50% BONUS ACTIVE! 🔥")
+    elif game.streak > 3:
+        st.success(f"🔥 MEGA STREAK x{game.streak}! 50% BONUS ACTIVE! 🔥")
+
+@st.fragment(key="question_panel")
+def question_panel():
+    """The current question with its answer buttons or feedback."""
+    game = st.session_state.game
+    if game is None or not st.session_state.game_active:
+        return
+    with profiling.span("load"):
+        q = game.question
     
     st.markdown("---")
     
@@ -212,16 +271,15 @@ def end_game():
     st.markdown("---")
     
     # Answer buttons
-    if not st.session_state.answered_current:
+    if not game.answered_current:
         st.markdown("### 📍 Choose Your Answer:")
         
         for i, option in enumerate(q["options"]):
             # Color code for buttons
             button_emoji = ["🅰️", "🅱️", "🅲️", "🅳️"][i]
             
-            if st.button(f"{button_emoji} {option}", key=f"opt_{i}", use_container_width=True):
-                is_correct = check_answer(i, q["correct"], q["points"])
-                st.rerun()
+            st.button(f"{button_emoji} {option}", key=f"opt_{i}", use_container_width=True,
+                      on_click=on_answer, args=(i,))
     else:
         # Show results with animations
         st.markdown("### 📊 Results:")
@@ -231,7 +289,7 @@ def end_game():
             
             if i == q["correct"]:
                 st.success(f"{button_emoji} ✓ {option}")
-            elif i == st.session_state.selected_answer:
+            elif i == game.selected_answer:
                 st.error(f"{button_emoji} ✗ {option}")
             else:
                 st.write(f"{button_emoji}  {option}")
@@ -239,115 +297,41 @@ def end_game():
         st.markdown("---")
         
         # Feedback
-        if st.session_state.selected_answer == q["correct"]:
-       markdown("# 🏆 QUIZ COMPLETE! 🏆")
-    
-    total = len(st.session_state.questions)
-    correct = st.session_state.correct_answers
-    score = st.session_state.score
-    
-    # Calculate percentage
-    percentage = (correct / total) * 100 if total > 0 else 0
-    
-    # Display metrics in fancy layout
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("🎯 Final Score", score)
-    with col2:
-        st.metric("✅ Correct Answers", f"{correct}/{total}")
-    with col3:
-        st.metric("📊 Accuracy", f"{percentage:.0f}%")
-    
-    st.markdown("---")
-    
-    # Grade with celebration
-    if percentage >= 95:
-        st.markdown('<div class="achievement-popup">🌟 PERFECT SCORE! You are a NETHERLANDS LEGEND! 🌟</div>', unsafe_allow_html=True)
-        st.balloons()
-    elif percentage >= 90:
-        st.markdown('<div class="achievement-popup">🥇 EXCELLENT! You are a NETHERLANDS MASTER! 🥇</div>', unsafe_allow_html=True)
-        st.balloons()
-    elif percentage >= 80:
-        st.success("🥈 GREAT JOB! You know the Netherlands well!")
-    elif percentage >= 70:
-        st.success("👍 GOOD EFFORT! You're on your way!")
-    elif percentage >= 50:
-        st.warning("📚 NICE TRY! Keep learning about the Netherlands!")
-    else:
-        st.info("💪 KEEP PRACTICING! Every quiz makes you smarter!")
-    
-    st.markdown("---")
-    
-    # Fun fact based on performance
-    st.markdown("### 🇳🇱 Did You Know?")
-    performance_facts = {
-        "perfect": "The Netherlands has NO mountains - the highest point is only 322 meters!",
-        "excellent": "Dutch people are the tallest people in the world!",
-        "great": "Amsterdam has 1,281 bridges - more than Venice!",
-        "good": "Dutch - Netherlands Championship!")
-
-# Check if player has started properly
-if not st.session_state.player_name:
-    st.warning("⚠️ Please enter your name on the Home page first.")
-    if st.button("Go to Home"):
-        st.switch_page("Home.py")
-
-elif st.session_state.show_result:
-    show_results()
+        if game.selected_answer == q["correct"]:
+            st.success(f"🎉 Correct! Your score is now {game.score}.")
+        else:
+            st.error(f"❌ Wrong! The right answer was: {q['options'][q['correct']]}")
+        
+        label = "🏁 Finish Quiz" if game.is_last else "➡️ Next Question"
+        st.button(label, key="next", type="primary", use_container_width=True,
+                  on_click=on_next)
 
-elif not st.session_state.game_active:
-    col1, col2 = st.columns([2, 1])
+def show_rank(score, category):
+    """Where this game places among every game played."""
+    # The score is written in the background; wait until it has landed
+    if not score_writer.wait_for(st.session_state.get("last_score_ticket")):
+        return
+    with profiling.span("load"):
+        overall = database.get_score_rank(score)
+        in_category = database.get_score_rank(score, category) if category else None
     
+    col1, col2 = st.columns(2)
     with col1:
-        st.header(f"🌟 Welcome, {st.session_state.player_name}!")
-        st.write(f"**Category Selected:** {st.session_state.selected_category}")
-    
-    with col2:
-        st.metric("Category", st.session_state.selected_category.split()[0] if st.session_state.selected_category else "")
-    
-    st.markdown("---")
-    
-    if st.session_state.selected_category:
-        # Fun loading animation
-        st.markdown("### 🎮 Ready to compete?")
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.info("✨ Earn points for every correct answer")
+        st.metric("🌍 Overall Rank", f"#{overall['rank']:,} of {overall['total']:,}")
+        st.caption(f"Better than {overall['percentile']:.1f}% of all games")
+    if in_category:
         with col2:
-            st.info("🔥 Build streaks for bonus multipliers")
-        with col3:
-            st.info("🏆 Achieve the highest score!")
-        
-        st.markdown("---")
-        
-        if st.button("🚀 STARTS QUIZ! 🚀", type="primary", use_container_width=True):
-            start_game()
-            st.rerun()
-    else:
-        st.warning("⚠️  = st.columns(3)
-    with col1:
-        if st.button("🔄 Play Again", use_container_width=True):
-            st.session_state.show_result = False
-            start_game()
-            st.rerun()
-    with col2:
-        if st.button("🎓 Try Different Category", use_container_width=True):
-            for key in list(st.session_state.keys()):
-                if key.startswith("game_") or key in ["game_active", "score", "correct_answers", "current_question_index"]:
-                    if key in st.session_state:
-                        del st.session_state[key]
-            st.session_state.show_result = False
-            st.switch_page("Home.py")
-    with col3:
-        if st.button("🏠
+            st.metric("📚 Category Rank", f"#{in_category['rank']:,} of {in_category['total']:,}")
+            st.caption(f"Better than {in_category['percentile']:.1f}% of {category} games")
+
 def show_results():
     """Display the final results."""
     st.title("🏆 Quiz Complete!")
     
-    total = len(st.session_state.questions)
-    correct = st.session_state.correct_answers
-    score = st.session_state.score
+    game = st.session_state.game
+    total = game.total
+    correct = game.correct
+    score = game.score
     
     # Calculate percentage
     percentage = (correct / total) * 100 if total > 0 else 0
@@ -371,6 +355,12 @@ def show_results():
     else:
         st.info("💪 Don't give up! Try again!")
     
+    show_rank(score, game.category)
+    
+    if game.adaptive:
+        rating = adaptive.get_player_rating(st.session_state.player_name, game.category)
+        st.caption(f"🧠 Your {game.category} rating is now **{rating:.0f}**")
+    
     st.markdown("---")
     
     # Action buttons
@@ -404,6 +394,8 @@ elif not st.session_state.game_active:
     if st.session_state.selected_category:
         st.write(f"Category: **{st.session_state.selected_category}**")
         
+        round_settings()
+        
         if st.button("🚀 Start Quiz", type="primary"):
             start_game()
             st.rerun()
@@ -413,4 +405,7 @@ elif not st.session_state.game_active:
             st.switch_page("Home.py")
 
 else:
-    show_question()
+    scoreboard()
+    question_panel()
+
+profiling.end_page()
@@ -1,10 +1,16 @@
 import streamlit as st
-import json
-from pathlib import Path
 import pandas as pd
+import database
+import metrics
+import profiling
+import score_writer
 
 st.set_page_config(page_title="Highscores - Netherlands QuizMaster", page_icon="🏆")
 
+profiling.begin_page("Highscores", st.query_params)
+metrics.note_current_session()
+profiling.phase("render")
+
 # Custom CSS
 st.markdown("""
     <style>
@@ -29,50 +35,184 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-st.markdown('<div class="trophy-header">🏆 HALL OF FAME 🏆</div>', unsafe_allow_html=True)
-st.markdown("### 🇳🇱 Netherlands Quiz Champions!")
-
-DATA_DIR = Path(__file__).parent.parent / "data"
-HIGHSCORES_FILE = DATA_DIR / "highscores.json"
+# ============== DATA FUNCTIONS ==============
 
-def load_highscores():
-    """Load highscores from JSON file."""
-    if HIGHSCORES_FILE.exists():
-        with open(HIGHSCORES_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("scores", [])
-    return []
+MEDALS = ["🥇", "🥈", "🥉"]
 
-scores = load_highscores()
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_leaderboard(version):
+    """Leaderboard rows, display frame and statistics for one data version.
 
-if scores:
+    Everything on the page comes from SQLite, so the table, the statistics,
+    the recent champions and the ranks always agree. ``version`` comes from
+    ``database.get_scores_version()`` and changes only when a game is
+    saved, so repeat views are served from the cache.
+    """
+    with metrics.HIGHSCORE_LOAD_SECONDS.time():
+        scores = database.get_highscores(10)
+        totals = database.get_score_stats()
+        category_stats = database.get_category_score_stats()
+    if not scores:
+        return scores, None, {"category_names": list(category_stats)}
+    
     # Convert to DataFrame for nice display
     df = pd.DataFrame(scores)
+    df = df[["username", "score", "category", "correct_answers", "total_questions", "played_at"]]
+    df["played_at"] = pd.to_datetime(df["played_at"]).dt.strftime("%Y-%m-%d %H:%M")
+    df.columns = ["Player", "Score", "Category", "Correct", "Total", "Played (UTC)"]
     
-    # Format the date column
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d %H:%M")
+    # Rank column with medals for the top 3
+    rank = ("#" + pd.RangeIndex(1, len(df) + 1).astype(str)).to_numpy()
+    rank[:len(MEDALS)] = MEDALS[:len(rank)]
+    df.insert(0, "Rank", rank)
     
-    # Rename columns for display
-    df = df.rename(columns={
-        "name": "Player",
-        "score": "Score",
-        "category": "Category",
-        "correct_answers": "Correct",
-        "total_questions": "Total",
-        "date": "Date"
-    })
+    # Running totals over every game ever played, not just the top rows
+    stats = {
+        "games": totals["games"],
+        "avg_score": totals["avg_score"],
+        "top_score": totals["max_score"],
+        "avg_accuracy": totals["accuracy"] * 100,
+        "categories": pd.DataFrame([
+            {
+                "Category": name,
+                "Games": c["games"],
+                "Average Score": round(c["avg_score"], 1),
+                "Best Score": c["max_score"],
+                "Accuracy": f"{c['accuracy']:.0%}",
+            }
+            for name, c in category_stats.items()
+        ]),
+        "category_names": list(category_stats),
+    }
+    return scores, df, stats
+
+WINDOWS = {"📅 Today": "day", "🗓️ This Week": "week", "📆 This Month": "month"}
+
+def show_recent_champions(categories: list):
+    """Top scores of the current day, week or month."""
+    st.markdown("---")
+    st.subheader("⏰ Recent Champions")
     
-    # Add rank column
-    df.insert(0, "Rank", range(1, len(df) + 1))
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        window = st.radio("Window", list(WINDOWS), horizontal=True, label_visibility="collapsed")
+    with col2:
+        category = st.selectbox("Category", ["All categories"] + categories,
+                                key="window_category", label_visibility="collapsed")
     
-    # Display with medals for top 3
-    def add_medal(rank):
-        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
-        return medals.get(rank, f"#{rank}")
+    with profiling.span("load"):
+        rows = database.get_window_leaderboard(
+            WINDOWS[window], limit=10,
+            category=None if category == "All categories" else category
+        )
     
-    df["Rank"] = df["Rank"].apply(add_medal)
+    if not rows:
+        st.info("🌅 No games in this window yet. Be the first!")
+        return
     
+    df = pd.DataFrame(rows)
+    df = df[["username", "score", "category", "correct_answers", "total_questions", "played_at"]]
+    df.columns = ["Player", "Score", "Category", "Correct", "Total", "Played (UTC)"]
+    rank = ("#" + pd.RangeIndex(1, len(df) + 1).astype(str)).to_numpy()
+    rank[:len(MEDALS)] = MEDALS[:len(rank)]
+    df.insert(0, "Rank", rank)
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+def _rank_text(rank: dict) -> str:
+    return f"#{rank['rank']:,} of {rank['total']:,} · better than {rank['percentile']:.1f}%"
+
+def find_my_rank():
+    """Where a player's latest and best game place among all games."""
+    st.markdown("---")
+    st.subheader("🔍 Find My Rank")
+    
+    username = st.text_input("Player name", value=st.session_state.get("player_name", ""),
+                             key="rank_player")
+    if not username.strip():
+        return
+    
+    with profiling.span("load"):
+        ranks = database.get_player_rank(username.strip())
+    if ranks is None:
+        st.info(f"🤷 No games found for **{username.strip()}**.")
+        return
+    
+    col1, col2 = st.columns(2)
+    for col, label, key in ((col1, "🕒 Latest Game", "latest"), (col2, "🏅 Best Game", "best")):
+        game = ranks[key]
+        with col:
+            st.metric(label, f"{game['score']} pts", _rank_text(game["global"]),
+                      delta_color="off")
+            if "category_rank" in game:
+                st.caption(f"{game['category']}: {_rank_text(game['category_rank'])}")
+
+def browse_leaderboard(categories: list):
+    """Every game ever played, one keyset-paginated page at a time."""
+    st.markdown("---")
+    st.subheader("🔎 Browse All Scores")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        page_size = st.selectbox("Rows per page", [10, 25, 50, 100], index=1)
+    with col2:
+        category = st.selectbox("Category", ["All categories"] + categories)
+    with col3:
+        dates = st.date_input("Played between", value=())
+    
+    category = None if category == "All categories" else category
+    date_from = dates[0] if len(dates) > 0 else None
+    date_to = dates[1] if len(dates) > 1 else date_from
+    
+    # New filters start again from the first page
+    filters = (page_size, category, date_from, date_to)
+    if st.session_state.get("browse_filters") != filters:
+        st.session_state.browse_filters = filters
+        st.session_state.browse_cursor = (None, None)
+        st.session_state.browse_page = 1
+    
+    after, before = st.session_state.browse_cursor
+    with profiling.span("load"):
+        page = database.get_leaderboard_page(page_size, category, date_from, date_to,
+                                             after=after, before=before)
+    
+    if not page["rows"]:
+        st.info("📭 No games match these filters.")
+        return
+    
+    df = pd.DataFrame(page["rows"])
+    df = df[["username", "score", "category", "correct_answers", "total_questions", "played_at"]]
+    df.columns = ["Player", "Score", "Category", "Correct", "Total", "Played (UTC)"]
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Previous", disabled=page["prev"] is None, use_container_width=True):
+            st.session_state.browse_cursor = (None, page["prev"])
+            st.session_state.browse_page -= 1
+            st.rerun()
+    with col2:
+        st.markdown(f"<p style='text-align: center;'>Page {st.session_state.browse_page}</p>",
+                    unsafe_allow_html=True)
+    with col3:
+        if st.button("Next ➡️", disabled=page["next"] is None, use_container_width=True):
+            st.session_state.browse_cursor = (page["next"], None)
+            st.session_state.browse_page += 1
+            st.rerun()
+
+# ============== MAIN PAGE ==============
+
+st.markdown('<div class="trophy-header">🏆 HALL OF FAME 🏆</div>', unsafe_allow_html=True)
+st.markdown("### 🇳🇱 Netherlands Quiz Champions!")
+
+profiling.phase("load")
+
+# Make sure this player's own last game has been written before reading.
+score_writer.wait_for(st.session_state.get("last_score_ticket"))
+scores, df, stats = build_leaderboard(database.get_scores_version())
+
+profiling.phase("render")
+
+if scores:
     # Show top 3 in special way
     st.markdown("---")
     st.subheader("🌟 Top 3 Champions!")
@@ -80,7 +220,6 @@ if scores:
     top_3_cols = st.columns(3)
     for idx in range(min(3, len(scores))):
         score = scores[idx]
-        medals = {0: "🥇", 1: "🥈", 2: "🥉"}
         
         with top_3_cols[idx]:
             st.markdown(f"""
@@ -92,8 +231,8 @@ if scores:
                 color: white;
                 box-shadow: 0 4px 15px rgba(0,0,0,0.2);
             '>
-                <h2>{medals[idx]}</h2>
-                <h3>{score['name']}</h3>
+                <h2>{MEDALS[idx]}</h2>
+                <h3>{score['username']}</h3>
                 <p style='font-size: 1.5rem; font-weight: bold;'>⭐ {score['score']} points</p>
                 <p>{score['category']}</p>
                 <p style='font-size: 0.9rem;'>✅ {score['correct_answers']}/{score['total_questions']}</p>
@@ -118,30 +257,31 @@ if scores:
     with col1:
         st.markdown(f'''
         <div class="fun-stat">
-        📊<br>Total Games<br><h2>{len(scores)}</h2>
+        📊<br>Total Games<br><h2>{stats["games"]}</h2>
         </div>
         ''', unsafe_allow_html=True)
     with col2:
-        avg_score = sum(s["score"] for s in scores) / len(scores)
         st.markdown(f'''
         <div class="fun-stat">
-        📈<br>Average Score<br><h2>{avg_score:.0f}</h2>
+        📈<br>Average Score<br><h2>{stats["avg_score"]:.0f}</h2>
         </div>
         ''', unsafe_allow_html=True)
     with col3:
-        top_score = max(s["score"] for s in scores)
         st.markdown(f'''
         <div class="fun-stat">
-        ⭐<br>Highest Score<br><h2>{top_score}</h2>
+        ⭐<br>Highest Score<br><h2>{stats["top_score"]}</h2>
         </div>
         ''', unsafe_allow_html=True)
     with col4:
-        avg_accuracy = (sum(s["correct_answers"] for s in scores) / sum(s["total_questions"] for s in scores) * 100) if scores else 0
         st.markdown(f'''
         <div class="fun-stat">
-        ✅<br>Avg Accuracy<br><h2>{avg_accuracy:.0f}%</h2>
+        ✅<br>Avg Accuracy<br><h2>{stats["avg_accuracy"]:.0f}%</h2>
         </div>
         ''', unsafe_allow_html=True)
+    
+    if not stats["categories"].empty:
+        st.markdown("#### 📚 By Category")
+        st.dataframe(stats["categories"], use_container_width=True, hide_index=True)
 
 else:
     st.markdown('<div class="trophy-header">🎮 Be the First Legend! 🎮</div>', unsafe_allow_html=True)
@@ -151,6 +291,12 @@ else:
     if st.button("🎮 Play Now and Make History!", key="play_now"):
         st.switch_page("Home.py")
 
+show_recent_champions(stats["category_names"])
+find_my_rank()
+browse_leaderboard(stats["category_names"])
+
 st.markdown("---")
 if st.button("🏠 Back to Home", use_container_width=True):
     st.switch_page("Home.py")
+
+profiling.end_page()
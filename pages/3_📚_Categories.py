@@ -1,8 +1,12 @@
+import html
+
 import streamlit as st
-import json
-from pathlib import Path
+import database
+import metrics
+from question_bank import get_category_stats, get_questions
 
 st.set_page_config(page_title="Categories - Netherlands QuizMaster", page_icon="📚", layout="wide")
+metrics.note_current_session()
 
 # Custom CSS
 st.markdown("""
@@ -29,17 +33,77 @@ st.markdown("""
 st.markdown("# 📚 Quiz Categories")
 st.markdown("### 🇳🇱 Choose Your Netherlands Challenge!")
 
-DATA_DIR = Path(__file__).parent.parent / "data"
-QUESTIONS_FILE = DATA_DIR / "questions.json"
+category_stats = get_category_stats()
+
+# ============== QUESTION SEARCH ==============
 
-def load_questions():
-    if QUESTIONS_FILE.exists():
-        with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"categories": {}}
+SEARCH_PAGE_SIZE = 10
 
-data = load_questions()
-categories = data.get("categories", {})
+def _marked(text: str) -> str:
+    """Escape a search result and turn its match markers into <mark> tags."""
+    return (html.escape(text)
+            .replace(database.MARK_START, "<mark>")
+            .replace(database.MARK_END, "</mark>"))
+
+def search_box():
+    """Ranked, highlighted, paginated full-text search over every question."""
+    with st.expander("🔎 Search Questions", expanded=bool(st.session_state.get("search_text"))):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            text = st.text_input("Search", key="search_text", placeholder="e.g. windmill, Rembrandt",
+                                 label_visibility="collapsed")
+        with col2:
+            category = st.selectbox("Category", ["All categories"] + list(category_stats),
+                                    key="search_category", label_visibility="collapsed")
+        if not text.strip():
+            return
+        
+        # A new search starts again at the first page
+        search = (text, category)
+        if st.session_state.get("search_last") != search:
+            st.session_state.search_last = search
+            st.session_state.search_page = 0
+        page = st.session_state.search_page
+        
+        result = database.search_questions(
+            text, category=None if category == "All categories" else category,
+            limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE
+        )
+        if not result["rows"]:
+            st.info("🤷 No questions match your search.")
+            return
+        
+        difficulty_emoji = {"easy": "🟢", "medium": "🟡", "hard": "🔴"}
+        for row in result["rows"]:
+            options = " · ".join(
+                f"✓ {_marked(option)}" if i == row["correct_index"] else _marked(option)
+                for i, option in enumerate(row["options_marked"])
+            )
+            st.markdown(
+                f"{difficulty_emoji.get(row['difficulty'], '⚪')} **{_marked(row['question_marked'])}**"
+                f"<br><small>{html.escape(row['category'])} · {options}</small>",
+                unsafe_allow_html=True,
+            )
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Previous", key="search_prev", disabled=page == 0,
+                         use_container_width=True):
+                st.session_state.search_page -= 1
+                st.rerun()
+        with col2:
+            first = page * SEARCH_PAGE_SIZE + 1
+            caption = f"Results {first}-{first + len(result['rows']) - 1}, best matches first"
+            if result["capped"]:
+                caption += f" (top {database.SEARCH_CANDIDATES} matches; refine your search for more)"
+            st.caption(caption)
+        with col3:
+            if st.button("Next ➡️", key="search_next", disabled=not result["has_more"],
+                         use_container_width=True):
+                st.session_state.search_page += 1
+                st.rerun()
+
+search_box()
 
 # Category descriptions and emojis
 category_info = {
@@ -60,22 +124,18 @@ category_info = {
     }
 }
 
-if categories:
+if category_stats:
     # Display each category as an attractive card
-    for name, questions_list in categories.items():
+    for name, stats in category_stats.items():
         info = category_info.get(name, {"emoji": "❓", "description": name, "fun_fact": ""})
         
         col1, col2 = st.columns([1, 2])
         
         with col1:
-            # Count by difficulty
-            difficulties = {}
-            total_points = 0
-            
-            for q in questions_list:
-                diff = q.get("difficulty", "unknown")
-                difficulties[diff] = difficulties.get(diff, 0) + 1
-                total_points += q.get("points", 0)
+            # Precomputed per category by the question bank
+            difficulties = stats["difficulties"]
+            total_points = stats["total_points"]
+            num_questions = stats["questions"]
             
             # Display stats with visual badges
             st.markdown(f"""
@@ -83,7 +143,7 @@ if categories:
                 <h2>{info['emoji']} {name}</h2>
                 <p>{info['description']}</p>
                 <div style='margin: 1rem 0;'>
-                    <span class='stat-badge'>📝 {len(questions_list)} Questions</span>
+                    <span class='stat-badge'>📝 {num_questions} Questions</span>
                     <span class='stat-badge'>⭐ {total_points} Points</span>
                 </div>
                 <div style='margin: 1rem 0;'>
@@ -98,7 +158,7 @@ if categories:
         with col2:
             st.subheader("📋 Sample Questions:")
             
-            for idx, q in enumerate(questions_list[:5], 1):
+            for idx, q in enumerate(get_questions(name)[:5], 1):
                 difficulty_emoji = {
                     "easy": "🟢",
                     "medium": "🟡",
@@ -107,8 +167,8 @@ if categories:
                 
                 st.write(f"{idx}. {difficulty_emoji} {q['question']}")
             
-            if len(questions_list) > 5:
-                st.caption(f"... and {len(questions_list) - 5} more exciting questions!")
+            if num_questions > 5:
+                st.caption(f"... and {num_questions - 5} more exciting questions!")
             
             st.markdown("---")
             
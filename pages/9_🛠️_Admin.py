@@ -0,0 +1,229 @@
+import json
+import os
+import time
+
+import streamlit as st
+import pandas as pd
+import answer_analytics
+import database
+import metrics
+import profiling
+
+st.set_page_config(page_title="Admin - Netherlands QuizMaster", page_icon="🛠️", layout="wide")
+
+# Only reachable with QUIZMASTER_ADMIN set on the server. The analytics
+# include every question's answer key, so ?profile=1 (which any visitor can
+# add) only switches profiling on; it does not open this page.
+if not os.environ.get("QUIZMASTER_ADMIN"):
+    st.info("🔒 Nothing to see here.")
+    st.stop()
+
+st.title("🛠️ Admin")
+
+# ============== METRICS ==============
+
+def show_metrics():
+    uptime = max(time.time() - metrics.PROCESS_START.value, 1e-9)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("👥 Active Sessions", metrics.ACTIVE_SESSIONS.value)
+    with col2:
+        st.metric("🎮 Games Started", metrics.GAMES_STARTED.value)
+    with col3:
+        st.metric("🏁 Games Finished", metrics.GAMES_FINISHED.value)
+    with col4:
+        st.metric("✍️ Answers / s", f"{metrics.ANSWERS.value / uptime:.2f}")
+
+    st.subheader("⏱️ Latencies")
+    latencies = [
+        ("Question load", metrics.QUESTION_LOAD_SECONDS),
+        ("Highscore load", metrics.HIGHSCORE_LOAD_SECONDS),
+        ("DB query", metrics.DB_QUERY_SECONDS),
+        ("Highscore write", metrics.HIGHSCORE_WRITE_SECONDS),
+        ("Highscore export", metrics.HIGHSCORE_EXPORT_SECONDS),
+    ]
+    rows = []
+    for label, hist in latencies:
+        snap = hist.snapshot()
+        rows.append({
+            "Metric": label,
+            "Count": snap["count"],
+            "Mean (ms)": snap["sum"] / snap["count"] * 1000 if snap["count"] else 0.0,
+            "p50 (ms)": hist.quantile(0.5) * 1000,
+            "p95 (ms)": hist.quantile(0.95) * 1000,
+            "p99 (ms)": hist.quantile(0.99) * 1000,
+        })
+    st.dataframe(pd.DataFrame(rows).round(3), use_container_width=True, hide_index=True)
+
+    st.subheader("📜 Prometheus Exposition")
+    text = metrics.render_prometheus()
+    st.download_button("📥 Download metrics.prom", text, file_name="metrics.prom",
+                       mime="text/plain")
+    st.code(text, language="text")
+
+# ============== PROFILER ==============
+
+def show_profiler():
+    st.caption(
+        f"Mode: **{profiling.mode(st.query_params) or 'off'}** · keeping the last "
+        f"{profiling.RING_SIZE} page runs of this server process"
+    )
+
+    runs = profiling.get_runs()
+    if not runs:
+        st.info("📭 No page runs recorded yet. Open the Quiz or Highscores page with profiling on.")
+        return
+
+    # One row per page run, with the time spent in each phase
+    rows = []
+    for i, run in enumerate(runs):
+        row = {
+            "Run": i,
+            "Page": run["page"],
+            "Started": run["started_at"],
+            "Status": run["status"],
+            "Total (ms)": run["total_ms"],
+        }
+        for path, _, elapsed in run["spans"]:
+            phase = path.split(";", 1)[0]
+            if ";" not in path:
+                row[f"{phase} (ms)"] = row.get(f"{phase} (ms)", 0.0) + elapsed
+            if path.endswith(";sql") or path == "sql":
+                row["SQL (ms)"] = row.get("SQL (ms)", 0.0) + elapsed
+        rows.append(row)
+    runs_df = pd.DataFrame(rows).fillna(0.0)
+
+    st.subheader("📊 Per Page")
+    summary = runs_df.groupby("Page")["Total (ms)"].describe(percentiles=[0.5, 0.95])
+    summary = summary.rename(columns={"count": "Runs", "mean": "Mean", "50%": "p50",
+                                      "95%": "p95", "max": "Max"})
+    st.dataframe(summary[["Runs", "Mean", "p50", "p95", "Max"]].round(2), use_container_width=True)
+
+    st.subheader("🐢 Slowest Reruns")
+    slowest = runs_df.sort_values("Total (ms)", ascending=False).head(25)
+    st.dataframe(slowest.round(2), use_container_width=True, hide_index=True)
+
+    st.subheader("⏱️ Span Breakdown")
+    spans_df = pd.DataFrame(
+        [(run["page"], path, elapsed) for run in runs for path, _, elapsed in run["spans"]],
+        columns=["Page", "Span", "ms"],
+    )
+    if not spans_df.empty:
+        breakdown = spans_df.groupby(["Page", "Span"])["ms"].agg(["count", "mean", "sum", "max"])
+        st.dataframe(breakdown.round(3), use_container_width=True)
+
+    functions = [f for run in runs for f in run["functions"]]
+    if functions:
+        st.subheader("🔬 cProfile - Top Functions")
+        functions_df = (
+            pd.DataFrame(functions)
+            .groupby("function")[["calls", "tottime_ms", "cumtime_ms"]].sum()
+            .sort_values("cumtime_ms", ascending=False)
+            .head(40)
+        )
+        st.dataframe(functions_df.round(3), use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("📤 Export")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            "🔥 Folded stacks (flame graph)",
+            profiling.folded_stacks(runs),
+            file_name="quizmaster.folded",
+            mime="text/plain",
+            use_container_width=True,
+        )
+    with col2:
+        st.download_button(
+            "🧾 Raw runs (JSON)",
+            json.dumps(runs, indent=2),
+            file_name="quizmaster-runs.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+    with col3:
+        if st.button("🗑️ Clear recorded runs", use_container_width=True):
+            profiling.clear()
+            st.rerun()
+
+# ============== QUESTION ANALYTICS ==============
+
+@st.cache_data(max_entries=4, show_spinner="Crunching the answer log...")
+def build_question_analytics(version):
+    """Answer-log totals and per-question statistics for one log version.
+
+    ``version`` comes from ``database.get_answers_version()`` and changes
+    only when answers are written, so repeat views are served from the cache.
+    """
+    answers = answer_analytics.load_answers()
+    totals = {
+        "answers": len(answers),
+        "rounds": answers["round_id"].nunique(),
+        "accuracy": answers["correct"].mean() if len(answers) else 0.0,
+    }
+    return totals, answer_analytics.question_stats(answers)
+
+def show_question_analytics():
+    totals, stats = build_question_analytics(database.get_answers_version())
+    if stats.empty:
+        st.info("📭 No answers logged yet. Play a round on the Quiz page.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("✍️ Answers", f"{totals['answers']:,}")
+    with col2:
+        st.metric("🎮 Rounds", f"{totals['rounds']:,}")
+    with col3:
+        st.metric("❓ Questions", f"{len(stats):,}")
+    with col4:
+        st.metric("🎯 Accuracy", f"{totals['accuracy']:.0%}")
+    if totals["answers"] >= answer_analytics.MAX_ANSWERS:
+        st.caption(f"Statistics cover the latest {answer_analytics.MAX_ANSWERS:,} answers.")
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        category = st.selectbox("Category", ["All categories"] + sorted(stats["category"].unique()))
+    with col2:
+        min_attempts = st.number_input("Minimum answers", min_value=1, value=1)
+    shown = stats[stats["attempts"] >= min_attempts]
+    if category != "All categories":
+        shown = shown[shown["category"] == category]
+
+    options = [c for c in stats.columns if c in answer_analytics.OPTION_LABELS]
+    column_config = {
+        "accuracy": st.column_config.ProgressColumn("Accuracy", format="%.0f%%",
+                                                    min_value=0.0, max_value=100.0),
+        "discrimination": st.column_config.NumberColumn("Discrimination", format="%.2f"),
+        "mean_response_ms": st.column_config.NumberColumn("Mean time (ms)", format="%d"),
+        "median_response_ms": st.column_config.NumberColumn("Median time (ms)", format="%d"),
+        **{c: st.column_config.NumberColumn(c, format="%.0f%%") for c in options},
+    }
+    display = shown.assign(accuracy=shown["accuracy"] * 100, **{c: shown[c] * 100 for c in options})
+
+    review = display[display["needs_review"]].sort_values("discrimination")
+    if not review.empty:
+        st.subheader(f"⚠️ Needs Review ({len(review)})")
+        st.caption(f"Discrimination below {answer_analytics.LOW_DISCRIMINATION}: strong players "
+                   "do no better on these than weak ones. Check the answer key and the options.")
+        st.dataframe(review.drop(columns="needs_review"), column_config=column_config,
+                     use_container_width=True, hide_index=True)
+
+    st.subheader("📋 All Questions")
+    st.dataframe(display.drop(columns="needs_review").sort_values("attempts", ascending=False),
+                 column_config=column_config, use_container_width=True, hide_index=True)
+    st.download_button("📥 Download CSV", shown.to_csv(), file_name="question-stats.csv",
+                       mime="text/csv")
+
+# ============== MAIN PAGE ==============
+
+metrics_tab, questions_tab, profiler_tab = st.tabs(
+    ["📈 Metrics", "🧮 Question Analytics", "⏱️ Rerun Profiler"])
+with metrics_tab:
+    show_metrics()
+with questions_tab:
+    show_question_analytics()
+with profiler_tab:
+    show_profiler()
@@ -0,0 +1,220 @@
+"""Opt-in per-rerun profiling for the Streamlit pages.
+
+Streamlit reruns a page script from the top on every interaction. When
+profiling is on, each page run is split into named phases (``load``,
+``compute``, ``render``) and nested spans (e.g. ``sql``), and the finished
+run is kept in a bounded in-memory ring buffer that the Admin page shows.
+
+Profiling is off unless ``QUIZMASTER_PROFILE`` is set or the page URL has
+``?profile=1``. Use ``cprofile`` instead of ``1`` to also collect cProfile
+statistics for each run. When off, every hook is a single thread-local
+lookup.
+
+A page opts in like this::
+
+    profiling.begin_page("Highscores", st.query_params)
+    profiling.phase("load")
+    ...
+    profiling.phase("render")
+    ...
+    profiling.end_page()
+
+Streamlit stops a script early on ``st.rerun()``, ``st.switch_page()`` and
+``st.stop()``; such runs are closed by the next ``begin_page()`` on the same
+thread and marked ``interrupted``.
+"""
+
+import cProfile
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+ENV_VAR = "QUIZMASTER_PROFILE"
+RING_SIZE = 500      # finished page runs kept in memory
+TOP_FUNCTIONS = 30   # cProfile rows kept per run
+
+_OFF = ("", "0", "false", "no", "off")
+
+_runs = deque(maxlen=RING_SIZE)
+_runs_lock = threading.Lock()
+_local = threading.local()
+
+
+class _PageRun:
+    __slots__ = ("page", "started_at", "start", "stack", "phase_start", "spans", "profiler")
+
+    def __init__(self, page: str):
+        self.page = page
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.start = time.perf_counter()
+        self.stack = []         # open span names, outermost (the phase) first
+        self.phase_start = None
+        self.spans = []         # (path, offset_s, elapsed_s)
+        self.profiler = None
+
+
+def mode(query_params=None) -> str:
+    """Return ``""`` (off), ``"spans"`` or ``"cprofile"``."""
+    value = os.environ.get(ENV_VAR, "")
+    if query_params is not None and query_params.get("profile"):
+        value = query_params.get("profile")
+    value = str(value).strip().lower()
+    if value in _OFF:
+        return ""
+    return "cprofile" if value == "cprofile" else "spans"
+
+
+def enabled(query_params=None) -> bool:
+    return mode(query_params) != ""
+
+
+def _current():
+    return getattr(_local, "run", None)
+
+
+def _close_phase(run: _PageRun, now: float):
+    if run.phase_start is not None:
+        run.spans.append((run.stack[0], run.phase_start - run.start, now - run.phase_start))
+        run.phase_start = None
+        run.stack.clear()
+
+
+def _finish(run: _PageRun, status: str):
+    now = time.perf_counter()
+    _close_phase(run, now)
+    functions = []
+    if run.profiler is not None:
+        run.profiler.disable()
+        functions = _top_functions(run.profiler)
+    record = {
+        "page": run.page,
+        "started_at": run.started_at,
+        "status": status,
+        "total_ms": (now - run.start) * 1000,
+        "spans": [(path, offset * 1000, elapsed * 1000) for path, offset, elapsed in run.spans],
+        "functions": functions,
+    }
+    with _runs_lock:
+        _runs.append(record)
+
+
+def _top_functions(profiler) -> list:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "tottime_ms": tottime * 1000,
+            "cumtime_ms": cumtime * 1000,
+        }
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def begin_page(page: str, query_params=None):
+    """Start timing a page run if profiling is on for this session."""
+    stale = _current()
+    if stale is not None:
+        _finish(stale, "interrupted")
+    _local.run = None
+
+    current_mode = mode(query_params)
+    if not current_mode:
+        return
+    run = _PageRun(page)
+    if current_mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            run.profiler = profiler
+        except ValueError:
+            pass  # another profiler is active (Python 3.12+ allows only one)
+    _local.run = run
+
+
+def end_page():
+    """Finish the current page run and store it in the ring buffer."""
+    run = _current()
+    if run is None:
+        return
+    _local.run = None
+    _finish(run, "complete")
+
+
+def phase(name: str):
+    """End the current phase of the page run and start ``name``."""
+    run = _current()
+    if run is None:
+        return
+    now = time.perf_counter()
+    _close_phase(run, now)
+    run.stack.append(name)
+    run.phase_start = now
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as a child of the current phase or span."""
+    run = _current()
+    if run is None:
+        yield
+        return
+    run.stack.append(name)
+    path = ";".join(run.stack)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.spans.append((path, start - run.start, time.perf_counter() - start))
+        run.stack.pop()
+
+
+def record(name: str, elapsed: float):
+    """Add an already-timed child span of ``elapsed`` seconds (e.g. one SQL query)."""
+    run = _current()
+    if run is None:
+        return
+    path = ";".join(run.stack + [name])
+    now = time.perf_counter()
+    run.spans.append((path, now - elapsed - run.start, elapsed))
+
+
+def get_runs() -> list:
+    """Finished page runs, oldest first."""
+    with _runs_lock:
+        return list(_runs)
+
+
+def clear():
+    with _runs_lock:
+        _runs.clear()
+
+
+def folded_stacks(runs=None) -> str:
+    """Span self-times in the folded format read by flamegraph.pl and speedscope.
+
+    Each line is ``page;phase;span <microseconds>``, summed over ``runs``.
+    Time not covered by any phase is attributed to the page itself.
+    """
+    totals = defaultdict(float)
+    for run in get_runs() if runs is None else runs:
+        children = defaultdict(float)
+        for path, _, elapsed in run["spans"]:
+            full = f"{run['page']};{path}"
+            totals[full] += elapsed
+            children[full.rsplit(";", 1)[0]] += elapsed
+        totals[run["page"]] += run["total_ms"]
+        for parent, elapsed in children.items():
+            totals[parent] -= elapsed
+
+    lines = []
+    for path, ms in sorted(totals.items()):
+        micros = int(round(ms * 1000))
+        if micros > 0:
+            lines.append(f"{path} {micros}")
+    return "\n".join(lines) + ("\n" if lines else "")
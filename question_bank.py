@@ -0,0 +1,182 @@
+"""Process-wide question bank shared by every page and session.
+
+Streamlit re-runs each page script on every interaction, so parsing
+``data/questions.json`` inside the page means one full JSON parse per click
+per player. This module loads the bank once per process and hands out the
+same read-only view to every caller. The view is swapped atomically when the
+file's modification time changes *and* its content hash differs.
+
+The view is backed by the compiled, memory-mapped snapshot in
+``data/questions.qbin`` (see ``question_snapshot``), which is validated and
+rebuilt automatically when the JSON changes. An invalid bank raises
+ValueError on the first load; an invalid edit later on is logged and the
+previous bank keeps being served.
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+
+import metrics
+import question_snapshot
+from sampling import allocate_stratified, sample_positions
+
+DATA_DIR = Path(__file__).parent / "data"
+QUESTIONS_FILE = DATA_DIR / "questions.json"
+SNAPSHOT_FILE = DATA_DIR / "questions.qbin"
+
+logger = logging.getLogger(__name__)
+
+_EMPTY_BANK = MappingProxyType({"categories": MappingProxyType({})})
+
+_lock = threading.Lock()
+_bank = _EMPTY_BANK
+_category_stats = MappingProxyType({})
+_difficulty_index = {}  # category -> {difficulty: sequence of question positions}
+_stat_key = None       # (mtime_ns, size) of the file the bank was built from
+_content_hash = None   # SHA-256 of the raw file bytes
+_stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+def _file_stat_key(path: Path):
+    """Return a cheap change-detection key for a file, or None if missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _snapshot_category_stats(snapshot, modified_at: str):
+    """Per-category statistics plus the positions of each difficulty's questions."""
+    stats = {}
+    for name, (_, count, total_points) in snapshot.categories.items():
+        stats[name] = MappingProxyType({
+            "questions": count,
+            "difficulties": MappingProxyType(
+                {d: len(p) for d, p in snapshot.difficulties[name].items()}),
+            "total_points": total_points,
+            "updated_at": modified_at,
+        })
+    return MappingProxyType(stats), snapshot.difficulties
+
+
+def _reload(stat_key):
+    """Re-read the questions file. Must be called with ``_lock`` held."""
+    global _bank, _category_stats, _difficulty_index, _stat_key, _content_hash
+
+    if stat_key is None:
+        _bank, _category_stats, _difficulty_index = _EMPTY_BANK, MappingProxyType({}), {}
+        _stat_key, _content_hash = None, None
+        return
+
+    start = time.perf_counter()
+    # Counted once per reload instead of once per page render.
+    modified_at = datetime.fromtimestamp(stat_key[0] / 1e9).isoformat(timespec="seconds")
+    try:
+        bank, snapshot = question_snapshot.load(QUESTIONS_FILE, SNAPSHOT_FILE)
+    except ValueError:
+        if _content_hash is None:
+            raise
+        # A broken edit: keep serving the last good bank until it is fixed.
+        logger.exception("Invalid question bank %s; keeping the previous one", QUESTIONS_FILE)
+        _stat_key = stat_key
+        return
+
+    # Touched but unchanged (e.g. a checkout or an editor save without edits):
+    # keep the existing view and just remember the new stat key.
+    digest = snapshot.source_hash.hex()
+    if digest != _content_hash:
+        _bank = bank
+        _category_stats, _difficulty_index = _snapshot_category_stats(snapshot, modified_at)
+        _content_hash = digest
+        _stats["reloads"] += 1
+
+    metrics.QUESTION_LOAD_SECONDS.observe(time.perf_counter() - start)
+
+    _stat_key = stat_key
+
+
+def load_questions():
+    """Return the shared, read-only question bank.
+
+    The result behaves like the dict returned by ``json.load`` but cannot be
+    mutated: dicts are ``MappingProxyType`` and lists are read-only sequences
+    (questions are decoded from the snapshot on access). Copy what you need
+    (e.g. ``list(bank["categories"][name])``) before changing it.
+    """
+    stat_key = _file_stat_key(QUESTIONS_FILE)
+    if stat_key == _stat_key:
+        _stats["hits"] += 1
+        return _bank
+
+    with _lock:
+        # Another thread may have reloaded while we waited for the lock.
+        if stat_key == _stat_key:
+            _stats["hits"] += 1
+            return _bank
+        _stats["misses"] += 1
+        _reload(stat_key)
+        return _bank
+
+
+def get_categories() -> list:
+    """Get list of available categories."""
+    return list(load_questions()["categories"].keys())
+
+
+def get_questions(category: str):
+    """Get the read-only questions of a category (empty if unknown)."""
+    return load_questions()["categories"].get(category, ())
+
+
+def get_question(category: str, question_id: int):
+    """Get one read-only question by its position within the category."""
+    return load_questions()["categories"][category][question_id]
+
+
+def sample_question_ids(category: str, k: int, stratify: bool = False, rng=random) -> list:
+    """Draw ``k`` distinct question ids from a category uniformly at random.
+
+    Ids are positions within the category (see ``get_question()``). With
+    ``stratify=True`` the round mirrors the category's difficulty mix. Costs
+    O(k); the category is never copied or shuffled.
+    """
+    bank = load_questions()
+    questions = bank["categories"].get(category, ())
+    if not stratify:
+        return sample_positions(len(questions), k, rng)
+
+    strata = _difficulty_index.get(category, {})
+    alloc = allocate_stratified({d: len(p) for d, p in strata.items()}, k)
+    ids = []
+    for difficulty, count in alloc.items():
+        positions = strata[difficulty]
+        ids.extend(positions[i] for i in sample_positions(len(positions), count, rng))
+    rng.shuffle(ids)
+    return ids
+
+
+def get_category_stats():
+    """Per-category question count, difficulty histogram, total points and mtime.
+
+    Computed once when the bank is (re)loaded, so reading it costs
+    O(number of categories).
+    """
+    load_questions()
+    return _category_stats
+
+
+def get_difficulty_positions(category: str):
+    """Positions of a category's questions grouped by difficulty (``{difficulty: positions}``)."""
+    load_questions()
+    return _difficulty_index.get(category, {})
+
+
+def get_cache_stats() -> dict:
+    """Return hit/miss/reload counters for the shared question bank."""
+    return dict(_stats)
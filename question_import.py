@@ -0,0 +1,275 @@
+"""Streaming bulk import of a question bank into the SQLite ``questions`` table.
+
+The JSON file is read in fixed-size chunks and parsed one question at a
+time, so even a bank with hundreds of thousands of questions never has to
+fit in memory. Rows are written with ``executemany`` in large transactions
+and upserted on ``question_key``, so importing the same file twice leaves
+the table unchanged.
+
+Questions that are near-duplicates of one already in the same category
+(in the database or earlier in the file) are rejected and reported; see
+``dedupe.py``. Pass ``--allow-duplicates`` to skip the check.
+
+    python question_import.py data/questions.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import database
+import dedupe
+
+CHUNK_SIZE = 1 << 20         # characters read from the file at a time
+BATCH_SIZE = 5_000           # rows per executemany call
+COMMIT_EVERY = 100_000       # rows per transaction
+REJECTED_KEPT = 1_000        # rejected duplicates listed in the stats
+
+UPSERT_SQL = """
+    INSERT INTO questions
+    (question_key, category, question, options, correct_index, difficulty, points)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (question_key) DO UPDATE SET
+        options = excluded.options,
+        correct_index = excluded.correct_index,
+        difficulty = excluded.difficulty,
+        points = excluded.points
+    WHERE options != excluded.options
+       OR correct_index != excluded.correct_index
+       OR difficulty IS NOT excluded.difficulty
+       OR points IS NOT excluded.points
+"""
+
+
+class _Reader:
+    """Incremental JSON reader over a text file."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer stays bounded.
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("unexpected end of question file")
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} but found {found!r} in question file")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the
+            # next chunk, so only trust it once more input (or EOF) follows.
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_questions(path):
+    """Yield ``(category, question_dict)`` pairs from a question file, in order."""
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "categories":
+                reader.expect("{")
+                while reader.peek() != "}":
+                    category = reader.value()
+                    reader.expect(":")
+                    reader.expect("[")
+                    while reader.peek() != "]":
+                        yield category, reader.value()
+                        if reader.peek() == ",":
+                            reader.pos += 1
+                    reader.expect("]")
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                reader.expect("}")
+            else:
+                reader.value()  # some other top-level key; skip it
+            if reader.peek() == ",":
+                reader.pos += 1
+                continue
+            reader.expect("}")
+            return
+
+
+def question_row(category: str, q: dict) -> tuple:
+    """Validate one question and turn it into an upsert row."""
+    try:
+        question = q["question"]
+        options = q["options"]
+        correct = q["correct"]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"{category!r}: question {q!r} is missing {e}") from None
+    if (not isinstance(options, list) or not isinstance(correct, int) or isinstance(correct, bool)
+            or not 0 <= correct < len(options)):
+        raise ValueError(f"{category!r}: bad options/correct index in {question!r}")
+    return (
+        database.question_key(category, question),
+        category,
+        question,
+        json.dumps(options, ensure_ascii=False),
+        correct,
+        q.get("difficulty", "medium"),
+        q.get("points", 10),
+    )
+
+
+def _drop_duplicates(conn, batch: list, options: list, threshold: float, stats: dict) -> tuple:
+    """Split a batch into the rows to write and their signatures, dropping near-duplicates.
+
+    A row is dropped when it resembles a question already in the database
+    (earlier batches included) or an earlier row of this batch. The whole
+    batch is signed in one go; each row then costs one bucket lookup.
+    """
+    sigs = dedupe.signatures([(row[2], row_options) for row, row_options in zip(batch, options)])
+    keys = dedupe.band_keys_many([row[1] for row in batch], sigs).tolist()
+    kept, signed = [], []
+    pending = {}  # bucket -> kept rows of this batch, which are not in the database yet
+    for row, sig, row_keys in zip(batch, sigs, keys):
+        matches = database.similar_questions(conn, row[1], sig, threshold, exclude_key=row[0],
+                                             keys=row_keys)
+        duplicate_of = matches[0]["question"] if matches else None
+        for key in row_keys:
+            if duplicate_of is not None:
+                break
+            for other_key, other_question, other_sig in pending.get(key, ()):
+                if other_key != row[0] and dedupe.similarity(sig, other_sig) >= threshold:
+                    duplicate_of = other_question
+                    break
+        if duplicate_of is not None:
+            stats["duplicates"] += 1
+            if len(stats["rejected"]) < REJECTED_KEPT:
+                stats["rejected"].append({"category": row[1], "question": row[2],
+                                          "duplicate_of": duplicate_of})
+            continue
+        for key in row_keys:
+            pending.setdefault(key, []).append((row[0], row[2], sig))
+        kept.append(row)
+        signed.append((row[0], row[1], sig))
+    return kept, signed
+
+
+def import_questions(path, progress=None, check_duplicates: bool = True,
+                     threshold: float = dedupe.THRESHOLD) -> dict:
+    """Stream a question file into the ``questions`` table.
+
+    ``progress`` is called with the running stats dict after each batch.
+    Returns the final stats (rows, categories, duplicates, rejected,
+    seconds, rows_per_sec); ``rejected`` lists up to ``REJECTED_KEPT``
+    skipped questions with the question each one duplicates.
+    """
+    start = time.perf_counter()
+    stats = {"rows": 0, "categories": 0, "duplicates": 0, "rejected": [],
+             "seconds": 0.0, "rows_per_sec": 0.0}
+    categories = set()
+    batch = []
+    options = []  # decoded options of the rows in ``batch``, for signing
+    uncommitted = 0
+
+    def write(conn):
+        nonlocal uncommitted
+        t0 = time.perf_counter()
+        rows, signed = batch, []
+        if check_duplicates and batch:
+            rows, signed = _drop_duplicates(conn, batch, options, threshold, stats)
+        conn.executemany(UPSERT_SQL, rows)
+        if signed:
+            placeholders = ",".join("?" * len(signed))
+            ids = dict(conn.execute(
+                f"SELECT question_key, id FROM questions WHERE question_key IN ({placeholders})",
+                [key for key, _, _ in signed]).fetchall())
+            database.store_signatures(conn, [(ids[key], category, sig) for key, category, sig in signed])
+        database.get_pool().record_query(time.perf_counter() - t0)
+        stats["rows"] += len(rows)
+        uncommitted += len(rows)
+        batch.clear()
+        options.clear()
+        if uncommitted >= COMMIT_EVERY:
+            conn.commit()
+            uncommitted = 0
+        stats["categories"] = len(categories)
+        stats["seconds"] = time.perf_counter() - start
+        stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+        if progress:
+            progress(stats)
+
+    if check_duplicates:
+        database.index_question_signatures()
+    with database.connection() as conn:
+        for category, q in iter_questions(path):
+            categories.add(category)
+            batch.append(question_row(category, q))
+            options.append(q["options"])
+            if len(batch) >= BATCH_SIZE:
+                write(conn)
+        write(conn)
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a question bank into SQLite.")
+    parser.add_argument("path", nargs="?", default=Path(__file__).parent / "data" / "questions.json")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="import near-duplicate questions instead of rejecting them")
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        print(f"\r{stats['rows']:,} rows  {stats['rows_per_sec']:,.0f} rows/s",
+              end="", file=sys.stderr)
+
+    stats = import_questions(args.path, progress=report, check_duplicates=not args.allow_duplicates)
+    print(file=sys.stderr)
+    print(f"Imported {stats['rows']:,} questions in {stats['categories']} categories "
+          f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)")
+    if stats["duplicates"]:
+        print(f"Rejected {stats['duplicates']:,} near-duplicate questions:")
+        for rejected in stats["rejected"]:
+            print(f"  [{rejected['category']}] {rejected['question']!r}\n"
+                  f"      looks like {rejected['duplicate_of']!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""Compiled, memory-mapped snapshot of the question bank.
+
+``data/questions.json`` stays the editable source. This module validates it
+once and compiles it into ``data/questions.qbin``, a flat binary file that
+is opened with ``mmap`` instead of parsed: a cold start reads a header and
+a few index arrays, and every server process maps the same pages from the
+OS page cache. Questions are decoded one at a time when they are asked for.
+
+Layout (little-endian, every section 8-byte aligned; the uint32 arrays are
+read in place with ``memoryview.cast``, so like the rest of the deployment
+this assumes a little-endian host)::
+
+    header       magic, version, source SHA-256 and (mtime_ns, size),
+                 counts and section offsets
+    strings      uint32 offsets (n + 1) into one UTF-8 blob; every
+                 question text, option, difficulty, category name and
+                 extra-field JSON is stored once
+    options      uint32 string ids, each question's options back to back
+    records      one fixed-width record per question, grouped by category
+    categories   name, first record, count, total points and the slice of
+                 the difficulty table belonging to the category
+    difficulties difficulty name plus a slice of the positions array
+    positions    uint32 positions within the category, grouped by
+                 category and difficulty (for stratified sampling)
+
+``load()`` rebuilds the snapshot whenever the JSON file's content differs
+from the one it was compiled from, so editing the JSON is all it takes.
+
+    python question_snapshot.py                  # validate and compile
+    python question_snapshot.py path/to/questions.json -o /tmp/questions.qbin
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"QBIN"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHH32sqq4I6Q")
+_RECORD = struct.Struct("<IIHHIiiII")     # see _Snapshot.question()
+_CATEGORY = struct.Struct("<IIIqII")
+_DIFFICULTY = struct.Struct("<III")
+
+NO_STRING = 0xFFFFFFFF
+HAS_ID, HAS_DIFFICULTY, HAS_POINTS = 1, 2, 4
+KNOWN_FIELDS = ("id", "question", "options", "correct", "difficulty", "points")
+INT32 = (-2 ** 31, 2 ** 31 - 1)
+
+
+# ============== VALIDATION ==============
+
+def _check_int(value, name: str, where: str):
+    if isinstance(value, bool) or not isinstance(value, int) or not INT32[0] <= value <= INT32[1]:
+        raise ValueError(f"{where}: {name!r} must be a 32-bit integer, got {value!r}")
+
+
+def validate_question(category: str, position: int, q):
+    """Raise ValueError describing the first problem with one question."""
+    where = f"{category!r} question {position}"
+    if not isinstance(q, dict):
+        raise ValueError(f"{where}: expected an object, got {type(q).__name__}")
+    for key in ("question", "options", "correct"):
+        if key not in q:
+            raise ValueError(f"{where}: missing {key!r}")
+    if not isinstance(q["question"], str) or not q["question"].strip():
+        raise ValueError(f"{where}: 'question' must be a non-empty string")
+    options = q["options"]
+    if (not isinstance(options, list) or not 2 <= len(options) <= 0xFFFF
+            or not all(isinstance(o, str) for o in options)):
+        raise ValueError(f"{where}: 'options' must be a list of at least two strings")
+    _check_int(q["correct"], "correct", where)
+    if not 0 <= q["correct"] < len(options):
+        raise ValueError(f"{where}: 'correct' index {q['correct']} is out of range")
+    if "difficulty" in q and not isinstance(q["difficulty"], str):
+        raise ValueError(f"{where}: 'difficulty' must be a string")
+    for key in ("points", "id"):
+        if key in q:
+            _check_int(q[key], key, where)
+
+
+def validate_bank(data):
+    """Raise ValueError describing the first problem in a parsed question bank."""
+    if not isinstance(data, dict):
+        raise ValueError("question bank must be a JSON object")
+    categories = data.get("categories", {})
+    if not isinstance(categories, dict):
+        raise ValueError("'categories' must be an object")
+    for name, questions in categories.items():
+        if not isinstance(questions, list):
+            raise ValueError(f"{name!r}: questions must be a list")
+        for position, q in enumerate(questions):
+            validate_question(name, position, q)
+
+
+# ============== BUILD ==============
+
+def _align(buf: bytearray):
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def compile_bank(data, source_hash: bytes, source_stat) -> bytes:
+    """Compile a validated question bank into snapshot bytes."""
+    string_ids = {}
+
+    def sid(text: str) -> int:
+        # Ids are handed out in insertion order, so list(string_ids) is the table.
+        return string_ids.setdefault(text, len(string_ids))
+
+    options, records, categories, difficulties, positions = [], [], [], [], []
+    for name, questions in data.get("categories", {}).items():
+        first = len(records)
+        total_points = 0
+        by_difficulty = {}
+        for position, q in enumerate(questions):
+            flags = 0
+            if "id" in q:
+                flags |= HAS_ID
+            if "difficulty" in q:
+                flags |= HAS_DIFFICULTY
+            if "points" in q:
+                flags |= HAS_POINTS
+            extra = {k: v for k, v in q.items() if k not in KNOWN_FIELDS}
+            records.append(_RECORD.pack(
+                sid(q["question"]),
+                len(options),
+                len(q["options"]),
+                q["correct"],
+                sid(q["difficulty"]) if "difficulty" in q else NO_STRING,
+                q.get("points", 0),
+                q.get("id", 0),
+                sid(json.dumps(extra, ensure_ascii=False)) if extra else NO_STRING,
+                flags,
+            ))
+            options.extend([sid(o) for o in q["options"]])
+            total_points += q.get("points", 0)
+            by_difficulty.setdefault(q.get("difficulty", "unknown"), []).append(position)
+        categories.append(_CATEGORY.pack(sid(name), first, len(questions), total_points,
+                                         len(difficulties), len(by_difficulty)))
+        for difficulty, members in by_difficulty.items():
+            difficulties.append(_DIFFICULTY.pack(sid(difficulty), len(positions), len(members)))
+            positions.extend(members)
+
+    strings = [text.encode("utf-8") for text in string_ids]
+    offsets = [0]
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    if offsets[-1] > 0xFFFFFFFF:
+        raise ValueError("question bank text exceeds the 4 GiB snapshot limit")
+
+    body = bytearray(b"\0" * _HEADER.size)
+    _align(body)
+    sections = []
+    for chunk in (
+        array("I", offsets).tobytes(),
+        b"".join(strings),
+        array("I", options).tobytes(),
+        b"".join(records),
+        b"".join(categories) + b"".join(difficulties),
+        array("I", positions).tobytes(),
+    ):
+        sections.append(len(body))
+        body.extend(chunk)
+        _align(body)
+
+    _HEADER.pack_into(
+        body, 0, MAGIC, VERSION, _RECORD.size, source_hash,
+        source_stat[0], source_stat[1],
+        len(strings), len(records), len(categories), len(difficulties),
+        *sections,
+    )
+    return bytes(body)
+
+
+def _source_stat(path: Path):
+    st = path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _compile_file(source: Path):
+    """Read, validate and compile ``source``. Returns (snapshot bytes, parsed bank)."""
+    stat = _source_stat(source)
+    raw = source.read_bytes()
+    data = json.loads(raw.decode("utf-8"))
+    validate_bank(data)
+    return compile_bank(data, hashlib.sha256(raw).digest(), stat), data
+
+
+def _write(target: Path, blob: bytes):
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(blob)
+    os.replace(tmp, target)  # readers keep their mapping of the old file
+
+
+def build(source, target) -> dict:
+    """Validate ``source`` and (re)write the snapshot at ``target`` atomically.
+
+    Returns counts and timings. Raises ValueError if the bank is invalid.
+    """
+    start = time.perf_counter()
+    blob, data = _compile_file(Path(source))
+    _write(Path(target), blob)
+    categories = data.get("categories", {})
+    return {
+        "categories": len(categories),
+        "questions": sum(len(qs) for qs in categories.values()),
+        "bytes": len(blob),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# ============== READ ==============
+
+class _Snapshot:
+    """Read-only view of snapshot bytes (normally a mapped file)."""
+
+    def __init__(self, buffer, name: str = "snapshot"):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise ValueError(f"{name} is not a question snapshot")
+        (magic, version, record_size, self.source_hash, mtime_ns, size,
+         n_strings, self.n_questions, n_categories, n_difficulties,
+         strings_at, blob_at, options_at, records_at, categories_at,
+         positions_at) = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION or record_size != _RECORD.size:
+            raise ValueError(f"{name} is not a version {VERSION} question snapshot")
+        self.source_stat = (mtime_ns, size)
+
+        self._view = view
+        self._offsets = view[strings_at:strings_at + 4 * (n_strings + 1)].cast("I")
+        self._blob_at = blob_at
+        self._options = view[options_at:records_at].cast("I")
+        self._records_at = records_at
+        self._positions = view[positions_at:].cast("I")
+
+        self.categories = {}      # name -> (first record, count, total points)
+        self.difficulties = {}    # name -> {difficulty: memoryview of positions}
+        difficulties_at = categories_at + n_categories * _CATEGORY.size
+        for i in range(n_categories):
+            name_id, first, count, total_points, d_first, d_count = _CATEGORY.unpack_from(
+                view, categories_at + i * _CATEGORY.size)
+            name = self.string(name_id)
+            self.categories[name] = (first, count, total_points)
+            index = {}
+            for j in range(d_first, d_first + d_count):
+                d_id, p_first, p_count = _DIFFICULTY.unpack_from(
+                    view, difficulties_at + j * _DIFFICULTY.size)
+                index[self.string(d_id)] = self._positions[p_first:p_first + p_count]
+            self.difficulties[name] = index
+
+    def string(self, i: int) -> str:
+        start = self._blob_at + self._offsets[i]
+        return str(self._view[start:self._blob_at + self._offsets[i + 1]], "utf-8")
+
+    def question_text(self, record: int) -> str:
+        return self.string(_RECORD.unpack_from(self._view, self._records_at + record * _RECORD.size)[0])
+
+    def question(self, record: int):
+        (question, options_first, options_count, correct, difficulty, points, qid, extra,
+         flags) = _RECORD.unpack_from(self._view, self._records_at + record * _RECORD.size)
+        q = {}
+        if flags & HAS_ID:
+            q["id"] = qid
+        q["question"] = self.string(question)
+        q["options"] = tuple(self.string(i) for i in
+                             self._options[options_first:options_first + options_count])
+        q["correct"] = correct
+        if flags & HAS_DIFFICULTY:
+            q["difficulty"] = self.string(difficulty)
+        if flags & HAS_POINTS:
+            q["points"] = points
+        if extra != NO_STRING:
+            q.update(json.loads(self.string(extra)))
+        return MappingProxyType(q)
+
+
+class _CategoryQuestions(Sequence):
+    """One category's questions, decoded on access."""
+
+    __slots__ = ("_snapshot", "_first", "_count", "difficulties")
+
+    def __init__(self, snapshot: _Snapshot, first: int, count: int, difficulties):
+        self._snapshot = snapshot
+        self._first = first
+        self._count = count
+        self.difficulties = difficulties  # {difficulty: positions} within this view
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self[j] for j in range(*i.indices(self._count)))
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("question index out of range")
+        return self._snapshot.question(self._first + i)
+
+    def text(self, i: int) -> str:
+        """Just the question text at position ``i``, without decoding the rest."""
+        if not 0 <= i < self._count:
+            raise IndexError("question index out of range")
+        return self._snapshot.question_text(self._first + i)
+
+
+class _Categories(Mapping):
+    """Category name -> ``_CategoryQuestions``."""
+
+    def __init__(self, snapshot: _Snapshot):
+        self._views = {
+            name: _CategoryQuestions(snapshot, first, count, snapshot.difficulties[name])
+            for name, (first, count, _) in snapshot.categories.items()
+        }
+
+    def __getitem__(self, name):
+        return self._views[name]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __len__(self):
+        return len(self._views)
+
+
+def _map(path: Path) -> _Snapshot:
+    with open(path, "rb") as f:
+        return _Snapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), str(path))
+
+
+def _map_current(source: Path, target: Path):
+    """Map ``target`` if it was compiled from the current ``source``, else None."""
+    try:
+        snapshot = _map(target)
+    except (OSError, ValueError):
+        return None
+    if snapshot.source_stat == _source_stat(source):
+        return snapshot
+    # Touched but unchanged (a checkout, a save without edits): still current.
+    if snapshot.source_hash == hashlib.sha256(source.read_bytes()).digest():
+        return snapshot
+    return None
+
+
+def load(source, target):
+    """Map the snapshot of ``source``, rebuilding it first if it is stale.
+
+    Returns ``(bank, snapshot)``: ``bank`` looks like the parsed JSON
+    (``bank["categories"][name][i]`` is a read-only question mapping) and
+    ``snapshot`` carries the per-category tables (``categories``,
+    ``difficulties``) and ``source_hash``. If ``target`` cannot be written
+    the freshly compiled snapshot is served from memory instead. Raises
+    ValueError if the bank is invalid.
+    """
+    source, target = Path(source), Path(target)
+    snapshot = _map_current(source, target)
+    if snapshot is None:
+        blob, _ = _compile_file(source)
+        try:
+            _write(target, blob)
+            snapshot = _map(target)
+        except OSError:
+            logger.warning("Could not write %s; keeping the question snapshot in memory",
+                           target, exc_info=True)
+            snapshot = _Snapshot(blob)
+    return MappingProxyType({"categories": _Categories(snapshot)}), snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and compile the question bank.")
+    default = Path(__file__).parent / "data" / "questions.json"
+    parser.add_argument("source", nargs="?", type=Path, default=default)
+    parser.add_argument("-o", "--output", type=Path,
+                        help="snapshot path (default: next to the source, .qbin)")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = build(args.source, args.output or args.source.with_suffix(".qbin"))
+    except ValueError as e:
+        sys.exit(f"invalid question bank: {e}")
+    print(f"{stats['questions']:,} questions in {stats['categories']:,} categories, "
+          f"{stats['bytes']:,} bytes in {stats['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Helpers for drawing random quiz rounds without materializing a category.
+
+Both question stores (the JSON bank in ``question_bank`` and the SQLite
+``questions`` table in ``database``) use these to pick K positions out of a
+category, optionally stratified by difficulty, in O(K) time.
+"""
+
+import random
+
+
+def sample_positions(n: int, k: int, rng=random) -> list:
+    """Pick ``min(k, n)`` distinct positions from ``range(n)`` uniformly at random."""
+    # random.sample over a range object never builds the range as a list.
+    return rng.sample(range(n), min(k, n))
+
+
+def allocate_stratified(counts: dict, k: int) -> dict:
+    """Split ``k`` draws across strata in proportion to their sizes.
+
+    Uses largest-remainder rounding so the shares add up to
+    ``min(k, total)`` and no stratum is asked for more than it holds.
+    """
+    total = sum(counts.values())
+    k = min(k, total)
+    if k <= 0:
+        return {name: 0 for name in counts}
+
+    shares = {name: k * count / total for name, count in counts.items()}
+    alloc = {name: int(share) for name, share in shares.items()}
+    leftover = k - sum(alloc.values())
+    by_remainder = sorted(counts, key=lambda name: shares[name] - alloc[name], reverse=True)
+    for name in by_remainder:
+        if leftover == 0:
+            break
+        if alloc[name] < counts[name]:
+            alloc[name] += 1
+            leftover -= 1
+    return alloc
+
+
+def locate(offset: int, counts: list) -> tuple:
+    """Map a global offset to ``(stratum_index, local_offset)`` given stratum sizes."""
+    for i, count in enumerate(counts):
+        if offset < count:
+            return i, offset
+        offset -= count
+    raise IndexError("offset out of range")
@@ -0,0 +1,309 @@
+"""Background group-commit writer for finished games.
+
+Writing a result used to happen inside the Streamlit script run: one
+connection and one fsync'd commit per game, plus a locked append to the
+highscore log. When a whole class finishes a round together, those writes
+queue up behind each other and every final screen stalls.
+
+``submit_score()`` now just puts the result on a bounded queue and returns a
+ticket. A single background thread drains the queue. It writes everything
+pending as one SQLite transaction, either when ``MAX_BATCH`` results are
+waiting or ``MAX_DELAY`` seconds after the first one arrived. Pass the ticket to ``wait_for()`` before reading the
+leaderboards to be sure your own score is already there (read-your-own-write).
+The queue is drained when the process exits.
+
+Periodic housekeeping runs on threads of its own (``PeriodicTask``), so a
+slow run never holds up the commits players wait for: expiring old
+daily/weekly/monthly leaderboards once an hour, and exporting new games to
+the JSON highscore log (an archive that follows SQLite, see ``highscores``)
+every ``EXPORT_INTERVAL`` seconds.
+
+Every answer click also produces an event for the ``answers`` table. Those
+go through a second writer with larger, slower batches. Nothing reads
+them back right away, and ``submit_answer()`` never blocks: if the writer
+falls ``MAX_QUEUE`` events behind, further events are dropped and counted
+instead of stalling the click. The adaptive difficulty ratings are saved
+every ``RATING_SAVE_INTERVAL`` seconds by another periodic task.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+import adaptive
+import database
+import highscores
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 200      # results per transaction
+MAX_DELAY = 0.05     # seconds to wait for more results before flushing
+MAX_QUEUE = 10_000   # submitters block once this many results are pending
+MAX_RETRIES = 3
+EXPIRE_INTERVAL = 3600.0  # seconds between leaderboard window expiry runs
+EXPORT_INTERVAL = 60.0    # seconds between exports to the JSON highscore log
+ANSWER_MAX_BATCH = 1_000  # answer events per transaction
+ANSWER_MAX_DELAY = 1.0    # seconds; answer events are only read by the analytics
+RATING_SAVE_INTERVAL = 5.0  # seconds between batched adaptive rating saves
+
+
+class GroupCommitWriter:
+    """Batch items from many threads into one call per sink.
+
+    ``sinks`` are callables taking the list of items in a batch. Each one is
+    retried on its own, so a failure in one does not repeat the writes that
+    already succeeded in another.
+    """
+
+    def __init__(self, sinks, max_batch: int = MAX_BATCH, max_delay: float = MAX_DELAY,
+                 max_queue: int = MAX_QUEUE, name: str = "group-commit-writer"):
+        self._sinks = list(sinks)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._cond = threading.Condition()
+        self._submit_lock = threading.Lock()
+        self._next_ticket = 0
+        self._done_through = 0   # every ticket <= this has been handled
+        self._failed = set()
+        self._stopping = False
+        self.stats = {"items": 0, "batches": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item, block: bool = True) -> int:
+        """Queue an item for writing. Returns a ticket for ``wait_for()``.
+
+        With ``block=False`` a full queue does not wait: the item is dropped
+        and the ticket is 0.
+        """
+        with self._submit_lock:
+            if self._stopping:
+                raise RuntimeError("writer is closed")
+            ticket = self._next_ticket + 1
+            # Enqueue while holding the lock so tickets reach the queue in
+            # order; with ``block`` this waits (back-pressure) while the
+            # queue is full.
+            try:
+                self._queue.put((ticket, item), block=block)
+            except queue.Full:
+                return 0
+            self._next_ticket = ticket
+        return ticket
+
+    def wait_for(self, ticket, timeout: float = 5.0) -> bool:
+        """Block until ``ticket`` has been written. False on timeout or failure."""
+        if not ticket:
+            return True
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._done_through < ticket:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return ticket not in self._failed
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything submitted so far has been written."""
+        with self._submit_lock:
+            ticket = self._next_ticket
+        return self.wait_for(ticket, timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting items, drain the queue and stop the thread."""
+        with self._submit_lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _collect(self):
+        """Block for the first item, then gather a batch. None means stop."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # finish this batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, batch):
+        items = [item for _ticket, item in batch]
+        ok = True
+        for sink in self._sinks:
+            for attempt in range(1, MAX_RETRIES + 1):
+                try:
+                    sink(items)
+                    break
+                except Exception:
+                    logger.exception("group commit of %d items to %s failed (attempt %d)",
+                                     len(items), getattr(sink, "__name__", sink), attempt)
+                    time.sleep(0.1 * attempt)
+            else:
+                ok = False
+        return ok
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            ok = self._write(batch)
+            with self._cond:
+                self.stats["batches"] += 1
+                self.stats["items"] += len(batch)
+                if not ok:
+                    self.stats["errors"] += 1
+                    self._failed.update(ticket for ticket, _item in batch)
+                self._done_through = batch[-1][0]
+                self._cond.notify_all()
+
+
+class PeriodicTask:
+    """Run ``fn`` every ``interval`` seconds on its own daemon thread.
+
+    The first run starts right away. A run that fails is logged and the
+    schedule carries on.
+    """
+
+    def __init__(self, interval: float, fn, name: str):
+        self.interval = interval
+        self._fn = fn
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        """Stop after the current run, if any."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                self._fn()
+            except Exception:
+                logger.exception("periodic task %s failed", getattr(self._fn, "__name__", self._fn))
+            if self._stop.wait(self.interval):
+                return
+
+
+def write_database_scores(results: list):
+    """Write a batch of finished games to SQLite in one transaction."""
+    with metrics.HIGHSCORE_WRITE_SECONDS.time():
+        database.save_player_scores([
+            (r["name"], r["category"], r["score"], r["correct_answers"], r["total_questions"])
+            for r in results
+        ])
+
+
+def write_database_answers(answers: list):
+    """Append a batch of answer events to SQLite in one transaction."""
+    database.save_answers(answers)
+
+
+_writer = None
+_answer_writer = None
+_tasks = []
+_writer_lock = threading.Lock()
+
+
+def _start_task(interval: float, fn, name: str):
+    task = PeriodicTask(interval, fn, name)
+    _tasks.append(task)
+    atexit.register(task.close)
+
+
+def get_writer() -> GroupCommitWriter:
+    """Return the process-wide score writer, starting it on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter([write_database_scores], name="score-writer")
+                atexit.register(_writer.close)
+                _start_task(EXPIRE_INTERVAL, database.expire_leaderboard_windows,
+                            "leaderboard-expiry")
+                _start_task(EXPORT_INTERVAL, highscores.export_scores, "highscore-export")
+    return _writer
+
+
+def get_answer_writer() -> GroupCommitWriter:
+    """Return the process-wide answer event writer, starting it on first use."""
+    global _answer_writer
+    if _answer_writer is None:
+        with _writer_lock:
+            if _answer_writer is None:
+                _answer_writer = GroupCommitWriter(
+                    [write_database_answers],
+                    max_batch=ANSWER_MAX_BATCH,
+                    max_delay=ANSWER_MAX_DELAY,
+                    name="answer-writer",
+                )
+                atexit.register(_answer_writer.close)
+                atexit.register(adaptive.save_ratings)
+                _start_task(RATING_SAVE_INTERVAL, adaptive.save_ratings, "rating-saver")
+    return _answer_writer
+
+
+def submit_score(name, score, category, correct, total) -> int:
+    """Queue a finished game for writing. Returns a ticket for ``wait_for()``."""
+    return get_writer().submit({
+        "name": name,
+        "score": score,
+        "category": category,
+        "correct_answers": correct,
+        "total_questions": total,
+        "date": datetime.now().isoformat()
+    })
+
+
+def submit_answer(name, round_id, category, question_key, selected_index, correct,
+                  response_ms, streak) -> bool:
+    """Queue one answer event without waiting. False if it had to be dropped."""
+    if get_answer_writer().submit({
+        "name": name,
+        "round_id": round_id,
+        "category": category,
+        "question_key": question_key,
+        "selected_index": selected_index,
+        "correct": correct,
+        "response_ms": response_ms,
+        "streak": streak,
+    }, block=False):
+        return True
+    metrics.ANSWER_EVENTS_DROPPED.inc()
+    return False
+
+
+def wait_for(ticket, timeout: float = 5.0) -> bool:
+    """Wait until the game behind ``ticket`` is visible on the leaderboards."""
+    if not ticket or _writer is None:
+        return True
+    return _writer.wait_for(ticket, timeout)
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Wait until every game, answer and rating submitted so far has been written."""
+    adaptive.save_ratings()
+    ok = True
+    for writer in (_writer, _answer_writer):
+        if writer is not None:
+            ok = writer.flush(timeout) and ok
+    return ok